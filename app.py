@@ -1,17 +1,13 @@
 import streamlit as st
-import re
 import time
-import requests
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from webdriver_manager.chrome import ChromeDriverManager
-import pandas as pd
-import traceback
-import gzip
-import urllib.parse
+# pandas, the enrichment and field fetchers (and selenium, via driver_pool) are
+# imported inside the code paths that use them, keeping cold starts fast
+from extraction import clean_and_decode_url, is_maps_url
+from engine import ExtractionEngine, ExtractionEvent
+from batch import parse_page_urls
+import metrics
+from jobs import get_job_runner, JOB_EXTRACT, JOB_BATCH, JOB_QUEUED, JOB_DONE, JOB_FAILED, JOB_CANCELLED
+from config import BATCH_MAX_WORKERS, BATCH_PER_HOST_LIMIT, MAX_RESULTS_LIMIT, JOB_POLL_INTERVAL, JOB_HISTORY_LIMIT
 
 # Set page config
 st.set_page_config(
@@ -41,360 +37,370 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+class StreamlitEventRenderer:
+    """Show extraction engine events in the progress bar, status line and panels"""
+    
+    def __init__(self, progress_bar, status_text, error_container, debug_container):
+        self.progress_bar = progress_bar
+        self.status_text = status_text
+        self.error_container = error_container
+        self.debug_container = debug_container
+    
+    def __call__(self, event):
+        if event.progress is not None:
+            self.progress_bar.progress(event.progress)
+        if not event.message:
+            return
+        if event.kind == 'status':
+            getattr(self.status_text, event.level)(event.message)
+            return
+        
+        with self.error_container if event.kind == 'error' else self.debug_container:
+            if event.details:
+                with st.expander(event.message, expanded=event.expanded):
+                    for detail in event.details:
+                        st.code(detail)
+            elif event.level == 'text':
+                st.write(event.message)
+            else:
+                getattr(st, event.level)(event.message)
+
 class URLExtractor:
     def __init__(self):
-        self.driver = None
         self.debug_mode = False
+        self.streaming = True
+        self.browser_fallback = True
+        self.expand_short_links = True
         
-    def setup_driver(self):
-        """Setup Chrome WebDriver with cloud-compatible options"""
-        try:
-            chrome_options = Options()
-            chrome_options.add_argument("--headless=new")
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            chrome_options.add_argument("--disable-gpu")
-            chrome_options.add_argument("--window-size=1920,1080")
-            
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            self.driver.set_page_load_timeout(30)
-            
-            return True
-            
-        except Exception as e:
-            st.error(f"❌ Chrome driver setup failed: {str(e)}")
-            return False
+    # Cloud-compatible Chrome options
+    CHROME_ARGUMENTS = (
+        "--headless=new",
+        "--no-sandbox",
+        "--disable-dev-shm-usage",
+        "--disable-gpu",
+        "--window-size=1920,1080",
+    )
     
-    def close_driver(self):
-        """Safely close WebDriver"""
-        try:
-            if self.driver:
-                self.driver.quit()
-                self.driver = None
-        except:
-            pass
+    def create_engine(self, on_event=None):
+        """Extraction engine configured from this extractor's options"""
+        return ExtractionEngine(streaming=self.streaming, browser_fallback=self.browser_fallback,
+                                expand_short_links=self.expand_short_links, debug=self.debug_mode,
+                                browser_arguments=self.CHROME_ARGUMENTS, on_event=on_event)
     
     def extract_google_maps_urls(self, input_url):
-        """Extract Google Maps URLs with fallback to HTTP method"""
+        """Extract Google Maps URLs, showing the engine's progress in the page"""
         
         progress_container = st.container()
         status_container = st.container()
         error_container = st.container()
         debug_container = st.container()
         
-        try:
-            with progress_container:
-                progress_bar = st.progress(0)
-            with status_container:
-                status_text = st.empty()
-            
-            # Try HTTP method directly (more reliable on cloud platforms)
-            progress_bar.progress(10)
-            status_text.info("🚀 Using HTTP extraction method...")
-            
-            return self.extract_urls_with_requests(input_url, progress_bar, status_text, error_container, debug_container)
-            
-        except Exception as main_error:
-            with error_container:
-                st.error(f"❌ EXTRACTION FAILED: {str(main_error)}")
-                error_details = traceback.format_exc()
-                with st.expander("🔧 Technical Error Details", expanded=False):
-                    st.code(error_details)
-            return []
-            
-        finally:
-            progress_bar.progress(100)
-            self.close_driver()
-    
-    def extract_urls_with_requests(self, input_url, progress_bar, status_text, error_container, debug_container):
-        """Extract URLs using HTTP requests with proper content handling"""
-        try:
-            progress_bar.progress(30)
-            status_text.info("🌐 Fetching page content...")
-            
-            # Better headers to avoid being blocked
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Accept-Encoding': 'identity',  # Don't request compressed content
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-            }
-            
-            # Make request
-            try:
-                session = requests.Session()
-                session.headers.update(headers)
-                response = session.get(input_url, timeout=30, allow_redirects=True, stream=True)
-                response.raise_for_status()
-                
-                # Get content as text, handling encoding properly
-                response.encoding = response.apparent_encoding or 'utf-8'
-                page_source = response.text
-                
-                session.close()
-                
-            except requests.exceptions.Timeout:
-                with error_container:
-                    st.error("❌ Request timeout - website took too long to respond")
-                return []
-            except requests.exceptions.ConnectionError:
-                with error_container:
-                    st.error("❌ Connection failed - check if the URL is accessible")
-                return []
-            except requests.exceptions.HTTPError as e:
-                with error_container:
-                    st.error(f"❌ HTTP Error {response.status_code}: {str(e)}")
-                return []
-            
-            page_length = len(page_source)
-            progress_bar.progress(50)
-            status_text.info(f"✅ Page fetched: {page_length:,} characters")
-            
-            # Debug info
-            if self.debug_mode:
-                with debug_container:
-                    st.success("🔧 Using HTTP method")
-                    st.info(f"📄 Content size: {page_length:,} characters")
-                    st.info(f"📊 Status: {response.status_code}")
-                    st.info(f"📋 Encoding: {response.encoding}")
-                    
-                    # Check content quality
-                    if page_length > 100:
-                        sample = page_source[:500]
-                        non_ascii = sum(1 for c in sample if ord(c) > 127)
-                        quality = (500 - non_ascii) / 500
-                        st.info(f"📊 Content quality: {quality:.1%} readable")
-                        
-                        if quality < 0.7:
-                            st.warning("⚠️ Content may be corrupted")
-            
-            # Extract URLs from content
-            return self.extract_urls_from_content(page_source, progress_bar, status_text, error_container, debug_container)
-            
-        except Exception as e:
-            with error_container:
-                st.error(f"❌ HTTP extraction failed: {str(e)}")
-            return []
-    
-    def extract_urls_from_content(self, page_source, progress_bar, status_text, error_container, debug_container):
-        """Extract Google Maps URLs from page content"""
-        try:
-            progress_bar.progress(80)
-            status_text.info("🔍 Searching for Google Maps URLs...")
-            
-            found_urls = set()
-            
-            # Comprehensive URL patterns to find Google Maps URLs
-            patterns = [
-                # Standard Google Maps URLs
-                r'https://www\.google\.com/maps/place/[^\s"\'<>\)]+',
-                r'https://www\.google\.com/maps/[^\s"\'<>\)]*@[\d\.,\-]+[^\s"\'<>\)]*',
-                r'https://maps\.google\.com/[^\s"\'<>\)]+',
-                r'https://goo\.gl/maps/[^\s"\'<>\)]+',
-                
-                # Additional formats
-                r'https://www\.google\.com/maps/search/[^\s"\'<>\)]+',
-                r'https://www\.google\.com/maps/dir/[^\s"\'<>\)]+',
-                r'https://maps\.app\.goo\.gl/[^\s"\'<>\)]+',
-                
-                # Encoded versions (common in HTML)
-                r'https%3A//www\.google\.com/maps[^\s"\'<>\)]+',
-                r'https%3A//maps\.google\.com[^\s"\'<>\)]+',
-                
-                # Alternative patterns with different delimiters
-                r'https://[^/]*google[^/]*/maps/[^\s"\'<>\)]+',
-                r'https://[^/]*maps\.google[^/]*/[^\s"\'<>\)]+',
-            ]
-            
-            pattern_results = {}
-            total_found = 0
-            
-            for i, pattern in enumerate(patterns):
-                matches = re.findall(pattern, page_source, re.IGNORECASE)
-                found_urls.update(matches)
-                pattern_count = len(matches)
-                total_found += pattern_count
-                pattern_results[f"Pattern {i+1}"] = pattern_count
-            
-            # Also search for URLs in href attributes specifically
-            href_pattern = r'href=["\']([^"\']*(?:google\.com/maps|maps\.google\.com|goo\.gl/maps)[^"\']*)["\']'
-            href_matches = re.findall(href_pattern, page_source, re.IGNORECASE)
-            found_urls.update(href_matches)
-            href_count = len(href_matches)
-            total_found += href_count
-            
-            if self.debug_mode:
-                with debug_container:
-                    st.info(f"🎯 Total raw URLs found: {total_found}")
-                    st.info(f"   • From href attributes: {href_count}")
-                    for pattern_name, count in pattern_results.items():
-                        if count > 0:
-                            st.info(f"   • {pattern_name}: {count} URLs")
-            
-            # Clean and validate URLs
-            progress_bar.progress(90)
-            status_text.info("🧹 Cleaning and validating URLs...")
-            
-            clean_urls = []
-            invalid_urls = []
-            
-            for url in found_urls:
-                # Decode URL if encoded
-                clean_url = self.clean_and_decode_url(url)
-                if clean_url and self.is_maps_url(clean_url):
-                    clean_urls.append(clean_url)
-                elif clean_url:
-                    invalid_urls.append(clean_url[:100])  # Keep for debugging
-            
-            # Remove duplicates while preserving order
-            clean_urls = list(dict.fromkeys(clean_urls))
-            
-            # Results
-            progress_bar.progress(100)
-            
-            if clean_urls:
-                status_text.success(f"✅ Found {len(clean_urls)} Google Maps URLs!")
-                if self.debug_mode:
-                    with debug_container:
-                        st.success(f"Sample URL: {clean_urls[0][:80]}...")
-            else:
-                status_text.error("❌ No Google Maps URLs found on this page")
-                
-                # Show comprehensive debug info
-                with debug_container:
-                    st.error("🔍 **Detailed Analysis:**")
-                    
-                    # Content analysis
-                    google_count = page_source.lower().count('google')
-                    maps_count = page_source.lower().count('maps')
-                    http_count = page_source.lower().count('http')
-                    href_count_total = page_source.lower().count('href=')
-                    
-                    st.write(f"• Page size: {len(page_source):,} characters")
-                    st.write(f"• Keywords found: google({google_count}) maps({maps_count}) http({http_count})")
-                    st.write(f"• Links in page: {href_count_total} href attributes")
-                    st.write(f"• Raw URLs found: {len(found_urls)}")
-                    st.write(f"• Invalid URLs rejected: {len(invalid_urls)}")
-                    
-                    # Show rejected URLs for debugging
-                    if invalid_urls:
-                        with st.expander(f"🔍 Rejected URLs ({len(invalid_urls)})", expanded=False):
-                            for i, url in enumerate(invalid_urls[:5]):
-                                st.code(f"{i+1}. {url}")
-                            if len(invalid_urls) > 5:
-                                st.write(f"... and {len(invalid_urls)-5} more")
-                    
-                    # Show sample content with better formatting
-                    if page_source:
-                        sample = page_source[:2000]
-                        readable_chars = sum(1 for c in sample if c.isprintable() and ord(c) < 127)
-                        readability = readable_chars / len(sample) if sample else 0
-                        
-                        st.write(f"• Content readability: {readability:.1%}")
-                        
-                        if readability > 0.6:
-                            # Look for business-related content
-                            business_terms = ['restaurant', 'business', 'address', 'phone', 'location', 'directory']
-                            business_found = [term for term in business_terms if term in sample.lower()]
-                            
-                            if business_found:
-                                st.info(f"✅ Found business terms: {', '.join(business_found)}")
-                            else:
-                                st.warning("⚠️ No business-related terms found")
-                            
-                            with st.expander("📄 Page content sample", expanded=False):
-                                st.code(sample)
-                        else:
-                            st.warning("⚠️ Content appears corrupted, compressed, or non-HTML")
-                    
-                    # Show ALL URLs found in page
-                    all_urls = re.findall(r'https?://[^\s"\'<>\)]+', page_source[:5000])
-                    if all_urls:
-                        google_urls = [url for url in all_urls if 'google' in url.lower()]
-                        maps_urls = [url for url in all_urls if 'maps' in url.lower()]
-                        
-                        st.write(f"• All URLs in page: {len(all_urls)}")
-                        st.write(f"• URLs containing 'google': {len(google_urls)}")
-                        st.write(f"• URLs containing 'maps': {len(maps_urls)}")
-                        
-                        with st.expander(f"🔗 All URLs found ({len(all_urls[:10])} shown)", expanded=False):
-                            for i, url in enumerate(all_urls[:10]):
-                                st.code(f"{i+1}. {url}")
-                            if len(all_urls) > 10:
-                                st.write(f"... and {len(all_urls)-10} more URLs")
-                                
-                        if google_urls:
-                            with st.expander(f"🎯 Google URLs ({len(google_urls)})", expanded=True):
-                                for i, url in enumerate(google_urls):
-                                    st.code(f"{i+1}. {url}")
-                    
-                    else:
-                        st.error("❌ No URLs found at all in the page")
-                        st.info("**Suggestions:**")
-                        st.info("• Try a different business directory website")
-                        st.info("• Check if the URL is accessible in a browser")
-                        st.info("• Some sites may block automated requests")
-            
-            return clean_urls
-            
-        except Exception as e:
-            with error_container:
-                st.error(f"❌ URL extraction failed: {str(e)}")
-            return []
+        with progress_container:
+            progress_bar = st.progress(0)
+        with status_container:
+            status_text = st.empty()
+        
+        renderer = StreamlitEventRenderer(progress_bar, status_text, error_container, debug_container)
+        return self.create_engine(on_event=renderer).extract(input_url).maps_urls
     
     def clean_and_decode_url(self, url):
         """Clean and decode URL properly"""
-        if not url:
-            return None
-        
-        # Decode URL if encoded
-        try:
-            if '%3a' in url.lower() or '%2f' in url.lower():
-                url = urllib.parse.unquote(url)
-        except:
-            pass
-        
-        # Remove unwanted characters
-        for char in ['"', "'", '<', '>', '}', ')', ']', ';', ',', '\\']:
-            url = url.split(char)[0]
-        
-        url = url.strip()
-        
-        # Must start with http/https
-        if not url.startswith(('http://', 'https://')):
-            return None
-        
-        return url
+        return clean_and_decode_url(url)
     
     def is_maps_url(self, url):
         """Check if URL is a Google Maps URL"""
-        if not url or len(url) < 20:
-            return False
-            
-        url_lower = url.lower()
+        return is_maps_url(url)
+
+def get_rate_limiter():
+    """Per-host limiter shared by background jobs and email enrichment in this process"""
+    return get_job_runner().rate_limiter
+
+def current_job_id(slot):
+    """Job shown in a slot; the URL keeps it across browser refreshes"""
+    return st.session_state.get(slot) or st.query_params.get(slot)
+
+def open_job(slot, job):
+    st.session_state[slot] = job.id
+    st.query_params[slot] = job.id
+
+def submit_job(slot, kind, params, reuse_results=True):
+    """Queue a job (or pick up an identical one) and show it in ``slot``"""
+    job = get_job_runner().submit(kind, params, reuse_results=reuse_results)
+    open_job(slot, job)
+    if job.cached:
+        finished = time.strftime('%H:%M', time.localtime(job.updated))
+        st.info(f"♻️ Showing results of an identical job finished at {finished} - use 🔁 Run again to refresh them")
+    return job
+
+def watch_job(job_id):
+    """Progress of a queued or running job, refreshed by the fragment timer"""
+    store = get_job_runner().store
+    job = store.get(job_id)
+    if job is None or job.finished:
+        st.rerun()
+    
+    st.progress(job.progress)
+    if job.status == JOB_QUEUED:
+        st.info("⏳ Queued - waiting for a free worker")
+    else:
+        st.info(f"🔄 {job.message or 'Starting...'}")
+    if job.total:
+        st.caption(f"{job.completed}/{job.total} pages done")
+    if st.button("⏹️ Cancel", key=f"cancel_{job_id}", disabled=job.cancel_requested):
+        store.request_cancel(job_id)
+
+def render_job_controls(slot, job):
+    """Resume an unfinished job or run a finished one again without the cache"""
+    col_resume, col_again = st.columns(2)
+    with col_resume:
+        if job.status in (JOB_CANCELLED, JOB_FAILED) and st.button("▶️ Resume", key=f"resume_{job.id}"):
+            get_job_runner().resume(job.id)
+            st.rerun()
+    with col_again:
+        if st.button("🔁 Run again", key=f"again_{job.id}"):
+            submit_job(slot, job.kind, job.params, reuse_results=False)
+            st.rerun()
+
+def render_job(slot, render_result):
+    """Poll the job in ``slot`` while it runs, then hand it to ``render_result``"""
+    job_id = current_job_id(slot)
+    if not job_id:
+        return
+    job = get_job_runner().store.get(job_id)
+    if job is None:
+        st.warning("⚠️ That job no longer exists")
+        st.session_state.pop(slot, None)
+        st.query_params.pop(slot, None)
+        return
+    
+    if job.finished:
+        render_result(job)
+        render_job_controls(slot, job)
+    else:
+        st.fragment(watch_job, run_every=JOB_POLL_INTERVAL)(job_id)
+
+def render_metrics(snapshot, note=''):
+    """Where the time went: per-stage breakdown and counters of a run"""
+    breakdown = metrics.stage_breakdown(snapshot)
+    if not breakdown:
+        return
+    with st.expander("⏱️ Timing breakdown", expanded=False):
+        lines = ["| Stage | Time | Share |", "|---|---:|---:|"]
+        lines += [f"| {stage} | {seconds * 1000:,.1f} ms | {share:.0%} |" for stage, seconds, share in breakdown]
+        st.markdown("\n".join(lines))
+        counters = snapshot.get('counters', {})
+        matches = sum(value for name, value in counters.items() if name.startswith('matches'))
+        st.caption(f"{counters.get('bytes_downloaded', 0) / 1e6:,.2f} MB downloaded · {matches:,} raw matches · "
+                   f"{counters.get('urls_found', 0):,} URLs kept · {counters.get('urls_rejected', 0):,} rejected"
+                   + (f" · {note}" if note else ""))
+
+def render_extract_result(job):
+    """Replay a finished single-page job's panels and show its URLs"""
+    result = job.result or {}
+    st.markdown("---")
+    st.subheader("🔄 Extraction Progress")
+    
+    progress_bar = st.progress(job.progress)
+    status_text = st.empty()
+    error_container = st.container()
+    debug_container = st.container()
+    renderer = StreamlitEventRenderer(progress_bar, status_text, error_container, debug_container)
+    for event in result.get('events', []):
+        renderer(ExtractionEvent(**event))
+    if job.message:
+        getattr(status_text, result.get('status_level', 'info'))(job.message)
+    if job.status == JOB_CANCELLED:
+        status_text.warning("⏹️ Cancelled")
+    elif job.status == JOB_FAILED and not result:
+        with st.expander("❌ Job failed", expanded=True):
+            st.code(job.error or job.message)
+    
+    if result.get('skipped'):
+        st.info(f"🆕 Skipped {result['skipped']} places already found in earlier runs")
+    
+    urls = result.get('maps_urls', [])
+    if urls:
+        import pandas as pd
+        st.markdown("---")
+        st.subheader("✅ Results")
+        st.success(f"Found {len(urls)} Google Maps URLs")
         
-        # Decode if needed
-        try:
-            if '%3a' in url_lower or '%2f' in url_lower:
-                url_lower = urllib.parse.unquote(url_lower)
-        except:
-            pass
+        df = pd.DataFrame({'Google Maps URL': urls})
+        st.dataframe(df, use_container_width=True)
         
-        # Maps indicators
-        maps_indicators = [
-            'google.com/maps',
-            'maps.google.com',
-            'goo.gl/maps',
-            'maps.app.goo.gl',
-        ]
+        with metrics.stage('export'):
+            csv = df.to_csv(index=False)
+        st.download_button(
+            "📥 Download CSV",
+            csv,
+            "google_maps_urls.csv",
+            "text/csv"
+        )
+    elif job.status == JOB_DONE:
+        st.warning("No URLs found. Try a different website with business listings.")
+    
+    render_metrics(result.get('metrics'))
+
+def render_batch_result(job):
+    """Summary, failures and merged rows of a finished batch job"""
+    result = job.result or {}
+    if job.status == JOB_DONE:
+        st.success(job.message)
+    elif job.status == JOB_CANCELLED:
+        st.warning(job.message)
+    else:
+        st.error(job.message)
+        if job.error:
+            with st.expander("❌ Job failed", expanded=False):
+                st.code(job.error)
+    
+    failed = result.get('failed', [])
+    if failed:
+        with st.expander(f"⚠️ Failed pages ({len(failed)})", expanded=False):
+            for page in failed:
+                st.code(f"{page['page_url']}\n{page['error']}")
+    
+    if result.get('skipped'):
+        st.info(f"🆕 Skipped {result['skipped']} places already found in earlier runs")
+    
+    rows = result.get('rows', [])
+    if rows:
+        import pandas as pd
+        df = pd.DataFrame(rows)
+        st.dataframe(df, use_container_width=True)
+        with metrics.stage('export'):
+            csv = df.to_csv(index=False)
+        st.download_button(
+            "📥 Download Batch CSV",
+            csv,
+            "google_maps_urls_batch.csv",
+            "text/csv"
+        )
+    
+    render_metrics(result.get('metrics'), note="summed over pages fetched in parallel")
+
+def render_batch_mode(options, polite):
+    """Batch extraction over many pages, run as a background job"""
+    st.subheader("📚 Batch Mode")
+    
+    batch_text = st.text_area(
+        "Page URLs (one per line):",
+        placeholder="https://example.com/directory?page=1\nhttps://example.com/directory?page=2",
+        height=120
+    )
+    uploaded = st.file_uploader("...or upload a .txt / .csv of page URLs", type=["txt", "csv"])
+    
+    page_urls = parse_page_urls(batch_text)
+    if uploaded is not None:
+        page_urls = list(dict.fromkeys(page_urls + parse_page_urls(uploaded.getvalue().decode('utf-8', errors='replace'))))
+    
+    bcol1, bcol2 = st.columns(2)
+    with bcol1:
+        max_workers = st.number_input("Concurrent fetches", 1, 32, BATCH_MAX_WORKERS)
+    with bcol2:
+        per_host_limit = st.number_input("Max per host", 1, 8, BATCH_PER_HOST_LIMIT)
+    
+    if st.button(f"🚀 Extract Batch ({len(page_urls)} pages)", disabled=not page_urls):
+        submit_job('batch_job', JOB_BATCH, dict(
+            options, page_urls=page_urls, polite=polite,
+            max_workers=int(max_workers), per_host_limit=int(per_host_limit),
+        ), reuse_results=not options['new_only'])
+    
+    render_job('batch_job', render_batch_result)
+
+def render_recent_jobs():
+    """Jobs from every session, so anyone can pick up a running extraction"""
+    store = get_job_runner().store
+    jobs = store.recent(JOB_HISTORY_LIMIT)
+    if not jobs:
+        return
+    
+    st.subheader("🗂️ Recent Jobs")
+    for job in jobs:
+        target = job.params.get('url') or f"{len(job.params.get('page_urls', []))} pages"
+        started = time.strftime('%H:%M', time.localtime(job.created))
+        col_label, col_open = st.columns([3, 1])
+        with col_label:
+            st.caption(f"{started} · {job.kind} · {job.status} · {job.progress}%\n\n{target[:60]}")
+        with col_open:
+            if st.button("Open", key=f"open_{job.id}"):
+                open_job('job' if job.kind == JOB_EXTRACT else 'batch_job', job)
+                st.rerun()
+
+def render_email_enrichment(polite):
+    """Look up contact emails for a list of business websites"""
+    st.subheader("📧 Email Enrichment")
+    
+    websites_text = st.text_area(
+        "Business websites (one per line):",
+        placeholder="https://example-bakery.com\nexample-plumbing.com",
+        height=120
+    )
+    websites = [line.strip() for line in websites_text.splitlines() if line.strip()][:MAX_RESULTS_LIMIT]
+    
+    if st.button(f"📧 Find Emails ({len(websites)} sites)", disabled=not websites):
+        import pandas as pd
+        from enrichment import EmailEnricher
+        progress_bar = st.progress(0)
+        table = st.empty()
+        rows = []
+        
+        # Results stream in as each website settles
+        enricher = EmailEnricher(rate_limiter=get_rate_limiter() if polite else None)
+        for result in enricher.iter_results(websites):
+            rows.append({
+                'Website': result.website,
+                'Email': result.email or '',
+                'Found On': result.source_page or '',
+                'Error': result.error or '',
+            })
+            progress_bar.progress(int(len(rows) / len(websites) * 100))
+            table.dataframe(pd.DataFrame(rows), use_container_width=True)
+        
+        progress_bar.progress(100)
+        found = sum(1 for row in rows if row['Email'])
+        st.success(f"✅ Found emails for {found} of {len(rows)} websites")
+        if rows:
+            st.download_button(
+                "📥 Download Emails CSV",
+                pd.DataFrame(rows).to_csv(index=False),
+                "business_emails.csv",
+                "text/csv"
+            )
+
+def render_business_details(polite):
+    """Name, address, phone and website from business or knowledge panel pages"""
+    st.subheader("🏢 Business Details")
+    
+    pages_text = st.text_area(
+        "Business pages (one per line):",
+        placeholder="https://example-bakery.com\nhttps://www.google.com/search?q=example+bakery",
+        height=120
+    )
+    pages = [line.strip() for line in pages_text.splitlines() if line.strip()][:MAX_RESULTS_LIMIT]
+    
+    if st.button(f"🏢 Get Details ({len(pages)} pages)", disabled=not pages):
+        import pandas as pd
+        from business_fields import BusinessFieldFetcher
+        progress_bar = st.progress(0)
+        table = st.empty()
+        rows = []
         
-        has_indicator = any(indicator in url_lower for indicator in maps_indicators)
-        has_location = any(pattern in url_lower for pattern in ['@', 'place/', 'search/', 'dir/', '/maps/'])
+        fetcher = BusinessFieldFetcher(rate_limiter=get_rate_limiter() if polite else None)
+        for row in fetcher.iter_fields(pages):
+            rows.append(row)
+            progress_bar.progress(int(len(rows) / len(pages) * 100))
+            table.dataframe(pd.DataFrame(rows), use_container_width=True)
         
-        return has_indicator and (has_location or len(url) > 50)
+        found = sum(1 for row in rows if row['name'])
+        st.success(f"✅ Found details on {found} of {len(rows)} pages")
+        if rows:
+            st.download_button(
+                "📥 Download Details CSV",
+                pd.DataFrame(rows).to_csv(index=False),
+                "business_details.csv",
+                "text/csv"
+            )
 
 # Main Streamlit App
 def main():
@@ -417,6 +423,20 @@ def main():
         )
         
         debug_mode = st.checkbox("🔧 Debug Mode", value=True)
+        streaming = st.checkbox("🌊 Stream large pages", value=True,
+                                help="Scan the page in chunks while it downloads instead of buffering it all")
+        polite = st.checkbox("🐢 Polite mode", value=True,
+                             help="Rate-limit batch and email requests per host and back off on HTTP 429")
+        browser_fallback = st.checkbox("🖥️ Browser fallback", value=True,
+                                       help="Fetch over HTTP first and render in headless Chrome only pages that look JavaScript-built")
+        new_only = st.checkbox("🆕 New places only", value=False,
+                               help="Drop places already found in earlier runs (matched by place ID, CID or name and coordinates)")
+        expand_short_links = st.checkbox("🔗 Expand short links", value=True,
+                                         help="Resolve goo.gl/maps and maps.app.goo.gl links to full place URLs (cached after the first lookup)")
+        
+        options = dict(debug=debug_mode, streaming=streaming, browser_fallback=browser_fallback,
+                       expand_short_links=expand_short_links, new_only=new_only,
+                       browser_arguments=list(URLExtractor.CHROME_ARGUMENTS))
         
         # Test with known working URL
         if st.button("🧪 Test with Sample URL"):
@@ -424,53 +444,26 @@ def main():
             
             # Use a real webpage that should contain Google Maps URLs
             test_url = "https://www.yellowpages.com/search?search_terms=restaurants&geo_location_terms=New%20York%2C%20NY"
-            
-            extractor = URLExtractor()
-            extractor.debug_mode = debug_mode
-            
-            st.markdown("---")
-            st.subheader("🧪 Test Results")
-            
-            urls = extractor.extract_google_maps_urls(test_url)
-            
-            if urls:
-                st.success(f"✅ Test passed! Found {len(urls)} URLs from real webpage")
-                df = pd.DataFrame({'Google Maps URL': urls})
-                st.dataframe(df, use_container_width=True)
-            else:
-                st.warning("⚠️ Test didn't find URLs - this is normal for some websites")
-                st.info("Try entering your own URL in the input field above")
+            submit_job('job', JOB_EXTRACT, dict(options, url=test_url), reuse_results=not new_only)
         
         # Extract button
         if st.button("🚀 Extract URLs", disabled=not url_input):
             if not url_input.startswith(('http://', 'https://')):
                 st.error("❌ URL must start with http:// or https://")
             else:
-                extractor = URLExtractor()
-                extractor.debug_mode = debug_mode
-                
-                st.markdown("---")
-                st.subheader("🔄 Extraction Progress")
-                
-                urls = extractor.extract_google_maps_urls(url_input.strip())
-                
-                if urls:
-                    st.markdown("---")
-                    st.subheader("✅ Results")
-                    st.success(f"Found {len(urls)} Google Maps URLs")
-                    
-                    df = pd.DataFrame({'Google Maps URL': urls})
-                    st.dataframe(df, use_container_width=True)
-                    
-                    csv = df.to_csv(index=False)
-                    st.download_button(
-                        "📥 Download CSV",
-                        csv,
-                        "google_maps_urls.csv",
-                        "text/csv"
-                    )
-                else:
-                    st.warning("No URLs found. Try a different website with business listings.")
+                submit_job('job', JOB_EXTRACT, dict(options, url=url_input.strip()), reuse_results=not new_only)
+        
+        # Extractions run in the background; reruns and refreshes just reattach
+        render_job('job', render_extract_result)
+        
+        st.markdown("---")
+        render_batch_mode(options, polite)
+        
+        st.markdown("---")
+        render_email_enrichment(polite)
+        
+        st.markdown("---")
+        render_business_details(polite)
     
     with col2:
         st.subheader("ℹ️ How it Works")
@@ -498,6 +491,8 @@ def main():
         • Content analysis
         • URL extraction details
         """)
+        
+        render_recent_jobs()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,257 @@
+"""
+Lead Generation Agent - Async Fetching
+HTTP fetches on asyncio with aiohttp or httpx, an alternative to a thread per request
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Mapping, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+import metrics
+from config import (
+    ASYNC_KEEPALIVE_CONNECTIONS, ASYNC_MAX_CONNECTIONS, BATCH_PER_HOST_LIMIT, FETCH_BACKEND, REQUEST_TIMEOUT,
+)
+from extraction import REQUEST_HEADERS, sniff_encoding
+from scan_pool import ScanOutcome, scan_page
+from tiered_fetch import TIER_HTTP, TierResult
+
+BACKEND_REQUESTS = 'requests'
+BACKEND_AIOHTTP = 'aiohttp'  # Lowest overhead per request; HTTP/1.1 only
+BACKEND_HTTPX = 'httpx'  # HTTP/2 when the h2 package is installed
+FETCH_BACKENDS = (BACKEND_REQUESTS, BACKEND_AIOHTTP, BACKEND_HTTPX)
+
+# Connection-specific headers are not allowed on HTTP/2; both clients keep connections alive anyway
+ASYNC_REQUEST_HEADERS = {name: value for name, value in REQUEST_HEADERS.items() if name != 'Connection'}
+
+
+@lru_cache(maxsize=None)
+def _module_available(module: str) -> bool:
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs httpx with the h2 package (pip install "httpx[http2]")"""
+    return _module_available('httpx') and _module_available('h2')
+
+
+def resolve_backend(backend: str = FETCH_BACKEND) -> str:
+    """The backend to use: the async client asked for when installed, else the blocking requests path"""
+    if backend not in FETCH_BACKENDS:
+        raise ValueError(f"Unknown fetch backend {backend!r}; expected one of {', '.join(FETCH_BACKENDS)}")
+    if backend != BACKEND_REQUESTS and not _module_available(backend):
+        print(f"{backend} is not installed (pip install {backend}); fetching with requests")
+        return BACKEND_REQUESTS
+    return backend
+
+
+@dataclass
+class AsyncResponse:
+    """The parts of a response the engine reads, the same whichever async client fetched it"""
+    url: str
+    status_code: int
+    reason: str
+    headers: Mapping[str, str]  # Case-insensitive, as both clients return them
+    http_version: str
+    encoding: Optional[str] = None
+
+
+def _with_message(error_class, e: Exception, url: str) -> requests.exceptions.RequestException:
+    # Some client errors (e.g. httpx.ReadTimeout) carry no message of their own
+    detail = f": {e}" if str(e) else ''
+    return error_class(f"{type(e).__name__}{detail} ({url})")
+
+
+def _httpx_error(e: Exception, url: str) -> requests.exceptions.RequestException:
+    import httpx
+
+    if isinstance(e, httpx.TimeoutException):
+        error_class = requests.exceptions.ConnectTimeout if isinstance(e, httpx.ConnectTimeout) else requests.exceptions.Timeout
+    elif isinstance(e, httpx.TooManyRedirects):
+        error_class = requests.exceptions.TooManyRedirects
+    elif isinstance(e, httpx.TransportError):
+        error_class = requests.exceptions.ConnectionError
+    else:
+        error_class = requests.exceptions.RequestException
+    return _with_message(error_class, e, url)
+
+
+def _aiohttp_error(e: Exception, url: str) -> requests.exceptions.RequestException:
+    import aiohttp
+
+    if isinstance(e, asyncio.TimeoutError):
+        error_class = (requests.exceptions.ConnectTimeout if isinstance(e, aiohttp.ConnectionTimeoutError)
+                       else requests.exceptions.Timeout)
+    elif isinstance(e, aiohttp.TooManyRedirects):
+        error_class = requests.exceptions.TooManyRedirects
+    elif isinstance(e, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError)):
+        error_class = requests.exceptions.ConnectionError
+    else:
+        error_class = requests.exceptions.RequestException
+    return _with_message(error_class, e, url)
+
+
+def _scan_body(body: bytes, encoding: str) -> ScanOutcome:
+    """Decode, scan and clean a page in the calling (worker) thread, charging each step to its stage"""
+    start = time.perf_counter()
+    text = body.decode(encoding, 'replace')
+    decode_time = time.perf_counter() - start
+    outcome = scan_page(text)
+    outcome.timings['decode'] = decode_time
+    for stage, seconds in outcome.timings.items():
+        metrics.add_time(stage, seconds)
+    metrics.count('chars_decoded', outcome.page_length)
+    return outcome
+
+
+class AsyncFetcher:
+    """The HTTP tier of TieredFetcher on asyncio
+
+    One aiohttp or httpx client pools connections for every fetch; httpx
+    speaks HTTP/2 where the server and the h2 package allow it. ``fetch``
+    returns the same TierResult as the blocking HTTP path and raises the
+    same requests exceptions, so ExtractionEngine handles both alike. Each
+    host gets a semaphore of ``per_host_limit`` and the whole fetcher one
+    of ``max_in_flight``, so thousands of pending fetches cost a coroutine
+    each rather than a thread.
+
+    Bodies are read whole and then decoded and scanned in a worker thread,
+    or in ``scan_pool`` when given, so the event loop only moves bytes.
+    There is no browser tier; pages that would need rendering keep their
+    HTTP result.
+
+    Use as ``async with AsyncFetcher() as fetcher``.
+    """
+
+    def __init__(self, backend: str = BACKEND_AIOHTTP, max_in_flight: int = ASYNC_MAX_CONNECTIONS,
+                 per_host_limit: int = BATCH_PER_HOST_LIMIT, timeout: float = REQUEST_TIMEOUT,
+                 rate_limiter=None, scan_pool=None):
+        if backend not in (BACKEND_AIOHTTP, BACKEND_HTTPX):
+            raise ValueError(f"AsyncFetcher needs {BACKEND_AIOHTTP} or {BACKEND_HTTPX}, not {backend!r}")
+        self.backend = backend
+        self.max_in_flight = max(1, max_in_flight)
+        self.per_host_limit = max(1, per_host_limit)
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter  # optional utils.HostRateLimiter
+        self.scan_pool = scan_pool  # optional scan_pool.ScanPool
+        self.client = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    async def __aenter__(self) -> 'AsyncFetcher':
+        keepalive = min(ASYNC_KEEPALIVE_CONNECTIONS, self.max_in_flight)
+        if self.backend == BACKEND_HTTPX:
+            import httpx
+
+            self.client = httpx.AsyncClient(
+                http2=http2_available(),
+                headers=ASYNC_REQUEST_HEADERS,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(max_connections=self.max_in_flight, max_keepalive_connections=keepalive),
+                follow_redirects=True,
+            )
+        else:
+            import aiohttp
+
+            # Connect and read timeouts like requests' timeout=, not a cap on the whole download
+            self.client = aiohttp.ClientSession(
+                headers=ASYNC_REQUEST_HEADERS,
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=self.timeout, sock_read=self.timeout),
+                connector=aiohttp.TCPConnector(limit=self.max_in_flight, limit_per_host=self.per_host_limit),
+            )
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self
+
+    async def __aexit__(self, *exc):
+        if self.backend == BACKEND_HTTPX:
+            await self.client.aclose()
+        else:
+            await self.client.close()
+        self.client = None
+
+    def _host_semaphore(self, host: str) -> asyncio.Semaphore:
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return semaphore
+
+    async def _get_httpx(self, url: str) -> Tuple[AsyncResponse, bytes]:
+        import httpx
+
+        try:
+            # Until the response headers arrive
+            with metrics.stage('request'):
+                response = await self.client.send(self.client.build_request('GET', url), stream=True)
+            try:
+                with metrics.stage('download'):
+                    body = await response.aread()
+            finally:
+                await response.aclose()
+        except httpx.HTTPError as e:
+            raise _httpx_error(e, url) from e
+        return AsyncResponse(str(response.url), response.status_code, response.reason_phrase, response.headers,
+                             response.http_version), body
+
+    async def _get_aiohttp(self, url: str) -> Tuple[AsyncResponse, bytes]:
+        import aiohttp
+
+        try:
+            with metrics.stage('request'):
+                response = await self.client.get(url)
+            try:
+                with metrics.stage('download'):
+                    body = await response.read()
+            finally:
+                response.release()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise _aiohttp_error(e, url) from e
+        version = f'HTTP/{response.version.major}.{response.version.minor}' if response.version else 'HTTP/1.1'
+        return AsyncResponse(str(response.url), response.status, response.reason or '', response.headers,
+                             version), body
+
+    async def fetch_bytes(self, url: str) -> Tuple[AsyncResponse, bytes]:
+        """GET a page under the host and overall limits; raises requests.exceptions.HTTPError on 4xx/5xx"""
+        # Host first, so a page waiting on a busy host does not hold an overall slot
+        async with self._host_semaphore(urlparse(url).netloc.lower()), self._semaphore:
+            if self.rate_limiter:
+                with metrics.stage('throttle'):
+                    await self.rate_limiter.wait_async(url)
+            if self.backend == BACKEND_HTTPX:
+                response, body = await self._get_httpx(url)
+            else:
+                response, body = await self._get_aiohttp(url)
+
+        metrics.count('bytes_downloaded', len(body))
+        if self.rate_limiter:
+            self.rate_limiter.record_response(url, response.status_code, response.headers)
+        if response.status_code >= 400:
+            kind = 'Client' if response.status_code < 500 else 'Server'
+            raise requests.exceptions.HTTPError(
+                f"{response.status_code} {kind} Error: {response.reason} for url: {response.url}", response=response)
+        return response, body
+
+    async def fetch(self, url: str) -> TierResult:
+        """Fetch and scan one page; same result and errors as TieredFetcher's HTTP tier"""
+        start = time.perf_counter()
+        response, body = await self.fetch_bytes(url)
+
+        # Same encoding choice as the streaming scan
+        content_type = response.headers.get('Content-Type', '').lower()
+        header_encoding = requests.utils.get_encoding_from_headers(response.headers) if 'charset' in content_type else None
+        response.encoding = sniff_encoding(body[:4096], header_encoding)
+        if self.scan_pool:
+            outcome = await asyncio.to_thread(self.scan_pool.scan_bytes, [body], response.encoding)
+        else:
+            outcome = await asyncio.to_thread(_scan_body, body, response.encoding)
+
+        return TierResult(url, TIER_HTTP, outcome.urls, outcome.sample, outcome.page_length, outcome.scan_result,
+                          invalid_urls=outcome.invalid_urls, response=response,
+                          reason=f'{response.http_version} via {self.backend}', http_elapsed=time.perf_counter() - start)
@@ -0,0 +1,239 @@
+"""
+Lead Generation Agent - Batch Extraction
+Fetch many directory pages concurrently and merge their Google Maps URLs
+"""
+
+import re
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+from async_fetch import BACKEND_REQUESTS, AsyncFetcher, resolve_backend
+from config import BATCH_MAX_WORKERS, BATCH_PER_HOST_LIMIT, BATCH_MAX_PAGES, CHROME_OPTIONS, FETCH_BACKEND, SCAN_PROCESSES
+from engine import ExtractionEngine
+from metrics import merge_snapshots
+from place_index import PlaceDeduper
+from scan_pool import get_scan_pool
+
+_PAGE_URL_PATTERN = re.compile(r'https?://[^\s"\'<>,;]+')
+
+
+@dataclass
+class PageResult:
+    """Outcome of extracting one source page"""
+    page_url: str
+    maps_urls: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    elapsed: float = 0.0
+    tier: str = 'http'
+    metrics: Dict[str, Dict[str, float]] = field(default_factory=dict)
+
+
+@dataclass
+class BatchResult:
+    """Merged, deduplicated output of a batch run"""
+    pages: List[PageResult] = field(default_factory=list)
+    # Maps URL -> source pages it was found on, in first-seen order
+    sources: Dict[str, List[str]] = field(default_factory=OrderedDict)
+    elapsed: float = 0.0
+    # True when ``should_stop`` ended the run before every page was fetched
+    stopped: bool = False
+    # Pages often link the same place with different URLs; the first one seen is kept
+    places: PlaceDeduper = field(default_factory=PlaceDeduper, repr=False)
+
+    def add_page(self, page: PageResult):
+        self.pages.append(page)
+        for maps_url in page.maps_urls:
+            maps_url, _ = self.places.add(maps_url)
+            page_list = self.sources.setdefault(maps_url, [])
+            if page.page_url not in page_list:
+                page_list.append(page.page_url)
+
+    @property
+    def failed_pages(self) -> List[PageResult]:
+        return [page for page in self.pages if page.error]
+
+    @property
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        """Stage seconds and counters summed over every page (worker time, not wall time)"""
+        return merge_snapshots(page.metrics for page in self.pages)
+
+    def to_rows(self) -> List[Dict[str, str]]:
+        """One row per unique Maps URL, ready for a DataFrame or CSV"""
+        return [
+            {'Google Maps URL': maps_url, 'Source Pages': ' | '.join(page_urls)}
+            for maps_url, page_urls in self.sources.items()
+        ]
+
+
+def parse_page_urls(text: str, limit: int = BATCH_MAX_PAGES) -> List[str]:
+    """Pull page URLs out of pasted text or an uploaded .txt/.csv file"""
+    urls = _PAGE_URL_PATTERN.findall(text or '')
+    return list(dict.fromkeys(url.rstrip('.') for url in urls))[:limit]
+
+
+class _HostScheduler:
+    """Pages queued per host in input order, started under the overall and per-host limits"""
+
+    def __init__(self, page_urls: Iterable[str], max_in_flight: int, per_host_limit: int):
+        self.queues: Dict[str, deque] = OrderedDict()
+        for page_url in page_urls:
+            self.queues.setdefault(urlparse(page_url).netloc.lower(), deque()).append(page_url)
+        self.active: Dict[str, int] = dict.fromkeys(self.queues, 0)
+        self.max_in_flight = max_in_flight
+        self.per_host_limit = per_host_limit
+        self.in_flight = 0
+
+    @property
+    def pending(self) -> bool:
+        return any(self.queues.values())
+
+    def cancel(self):
+        """Drop every page that has not started"""
+        self.queues.clear()
+
+    def take(self) -> List[Tuple[str, str]]:
+        """(host, page URL) for each page that may start now"""
+        started = []
+        for host, queue in self.queues.items():
+            while queue and self.active[host] < self.per_host_limit and self.in_flight < self.max_in_flight:
+                started.append((host, queue.popleft()))
+                self.active[host] += 1
+                self.in_flight += 1
+        return started
+
+    def finished(self, host: str):
+        self.active[host] -= 1
+        self.in_flight -= 1
+
+
+class BatchExtractor:
+    """Extract Maps URLs from many pages with a bounded worker pool
+
+    At most ``max_workers`` pages are in flight overall and at most
+    ``per_host_limit`` from any one host. Pages waiting on a busy host stay
+    queued instead of occupying a worker, so other hosts keep the pool full.
+
+    With ``scan_processes`` the fetch threads only download. Decoding,
+    scanning and cleaning each page runs in a shared pool of that many
+    worker processes, so large pages use every core instead of one.
+
+    With ``backend='aiohttp'`` or ``'httpx'`` pages are fetched on one
+    asyncio event loop instead of a thread each (see async_fetch), so
+    ``max_workers`` can be in the hundreds. That path is HTTP only; pages
+    are never re-fetched in the browser. Without the client installed it
+    falls back to requests.
+    """
+
+    def __init__(self, max_workers: int = BATCH_MAX_WORKERS, per_host_limit: int = BATCH_PER_HOST_LIMIT,
+                 timeout: int = 30, streaming: bool = True, session=None, rate_limiter=None,
+                 browser_fallback: bool = False, expand_short_links: bool = False,
+                 browser_arguments: Sequence[str] = CHROME_OPTIONS, scan_processes: int = SCAN_PROCESSES,
+                 backend: str = FETCH_BACKEND):
+        self.max_workers = max(1, max_workers)
+        self.per_host_limit = max(1, per_host_limit)
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.backend = resolve_backend(backend)
+        # session defaults to the shared pooled session; rate_limiter is an optional utils.HostRateLimiter
+        self.engine = ExtractionEngine(streaming=streaming, browser_fallback=browser_fallback,
+                                       expand_short_links=expand_short_links, browser_arguments=browser_arguments,
+                                       timeout=timeout, session=session, rate_limiter=rate_limiter,
+                                       scan_pool=get_scan_pool(scan_processes) if scan_processes > 0 else None)
+
+    @staticmethod
+    def _page_result(page_url: str, result) -> PageResult:
+        return PageResult(page_url, result.maps_urls, error=result.error, elapsed=result.elapsed, tier=result.tier,
+                          metrics=result.metrics)
+
+    def extract_page(self, page_url: str) -> PageResult:
+        """Fetch and scan a single page; errors are recorded, not raised"""
+        return self._page_result(page_url, self.engine.extract(page_url))
+
+    def extract(self, page_urls: Iterable[str],
+                on_result: Optional[Callable[[PageResult, int, int], None]] = None,
+                should_stop: Optional[Callable[[], bool]] = None) -> BatchResult:
+        """Run the batch and return merged results
+
+        ``on_result(page, done, total)`` is called from the calling thread as
+        each page finishes, so it is safe to update Streamlit widgets there.
+        ``should_stop()`` is checked before each new page is started; once it
+        returns True the pages in flight finish and the rest are left out.
+        """
+        page_urls = list(dict.fromkeys(page_urls))
+        result = BatchResult()
+        start = time.perf_counter()
+        scheduler = _HostScheduler(page_urls, self.max_workers, self.per_host_limit)
+
+        if self.backend != BACKEND_REQUESTS:
+            import asyncio
+            finished = asyncio.run(self._run_async(scheduler, len(page_urls), result, on_result, should_stop))
+        else:
+            finished = self._run_threads(scheduler, len(page_urls), result, on_result, should_stop)
+
+        # Results arrive in completion order; keep pages in input order in the output
+        for page_url in page_urls:
+            if page_url in finished:
+                result.add_page(finished[page_url])
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    @staticmethod
+    def _can_start(scheduler: _HostScheduler, result: BatchResult, should_stop) -> bool:
+        if should_stop and scheduler.pending and should_stop():
+            result.stopped = True
+            scheduler.cancel()
+            return False
+        return True
+
+    def _run_threads(self, scheduler, total, result, on_result, should_stop) -> Dict[str, PageResult]:
+        finished: Dict[str, PageResult] = {}
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            def fill():
+                if self._can_start(scheduler, result, should_stop):
+                    for host, page_url in scheduler.take():
+                        in_flight[pool.submit(self.extract_page, page_url)] = host
+
+            fill()
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    scheduler.finished(in_flight.pop(future))
+                    page = future.result()
+                    finished[page.page_url] = page
+                    if on_result:
+                        on_result(page, len(finished), total)
+                fill()
+        return finished
+
+    async def _run_async(self, scheduler, total, result, on_result, should_stop) -> Dict[str, PageResult]:
+        import asyncio
+
+        finished: Dict[str, PageResult] = {}
+        in_flight = {}
+        async with AsyncFetcher(self.backend, max_in_flight=self.max_workers, per_host_limit=self.per_host_limit,
+                                timeout=self.timeout, rate_limiter=self.rate_limiter,
+                                scan_pool=self.engine.scan_pool) as fetcher:
+            async def extract_page(page_url: str) -> PageResult:
+                return self._page_result(page_url, await self.engine.extract_async(page_url, fetcher))
+
+            def fill():
+                if self._can_start(scheduler, result, should_stop):
+                    for host, page_url in scheduler.take():
+                        in_flight[asyncio.create_task(extract_page(page_url))] = host
+
+            fill()
+            while in_flight:
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    scheduler.finished(in_flight.pop(task))
+                    page = task.result()
+                    finished[page.page_url] = page
+                    if on_result:
+                        on_result(page, len(finished), total)
+                fill()
+        return finished
@@ -0,0 +1,893 @@
+"""
+Benchmark script for Lead Generation Agent
+Run this to measure extraction performance on synthetic pages
+
+    python benchmark.py                                  # before/after comparisons
+    python benchmark.py --suite -o base.json             # reproducible suite, saved as JSON
+    python benchmark.py --suite --compare base.json      # flag regressions against a saved run
+    python benchmark.py --compare base.json head.json    # compare two saved runs
+"""
+
+import argparse
+import functools
+import glob
+import hashlib
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import urllib.parse
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# The per-pattern scan app.py used before the compiled matcher, kept as a baseline
+LEGACY_PATTERNS = [
+    r'https://www\.google\.com/maps/place/[^\s"\'<>\)]+',
+    r'https://www\.google\.com/maps/[^\s"\'<>\)]*@[\d\.,\-]+[^\s"\'<>\)]*',
+    r'https://maps\.google\.com/[^\s"\'<>\)]+',
+    r'https://goo\.gl/maps/[^\s"\'<>\)]+',
+    r'https://www\.google\.com/maps/search/[^\s"\'<>\)]+',
+    r'https://www\.google\.com/maps/dir/[^\s"\'<>\)]+',
+    r'https://maps\.app\.goo\.gl/[^\s"\'<>\)]+',
+    r'https%3A//www\.google\.com/maps[^\s"\'<>\)]+',
+    r'https%3A//maps\.google\.com[^\s"\'<>\)]+',
+    r'https://[^/]*google[^/]*/maps/[^\s"\'<>\)]+',
+    r'https://[^/]*maps\.google[^/]*/[^\s"\'<>\)]+',
+]
+LEGACY_HREF_PATTERN = r'href=["\']([^"\']*(?:google\.com/maps|maps\.google\.com|goo\.gl/maps)[^"\']*)["\']'
+
+SAMPLE_MAPS_URLS = [
+    'https://www.google.com/maps/place/Joe%27s+Pizza/@40.7306,-73.9866,17z/data=!3m1!4b1',
+    'https://maps.google.com/?cid=1234567890123456789',
+    'https://goo.gl/maps/AbCdEfGhIjK',
+    'https://maps.app.goo.gl/XyZ123abc',
+    'https://www.google.com/maps/search/coffee+near+me/@40.71,-74.00,14z',
+    'https://www.google.com/maps/dir//Central+Park/@40.78,-73.96,15z',
+    'https%3A//www.google.com/maps/place/Cafe+Luna',
+]
+
+
+def make_synthetic_html(size_bytes, maps_links_per_kb=0.5, seed=42):
+    """Build a directory-like HTML page of roughly size_bytes"""
+    rng = random.Random(seed)
+    filler = [
+        '<div class="listing"><h2>Business {n}</h2><p>123 Main St, Springfield. '
+        'Call (555) 010-{n:04d} for restaurant bookings.</p>',
+        '<a href="https://example.com/business/{n}">Website</a>',
+        '<script>var data = {{"id": {n}, "rating": 4.5, "tags": ["food", "local"]}};</script>',
+        '<span class="phone">+1-555-010-{n:04d}</span></div>',
+    ]
+    parts = ['<html><head><title>Directory</title></head><body>']
+    size = len(parts[0])
+    n = 0
+    while size < size_bytes:
+        chunk = rng.choice(filler).format(n=n % 10000)
+        if rng.random() < maps_links_per_kb * len(chunk) / 1024:
+            url = rng.choice(SAMPLE_MAPS_URLS)
+            chunk += f'<a href="{url}">Map</a> '
+        parts.append(chunk)
+        size += len(chunk)
+        n += 1
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+
+@contextmanager
+def serve_pages(pages, latency=0.0):
+    """Serve {path: html} from a local HTTP stand-in with artificial latency
+
+    Yields the base URL. Unknown paths return 404.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body go out as separate writes; without this, small pages wait on delayed ACKs
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            time.sleep(latency)
+            body = pages.get(self.path.split('?')[0])
+            if body is None:
+                self.send_error(404)
+                return
+            data = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_address[1]}'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def legacy_scan(page_source):
+    """Run the original eleven patterns plus the href scan"""
+    found_urls = set()
+    for pattern in LEGACY_PATTERNS:
+        found_urls.update(re.findall(pattern, page_source, re.IGNORECASE))
+    found_urls.update(re.findall(LEGACY_HREF_PATTERN, page_source, re.IGNORECASE))
+    return found_urls
+
+
+def time_call(func, *args, repeat=3):
+    """Return the best wall time of repeat runs and the last result"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_url_matcher():
+    """Compare the compiled matcher against the per-pattern loop"""
+    from extraction import MAPS_URL_MATCHER
+
+    print("🔍 URL matcher: legacy loop vs compiled single pass")
+    ok = True
+    for label, size, density in [
+        ("2 MB, dense links", 2_000_000, 2.0),
+        ("6 MB, sparse links", 6_000_000, 0.05),
+        ("6 MB, no maps links", 6_000_000, 0.0),
+    ]:
+        html = make_synthetic_html(size, maps_links_per_kb=density)
+        legacy_time, legacy_urls = time_call(legacy_scan, html)
+        matcher_time, (matcher_urls, _) = time_call(MAPS_URL_MATCHER.scan, html)
+        same = legacy_urls == matcher_urls
+        ok = ok and same
+        speedup = legacy_time / matcher_time if matcher_time else float('inf')
+        print(f"   {label:22} legacy {legacy_time * 1000:8.1f} ms | "
+              f"compiled {matcher_time * 1000:8.1f} ms | {speedup:5.1f}x | "
+              f"{len(matcher_urls)} URLs {'✅' if same else '❌ MISMATCH'}")
+    return ok
+
+
+def bench_streaming_scan():
+    """Compare buffered decode+scan against chunked streaming on raw bytes"""
+    from extraction import MAPS_URL_MATCHER, decode_stream
+    from config import STREAM_CHUNK_SIZE
+
+    print("🌊 Streaming scan: buffered body vs bounded chunks")
+    body = make_synthetic_html(10_000_000, maps_links_per_kb=0.2).encode('utf-8')
+    byte_chunks = [body[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(body), STREAM_CHUNK_SIZE)]
+
+    def buffered():
+        return MAPS_URL_MATCHER.scan(b''.join(byte_chunks).decode('utf-8'))
+
+    def streamed():
+        return MAPS_URL_MATCHER.scan_stream(decode_stream(iter(byte_chunks), 'utf-8'))
+
+    results = {}
+    for label, func in [("buffered", buffered), ("streamed", streamed)]:
+        tracemalloc.start()
+        start = time.perf_counter()
+        results[label] = func()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"   {label:10} {elapsed * 1000:8.1f} ms | peak {peak / 1e6:6.1f} MB")
+
+    same = results["buffered"] == results["streamed"]
+    print(f"   {'✅' if same else '❌'} Same URLs and counts from both paths")
+    return same
+
+
+def bench_batch_throughput():
+    """Pages per second for a batch as the per-host cap grows"""
+    from batch import BatchExtractor
+    import http_client
+
+    print("📚 Batch extraction: 24 pages, one host, 200 ms latency")
+    pages = {'/directory': make_synthetic_html(200_000, maps_links_per_kb=0.5)}
+    ok = True
+    with serve_pages(pages, latency=0.2) as base_url:
+        page_urls = [f'{base_url}/directory?page={i}' for i in range(24)]
+        baseline = None
+        for per_host_limit in [1, 2, 4, 8]:
+            # Uncached session, so every round really hits the server
+            session = http_client.create_session(use_cache=False)
+            extractor = BatchExtractor(max_workers=8, per_host_limit=per_host_limit, session=session)
+            result = extractor.extract(page_urls)
+            rate = len(result.pages) / result.elapsed
+            baseline = baseline or rate
+            ok = ok and not result.failed_pages
+            print(f"   per-host cap {per_host_limit}: {rate:6.1f} pages/s "
+                  f"({rate / baseline:4.1f}x) | {len(result.sources)} unique URLs")
+    return ok
+
+
+def bench_fetch_backends():
+    """Pages per second for a batch: a requests thread per page vs aiohttp and httpx on one event loop"""
+    from async_fetch import BACKEND_AIOHTTP, BACKEND_HTTPX, BACKEND_REQUESTS, resolve_backend
+    from batch import BatchExtractor
+    import http_client
+
+    backends = [BACKEND_REQUESTS] + [b for b in (BACKEND_AIOHTTP, BACKEND_HTTPX) if resolve_backend(b) == b]
+    print(f"🔀 Fetch backends: 256 pages, one host, 200 ms latency ({', '.join(backends)})")
+    pages = {'/directory': make_synthetic_html(20_000, maps_links_per_kb=0.5)}
+    ok = True
+    with serve_pages(pages, latency=0.2) as base_url:
+        page_urls = [f'{base_url}/directory?page={i}' for i in range(256)]
+        for concurrency in [8, 64, 256]:
+            line = []
+            expected = None
+            for backend in backends:
+                # Uncached session, so every round really hits the server
+                session = http_client.create_session(use_cache=False)
+                extractor = BatchExtractor(max_workers=concurrency, per_host_limit=concurrency, session=session,
+                                           backend=backend)
+                # Includes the in-process stand-in server, the same for every backend
+                cpu_start = time.process_time()
+                result = extractor.extract(page_urls)
+                cpu = time.process_time() - cpu_start
+                expected = expected or result.sources
+                same = result.sources == expected and not result.failed_pages
+                ok = ok and same
+                line.append(f"{backend} {len(result.pages) / result.elapsed:6.1f} pages/s, "
+                            f"{cpu * 1000 / len(result.pages):4.1f} ms CPU/page{'' if same else ' ❌ MISMATCH'}")
+            print(f"   concurrency {concurrency:3}: " + ' | '.join(line))
+    return ok
+
+
+def bench_email_enrichment():
+    """Sequential extract_from_website vs the concurrent enricher"""
+    from enrichment import EmailEnricher
+    from utils import EmailExtractor
+    import http_client
+
+    print("📧 Email enrichment: 20 sites, 100 ms latency, emails spread across probe pages")
+    pages = {}
+    for i in range(20):
+        # Homepage, /contact-us or /about carries the email, or none at all
+        pages[f'/site{i}'] = '<p>Welcome</p>' + (f'<a>info@shop{i}.com</a>' if i % 4 == 0 else '')
+        if i % 4 == 1:
+            pages[f'/site{i}/contact-us'] = f'<p>hello@shop{i}.com</p>'
+        if i % 4 == 2:
+            pages[f'/site{i}/about'] = f'<p>sales@shop{i}.com</p>'
+
+    # Uncached session, so both runs really hit the server
+    http_client._session = http_client.create_session(use_cache=False)
+    try:
+        with serve_pages(pages, latency=0.1) as base_url:
+            websites = [f'{base_url}/site{i}' for i in range(20)]
+
+            extractor = EmailExtractor()
+            start = time.perf_counter()
+            sequential = {site: extractor.extract_from_website(site) for site in websites}
+            sequential_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            concurrent = EmailEnricher(per_domain_limit=16).enrich(websites)
+            concurrent_time = time.perf_counter() - start
+    finally:
+        http_client.close_session()
+
+    same = sequential == concurrent
+    print(f"   sequential {sequential_time:6.2f}s | concurrent {concurrent_time:6.2f}s | "
+          f"{sequential_time / concurrent_time:4.1f}x | {'✅' if same else '❌'} same emails")
+    return same
+
+
+LEGACY_EMAIL_PATTERN = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+LEGACY_BUSINESS_EMAILS = ['info@', 'contact@', 'sales@', 'support@', 'hello@', 'admin@', 'office@', 'business@']
+LEGACY_EXCLUDED_EMAILS = ['gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com', 'example.com', 'test.com',
+                          'placeholder.com', 'domain.com', 'noreply', 'no-reply', 'donotreply']
+
+
+def legacy_email_scan(text):
+    """EmailExtractor.extract_emails_from_text before the scanner: one findall plus substring filters"""
+    business, others = [], []
+    for email in re.findall(LEGACY_EMAIL_PATTERN, text):
+        email = email.lower().strip()
+        if any(exclude in email for exclude in LEGACY_EXCLUDED_EMAILS):
+            continue
+        if any(pattern.replace('@', '') in email for pattern in LEGACY_BUSINESS_EMAILS):
+            business.append(email)
+        else:
+            others.append(email)
+    return business + others
+
+
+def make_email_text(size_bytes, seed=11):
+    """Synthetic pages with plain, excluded and obfuscated addresses planted in them
+
+    Returns the text, the plain addresses and the addresses only written obfuscated.
+    """
+    rng = random.Random(seed)
+    html = make_synthetic_html(size_bytes, maps_links_per_kb=0.1, seed=seed)
+    parts, plain, obfuscated = [], [], []
+    for start in range(0, len(html), 20_000):
+        parts.append(html[start:start + 20_000])
+        n = len(parts)
+        kind = rng.randrange(5)
+        if kind == 0:
+            email = f'info@shop{n}.com'
+            parts.append(f'<a href="mailto:{email}">{email}</a>')
+            plain.append(email)
+        elif kind == 1:
+            email = f'owner{n}@studio{n}.co.uk'
+            parts.append(f'<p>Write to {email}.</p>')
+            plain.append(email)
+        elif kind == 2:
+            parts.append(f'<p>noreply@shop{n}.com or someone{n}@gmail.com</p>')
+        elif kind == 3:
+            parts.append(f'<p>sales [at] firm{n} [dot] com</p>')
+            obfuscated.append(f'sales@firm{n}.com')
+        else:
+            parts.append(f'<a href="mailto:hello%40cafe{n}.net">Email us</a> <span>desk&#64;cafe{n}.net</span>')
+            obfuscated += [f'hello@cafe{n}.net', f'desk@cafe{n}.net']
+    return ''.join(parts), plain, obfuscated
+
+
+def bench_email_scan():
+    """Throughput of the email scanner against the original findall extraction"""
+    from email_scanner import EMAIL_SCANNER
+
+    print("📨 Email scan: legacy findall vs scanner with obfuscation decoding")
+    ok = True
+    for label, size in (("1 MB", 1_000_000), ("5 MB", 5_000_000)):
+        text, plain, obfuscated = make_email_text(size)
+        megabytes = len(text) / 1_000_000
+        legacy_time, legacy_emails = time_call(legacy_email_scan, text)
+        scan_time, emails = time_call(EMAIL_SCANNER.scan, text)
+        found = set(emails)
+        plain_recall = sum(email in found for email in plain) / max(1, len(plain))
+        decoded_recall = sum(email in found for email in obfuscated) / max(1, len(obfuscated))
+        # Every address the old extraction returned is still returned
+        complete = set(legacy_emails) <= found and plain_recall == 1.0 and decoded_recall == 1.0
+        ok = ok and complete
+        print(f"   {label:5}  legacy {megabytes / legacy_time:6.1f} MB/s | scanner {megabytes / scan_time:6.1f} MB/s | "
+              f"plain {plain_recall:.0%} | decoded {decoded_recall:.0%} (legacy 0%) | {'✅' if complete else '❌'}")
+    return ok
+
+
+def cold_start_time(statement, repeat=3):
+    """Best wall time of statement in a fresh interpreter, imports included"""
+    import subprocess
+    script = f"import time; start = time.perf_counter(); {statement}; print(time.perf_counter() - start)"
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+        times.append(float(output.split()[-1]))
+    return min(times)
+
+
+def bench_user_agents():
+    """Startup and per-extractor cost of fake_useragent vs the bundled pool"""
+    import importlib.util
+
+    print("🕵️ User agents: fake_useragent vs bundled pool")
+    pool_start = cold_start_time("from user_agents import get_user_agent_pool; get_user_agent_pool().random")
+    pool_each, _ = time_call(lambda: [__import__('utils').EmailExtractor() for _ in range(100)])
+    if importlib.util.find_spec('fake_useragent') is None:
+        print(f"   pool cold start {pool_start * 1000:6.1f} ms | 100 extractors {pool_each * 1000:6.1f} ms "
+              f"(fake_useragent not installed, no baseline)")
+        return True
+    from fake_useragent import UserAgent
+    ua_start = cold_start_time("from fake_useragent import UserAgent; UserAgent().random")
+    ua_each, _ = time_call(lambda: [UserAgent() for _ in range(100)], repeat=1)
+    print(f"   cold start     fake_useragent {ua_start * 1000:7.1f} ms | pool {pool_start * 1000:6.1f} ms")
+    print(f"   100 instances  fake_useragent {ua_each * 1000:7.1f} ms | pool {pool_each * 1000:6.1f} ms")
+    return pool_start < ua_start
+
+
+def legacy_diagnostics(page_source):
+    """The failure analysis the engine ran inline before diagnostics.py, minus the events"""
+    counts = {keyword: page_source.lower().count(keyword) for keyword in ('google', 'maps', 'http', 'href=')}
+    quality_sample = page_source[:500]
+    quality = (500 - sum(1 for c in quality_sample if ord(c) > 127)) / 500
+    sample = page_source[:2000]
+    readability = sum(1 for c in sample if c.isprintable() and ord(c) < 127) / len(sample) if sample else 0
+    terms = [term for term in ('restaurant', 'business', 'address', 'phone', 'location', 'directory')
+             if term in sample.lower()]
+    urls = re.findall(r'https?://[^\s"\'<>\)]+', page_source[:5000])
+    return counts, quality, readability, terms, urls
+
+
+def bench_diagnostics():
+    """Cost of explaining an empty extraction: inline rescans vs one-copy analysis
+
+    Outside debug mode the engine now skips the analysis entirely.
+    """
+    from diagnostics import analyze_page
+
+    print("🩺 Diagnostics: failure analysis on pages with no Maps links")
+    ok = True
+    for label, size in (("1 MB", 1_000_000), ("6 MB", 6_000_000)):
+        html = make_synthetic_html(size, maps_links_per_kb=0.0)
+        legacy_time, expected = time_call(legacy_diagnostics, html)
+        new_time, stats = time_call(analyze_page, html)
+        same = expected == (stats.keyword_counts, stats.quality, stats.readability, stats.business_terms, stats.urls)
+        ok = ok and same
+        print(f"   {label}  legacy {legacy_time * 1000:7.1f} ms | one copy {new_time * 1000:6.1f} ms | "
+              f"{legacy_time / new_time:4.1f}x | {'✅ same stats' if same else '❌ MISMATCH'}")
+    return ok
+
+
+def bench_instrumentation():
+    """Cost of per-stage metrics on a streamed extraction, and the breakdown they produce"""
+    import http_client
+    import metrics
+    from engine import ExtractionEngine
+
+    print("⏱️ Instrumentation: streamed 6 MB extraction with metrics on vs off")
+    html = make_synthetic_html(6_000_000, maps_links_per_kb=0.5)
+    engine = ExtractionEngine(browser_fallback=False, expand_short_links=False)
+    http_client._session = http_client.create_session(use_cache=False)
+    was_enabled = metrics.is_enabled()
+    try:
+        with serve_pages({'/page': html}) as base_url:
+            url = f'{base_url}/page'
+            engine.extract(url)  # warm the connection pool
+            timings = {}
+            for enabled in (False, True, False, True):
+                metrics.set_enabled(enabled)
+                best, result = time_call(engine.extract, url, repeat=3)
+                timings[enabled] = min(best, timings.get(enabled, float('inf')))
+    finally:
+        metrics.set_enabled(was_enabled)
+        http_client.close_session()
+
+    overhead = timings[True] / timings[False] - 1
+    breakdown = ', '.join(f"{stage} {seconds * 1000:.0f} ms" for stage, seconds, _ in metrics.stage_breakdown(result.metrics))
+    print(f"   off {timings[False] * 1000:7.1f} ms | on {timings[True] * 1000:7.1f} ms | overhead {overhead:+.1%}")
+    print(f"   {breakdown}")
+    # Both runs are dominated by the same I/O and scan; allow for timing noise
+    return overhead < 0.05
+
+
+
+def bench_scan_processes():
+    """Scan throughput of fetched pages: fetch threads under the GIL vs a pool of worker processes"""
+    from concurrent.futures import ThreadPoolExecutor
+    from scan_pool import ScanPool, scan_page
+
+    cores = os.cpu_count() or 1
+    print(f"⚙️ Scan pool: 16 fetched 2 MB pages, 8 fetch threads, {cores} cores")
+    bodies = [make_synthetic_html(2_000_000, maps_links_per_kb=0.5, seed=i).encode('utf-8') for i in range(16)]
+    megabytes = sum(len(body) for body in bodies) / 1e6
+
+    def in_threads():
+        with ThreadPoolExecutor(max_workers=8) as threads:
+            return [sorted(outcome.urls) for outcome in threads.map(lambda body: scan_page(body.decode('utf-8')), bodies)]
+
+    baseline_time, expected = time_call(in_threads, repeat=2)
+    print(f"   threads only   {baseline_time * 1000:8.1f} ms | {megabytes / baseline_time:6.1f} MB/s")
+
+    ok = True
+    for workers in sorted({1, 2, 4, 8, 16, cores} & set(range(1, max(cores, 2) + 1))):
+        pool = ScanPool(workers).warm()
+        try:
+            def in_pool():
+                with ThreadPoolExecutor(max_workers=8) as threads:
+                    return [sorted(outcome.urls) for outcome in threads.map(lambda body: pool.scan_bytes([body]), bodies)]
+
+            elapsed, urls = time_call(in_pool, repeat=2)
+        finally:
+            pool.close()
+        same = urls == expected
+        ok = ok and same
+        print(f"   {workers:2} processes   {elapsed * 1000:8.1f} ms | {megabytes / elapsed:6.1f} MB/s | "
+              f"{baseline_time / elapsed:4.1f}x | {'✅' if same else '❌ MISMATCH'}")
+    return ok
+
+BUSINESS_PANEL = (
+    '<div class="kp"><h2 data-attrid="title">Joe&#39;s Pizza</h2>'
+    '<div data-attrid="kc:/location/location:address"><span class="LrzXr">7 Carmine St,<br>New York, NY 10014</span></div>'
+    '<div data-attrid="kc:/collection/knowledge_panels/has_phone:phone"><span class="z5jxId">+1 212-366-1182</span></div>'
+    '<div class="CL9Uqc"><a href="https://www.google.com/url?q=https://www.joespizzanyc.com/&amp;sa=U">Website</a></div></div>'
+)
+
+
+def naive_business_fields(html):
+    """Plain BeautifulSoup on html.parser with per-call selectors, as a baseline"""
+    from bs4 import BeautifulSoup
+    from business_fields import FIELD_CLEANERS
+    from config import BUSINESS_SELECTORS
+
+    soup = BeautifulSoup(html, 'html.parser')
+    fields = {}
+    for field_name, selectors in BUSINESS_SELECTORS.items():
+        fields[field_name] = ''
+        for selector in selectors:
+            node = soup.select_one(selector)
+            if node is not None and node.get_text(strip=True):
+                link = node if node.name == 'a' else node.find('a', href=True)
+                raw = link['href'] if field_name == 'website' and link is not None else node.get_text(' ')
+                fields[field_name] = FIELD_CLEANERS[field_name](raw)
+                break
+    return fields
+
+
+def bench_field_extraction():
+    """Compare parser backends for business field extraction on large pages"""
+    from business_fields import available_backends, extract_business_fields
+
+    backends = available_backends()
+    print(f"🏢 Business fields: one parse per page, backends {', '.join(backends)}")
+    ok = True
+    for label, size in [("500 KB page", 500_000), ("2 MB page", 2_000_000)]:
+        # Panel at the end, so every selector has to search the whole tree
+        html = make_synthetic_html(size, maps_links_per_kb=0.1).replace('</body>', BUSINESS_PANEL + '</body>')
+        naive_time, expected = time_call(naive_business_fields, html, repeat=1)
+        print(f"   {label:12} {'html.parser baseline':20} {naive_time * 1000:8.1f} ms")
+        for backend in backends:
+            elapsed, fields = time_call(extract_business_fields, html, backend)
+            same = fields == expected
+            ok = ok and same
+            speedup = naive_time / elapsed if elapsed else float('inf')
+            print(f"   {label:12} {backend:20} {elapsed * 1000:8.1f} ms | {speedup:6.1f}x | "
+                  f"{'✅' if same else '❌ MISMATCH ' + str(fields)}")
+    return ok
+
+
+def make_lead_frame(rows, seed=7):
+    """Exported-leads DataFrame with the messy values scrapers produce"""
+    import pandas as pd
+
+    rng = random.Random(seed)
+    phone_formats = ['+1 (555) {:03d}-{:04d}', '555.{:03d}.{:04d}', '1-555-{:03d}-{:04d}', '555 {:03d} {:04d} ext 2']
+    website_formats = ['example{}.com', ' https://shop{}.com/ ', 'https://www.google.com/url?q=https://b{}.com/&sa=U']
+    return pd.DataFrame({
+        'Name': [f"  Business {i}  - Google Search" if i % 3 == 0 else f"Shop\n{i}" for i in range(rows)],
+        'Address': [f"Address: {i} Main St,\n  Springfield" if i % 2 else f"{i} Elm Ave" for i in range(rows)],
+        'Phone': [rng.choice(phone_formats).format(i % 1000, i % 10000) for i in range(rows)],
+        'Website': [rng.choice(website_formats).format(i) if i % 10 else None for i in range(rows)],
+    })
+
+
+def bench_data_cleaning():
+    """Compare row-by-row DataCleaner.apply against the Series methods"""
+    import pandas as pd
+    from utils import DataCleaner
+
+    print("🧹 Data cleaning: per-row apply vs whole-column methods")
+    scalar = {
+        'Name': DataCleaner.clean_business_name,
+        'Address': DataCleaner.clean_address,
+        'Phone': DataCleaner.clean_phone_number,
+        'Website': DataCleaner.clean_website_url,
+    }
+    df = make_lead_frame(100_000)
+    apply_time, expected = time_call(
+        lambda: pd.DataFrame({column: df[column].map(func, na_action='ignore').fillna('') for column, func in scalar.items()})
+    )
+    batch_time, cleaned = time_call(DataCleaner.clean_dataframe, df)
+    same = all(expected[column].tolist() == cleaned[column].tolist() for column in scalar)
+    speedup = apply_time / batch_time if batch_time else float('inf')
+    print(f"   100k rows   apply {apply_time * 1000:8.1f} ms | columns {batch_time * 1000:8.1f} ms | "
+          f"{speedup:5.1f}x | {'✅ identical' if same else '❌ MISMATCH'}")
+    return same
+
+
+# Reproducible suite: fixed fixtures, JSON results and regression checks between commits
+SUITE_VERSION = 1
+SUITE_SIZES = {'small': 50_000, '1mb': 1_000_000, '10mb': 10_000_000}  # Fixture page sizes in bytes
+SUITE_ROWS = {'small': 1_000, '1mb': 10_000, '10mb': 100_000}  # Lead rows cleaned at each size
+SUITE_DENSITIES = {'dense': 2.0, 'none': 0.0}  # Maps links per KB
+SUITE_URL_CALLS = 20_000  # Candidate URLs per clean_and_decode_url / is_maps_url case
+REGRESSION_THRESHOLD = 0.10  # Slowdown of a case's best run that --compare reports as a regression
+REGRESSION_MIN_SECONDS = 0.0005  # Smaller absolute changes are timing noise
+
+
+def percent_encode_links(html):
+    """The same page with its Maps links percent-encoded, as pages embed them in redirects and JSON
+
+    Every other sample URL becomes https%3A//..., the rest a Google redirect
+    whose target is fully encoded.
+    """
+    for i, url in enumerate(SAMPLE_MAPS_URLS):
+        if i % 2 == 0:
+            encoded = urllib.parse.quote(url, safe='/@,.+!=')
+        else:
+            encoded = 'https://www.google.com/url?q=' + urllib.parse.quote(url, safe='')
+        html = html.replace(f'href="{url}"', f'href="{encoded}"')
+    return html
+
+
+def build_corpus(sizes=SUITE_SIZES, fixtures_dir=None):
+    """{fixture name: html}: each size with dense, no and percent-encoded Maps links, plus saved pages
+
+    Synthetic fixtures are generated from fixed seeds, so every commit
+    benchmarks the same bytes. Saved pages are the *.html files in
+    fixtures_dir, named saved-<file name>.
+    """
+    corpus = {}
+    for size_name, size in sizes.items():
+        for density_name, density in SUITE_DENSITIES.items():
+            corpus[f'{size_name}-{density_name}'] = make_synthetic_html(size, maps_links_per_kb=density)
+        corpus[f'{size_name}-encoded'] = percent_encode_links(corpus[f'{size_name}-dense'])
+    if fixtures_dir:
+        for path in sorted(glob.glob(os.path.join(fixtures_dir, '*.htm*'))):
+            with open(path, encoding='utf-8', errors='replace') as f:
+                corpus['saved-' + os.path.splitext(os.path.basename(path))[0]] = f.read()
+    return corpus
+
+
+def make_url_candidates(corpus, count=SUITE_URL_CALLS):
+    """count URLs as they come out of page scans: Maps links, encoded ones and ordinary hrefs"""
+    from extraction import MAPS_URL_MATCHER
+
+    urls = set()
+    for html in corpus.values():
+        urls.update(MAPS_URL_MATCHER.scan(html[:200_000])[0])
+        urls.update(re.findall(r'href="([^"]+)"', html[:200_000]))
+    urls = sorted(urls)
+    return [urls[i % len(urls)] for i in range(count)] if urls else []
+
+
+def fingerprint(output):
+    """Short digest of a case's output, so --compare notices behavior changes as well as timings"""
+    if hasattr(output, 'maps_urls'):
+        output = output.maps_urls
+    elif hasattr(output, 'to_csv'):
+        output = output.to_csv(index=False)
+    # URL order follows set iteration, which changes between processes
+    text = output if isinstance(output, str) else '\n'.join(sorted(map(str, output)))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def measure(func, repeat):
+    """Wall times of repeat runs after a warm-up run, and the warm-up's output"""
+    output = func()
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    return runs, output
+
+
+def git_revision():
+    """Current commit, with +dirty when the tree has uncommitted changes; '' outside git"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                timeout=10).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True,
+                               text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ''
+    return commit + ('+dirty' if commit and dirty else '')
+
+
+def run_suite(sizes=SUITE_SIZES, repeat=5, fixtures_dir=None, verbose=True):
+    """Time every suite case offline and return the results as a JSON-ready dict
+
+    Page fetches go to a local stand-in server over an uncached session, and
+    metrics are switched off so neither the export file nor its bookkeeping
+    shows up in the numbers.
+    """
+    import http_client
+    import metrics
+    from engine import ExtractionEngine
+    from extraction import clean_and_decode_url, is_maps_url
+    from utils import DataCleaner, EmailExtractor
+
+    corpus = build_corpus(sizes, fixtures_dir)
+    candidates = make_url_candidates(corpus)
+    cleaned = [url for url in map(clean_and_decode_url, candidates) if url]
+    email_extractor = EmailExtractor()
+    engine = ExtractionEngine(browser_fallback=False, expand_short_links=False)
+
+    # (case name, callable, amount of work, unit)
+    cases = [(f'extract_urls_from_content[{name}]', functools.partial(engine.extract_urls_from_content, html),
+              len(html), 'bytes') for name, html in corpus.items()]
+    cases += [
+        (f'clean_and_decode_url[{len(candidates)} urls]',
+         lambda: [clean_and_decode_url(url) for url in candidates], len(candidates), 'calls'),
+        (f'is_maps_url[{len(cleaned)} urls]',
+         lambda: [url for url in cleaned if is_maps_url(url)], len(cleaned), 'calls'),
+    ]
+    for size_name, size in sizes.items():
+        text = make_email_text(size)[0]
+        cases.append((f'extract_emails_from_text[{size_name}]',
+                      functools.partial(email_extractor.extract_emails_from_text, text), len(text), 'bytes'))
+    for size_name in sizes:
+        df = make_lead_frame(SUITE_ROWS[size_name])
+        cases.append((f'DataCleaner.clean_dataframe[{len(df)} rows]',
+                      functools.partial(DataCleaner.clean_dataframe, df), len(df), 'rows'))
+
+    session = http_client.create_session(use_cache=False)
+    http_engine = ExtractionEngine(browser_fallback=False, expand_short_links=False, session=session)
+    # End-to-end fetches only for the dense pages; the other variants differ in scanning, covered above
+    pages = {f'/{name}': html for name, html in corpus.items() if name.endswith('-dense')}
+
+    results = {
+        'suite_version': SUITE_VERSION,
+        'commit': git_revision(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'fixtures': {name: {'bytes': len(html.encode('utf-8')),
+                            'sha256': hashlib.sha256(html.encode('utf-8')).hexdigest()[:16]}
+                     for name, html in corpus.items()},
+        'cases': {},
+    }
+    was_enabled = metrics.is_enabled()
+    metrics.set_enabled(False)
+    try:
+        with serve_pages(pages) as base_url:
+            cases += [(f'http_extract[{path[1:]}]', functools.partial(http_engine.extract, base_url + path),
+                       len(html), 'bytes') for path, html in pages.items()]
+            for name, func, work, unit in cases:
+                runs, output = measure(func, repeat)
+                if getattr(output, 'error', None):
+                    raise RuntimeError(f"{name} failed: {output.error}")
+                best = min(runs)
+                results['cases'][name] = {
+                    'best': best, 'median': statistics.median(runs), 'runs': runs,
+                    'work': work, 'unit': unit, 'output': fingerprint(output),
+                }
+                if verbose:
+                    print(f"   {name:48} {best * 1000:9.2f} ms | {format_rate(work, unit, best)}")
+    finally:
+        metrics.set_enabled(was_enabled)
+        session.close()
+    return results
+
+
+def format_rate(work, unit, seconds):
+    if not seconds:
+        return '-'
+    if unit == 'bytes':
+        return f"{work / seconds / 1e6:8.1f} MB/s"
+    return f"{work / seconds / 1e3:8.1f} k{unit}/s"
+
+
+def compare_results(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """(case, baseline time, current time, change, status) for every case in either run
+
+    Times are the best of each case's runs, like time_call, since the
+    minimum is the least disturbed by other load on the machine. A case
+    regresses when it is more than ``threshold`` and REGRESSION_MIN_SECONDS
+    slower, and also slower than the baseline's median run, so one lucky
+    baseline run is not enough. Its output fingerprint must also match, or
+    the case is reported as 'output changed'.
+    """
+    rows = []
+    old_cases, new_cases = baseline.get('cases', {}), current.get('cases', {})
+    for name in list(old_cases) + [name for name in new_cases if name not in old_cases]:
+        old, new = old_cases.get(name), new_cases.get(name)
+        if old is None or new is None:
+            rows.append((name, old and old['best'], new and new['best'], None, 'added' if old is None else 'removed'))
+            continue
+        change = new['best'] / old['best'] - 1 if old['best'] else 0.0
+        slower = new['best'] - old['best'] > REGRESSION_MIN_SECONDS and new['best'] > old['median']
+        faster = old['best'] - new['best'] > REGRESSION_MIN_SECONDS and old['best'] > new['median']
+        if old.get('output') != new.get('output'):
+            status = 'output changed'
+        elif change > threshold and slower:
+            status = 'regression'
+        elif change < -threshold and faster:
+            status = 'faster'
+        else:
+            status = 'ok'
+        rows.append((name, old['best'], new['best'], change, status))
+    return rows
+
+
+def report_comparison(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """Print the comparison table; True when nothing regressed or changed output"""
+    print(f"📊 {baseline.get('commit') or 'baseline'} → {current.get('commit') or 'current'} "
+          f"(regression above {threshold:.0%})")
+    changed_fixtures = [name for name, fixture in current.get('fixtures', {}).items()
+                        if name in baseline.get('fixtures', {}) and baseline['fixtures'][name] != fixture]
+    if changed_fixtures:
+        print(f"   ⚠️ Fixtures differ between runs, timings not comparable: {', '.join(changed_fixtures)}")
+    icons = {'ok': '✅', 'faster': '🚀', 'regression': '❌', 'output changed': '❌', 'added': '➕', 'removed': '➖'}
+    ok = not changed_fixtures
+    for name, old, new, change, status in compare_results(baseline, current, threshold):
+        ok = ok and status not in ('regression', 'output changed')
+        timing = (f"{old * 1000:9.2f} ms → {new * 1000:9.2f} ms {change:+7.1%}" if change is not None
+                  else f"{(old or new) * 1000:9.2f} ms")
+        print(f"   {icons[status]} {name:48} {timing} | {status}")
+    return ok
+
+
+def run_suite_cli(args):
+    """--suite and --compare: time the suite, save it and check it against a baseline"""
+    if args.compare and len(args.compare) == 2:
+        with open(args.compare[0], encoding='utf-8') as f:
+            baseline = json.load(f)
+        with open(args.compare[1], encoding='utf-8') as f:
+            current = json.load(f)
+        return report_comparison(baseline, current, args.threshold)
+
+    sizes = {name: SUITE_SIZES[name] for name in args.sizes.split(',')}
+    print(f"⏱️ Benchmark suite: {', '.join(sizes)} fixtures, {args.repeat} runs per case")
+    current = run_suite(sizes, args.repeat, args.fixtures)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+    if not args.compare:
+        return True
+    with open(args.compare[0], encoding='utf-8') as f:
+        baseline = json.load(f)
+    print()
+    return report_comparison(baseline, current, args.threshold)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Lead Generation Agent benchmarks")
+    parser.add_argument('--suite', action='store_true', help="Run the reproducible suite instead of the comparisons")
+    parser.add_argument('-o', '--output', help="Write suite results to this JSON file")
+    parser.add_argument('--compare', nargs='+', metavar='RESULTS',
+                        help="Baseline JSON to check a fresh suite run against, or baseline and current JSON files")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="Slowdown of a case's best run reported as a regression (0.10 = 10%%)")
+    parser.add_argument('--sizes', default=','.join(SUITE_SIZES),
+                        help=f"Fixture sizes to include, from {', '.join(SUITE_SIZES)}")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per case, after one warm-up")
+    parser.add_argument('--fixtures', help="Directory of saved .html pages added to the corpus")
+    return parser
+
+
+def main(argv=None):
+    """Run all benchmarks, or the suite when asked for"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.compare and len(args.compare) > 2:
+        parser.error("--compare takes a baseline and at most one current results file")
+    unknown = set(args.sizes.split(',')) - set(SUITE_SIZES)
+    if unknown:
+        parser.error(f"unknown fixture sizes: {', '.join(sorted(unknown))}")
+    if args.suite or args.compare:
+        return run_suite_cli(args)
+
+    print("⏱️ Lead Generation Agent Benchmarks")
+    print("=" * 50)
+
+    benchmarks = [
+        ("URL Matcher", bench_url_matcher),
+        ("Streaming Scan", bench_streaming_scan),
+        ("Batch Throughput", bench_batch_throughput),
+        ("Fetch Backends", bench_fetch_backends),
+        ("Email Enrichment", bench_email_enrichment),
+        ("Email Scan", bench_email_scan),
+        ("User Agents", bench_user_agents),
+        ("Diagnostics", bench_diagnostics),
+        ("Instrumentation", bench_instrumentation),
+        ("Scan Pool", bench_scan_processes),
+        ("Field Extraction", bench_field_extraction),
+        ("Data Cleaning", bench_data_cleaning),
+    ]
+
+    results = []
+    for name, func in benchmarks:
+        print(f"\n📋 Running {name} benchmark...")
+        try:
+            results.append((name, func()))
+        except Exception as e:
+            print(f"❌ {name} benchmark failed: {str(e)}")
+            results.append((name, False))
+
+    print("\n" + "=" * 50)
+    for name, result in results:
+        print(f"{'✅ OK' if result else '❌ FAIL'} {name}")
+
+    return all(result for _, result in results)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,235 @@
+"""
+Lead Generation Agent - Business Fields
+Name, address, phone and website from a business page, parsed once per page
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
+from urllib.parse import urljoin
+
+import http_client
+from config import BUSINESS_SELECTORS, FIELD_PARSER_BACKEND, REQUEST_TIMEOUT, ENRICH_MAX_WORKERS
+from extraction import REQUEST_HEADERS
+from utils import DataCleaner
+
+FIELD_CLEANERS: Dict[str, Callable[[str], str]] = {
+    'name': DataCleaner.clean_business_name,
+    'address': DataCleaner.clean_address,
+    'phone': DataCleaner.clean_phone_number,
+    'website': DataCleaner.clean_website_url,
+}
+
+Markup = Union[str, bytes]
+
+
+class _LexborTree:
+    """selectolax (lexbor): fastest parser, CSS matching in C"""
+    name = 'selectolax'
+
+    def __init__(self, html: Markup):
+        from selectolax.lexbor import LexborHTMLParser
+        self.root = LexborHTMLParser(html)
+
+    def first(self, selector: str):
+        return self.root.css_first(selector)
+
+    @staticmethod
+    def text(node) -> str:
+        return node.text(separator=' ')
+
+    @staticmethod
+    def href(node) -> Optional[str]:
+        link = node if node.tag == 'a' else node.css_first('a[href]')
+        return link.attributes.get('href') if link is not None else None
+
+
+@lru_cache(maxsize=None)
+def _compiled_xpath(selector: str):
+    """CSS selector translated to XPath and compiled once per process"""
+    from cssselect import HTMLTranslator
+    from lxml import etree
+    return etree.XPath(HTMLTranslator().css_to_xpath(selector))
+
+
+class _LxmlTree:
+    """lxml with cssselect: libxml2 parsing, selectors compiled to XPath"""
+    name = 'lxml'
+
+    def __init__(self, html: Markup):
+        import lxml.html
+        if isinstance(html, str):
+            # lxml rejects str input that carries an XML encoding declaration
+            self.root = lxml.html.document_fromstring(html.encode('utf-8'),
+                                                      parser=lxml.html.HTMLParser(encoding='utf-8'))
+        else:
+            self.root = lxml.html.document_fromstring(html)
+
+    def first(self, selector: str):
+        matches = _compiled_xpath(selector)(self.root)
+        return matches[0] if matches else None
+
+    @staticmethod
+    def text(node) -> str:
+        return ' '.join(node.itertext())
+
+    @staticmethod
+    def href(node) -> Optional[str]:
+        if node.tag == 'a' and node.get('href'):
+            return node.get('href')
+        links = node.xpath('.//a[@href]')
+        return links[0].get('href') if links else None
+
+
+@lru_cache(maxsize=None)
+def _compiled_soupsieve(selector: str):
+    import soupsieve
+    return soupsieve.compile(selector)
+
+
+class _SoupTree:
+    """BeautifulSoup fallback, on lxml's tree builder when lxml is installed"""
+    name = 'bs4'
+
+    def __init__(self, html: Markup):
+        from bs4 import BeautifulSoup
+        self.root = BeautifulSoup(html, 'lxml' if backend_available('lxml_builder') else 'html.parser')
+
+    def first(self, selector: str):
+        return _compiled_soupsieve(selector).select_one(self.root)
+
+    @staticmethod
+    def text(node) -> str:
+        return node.get_text(' ')
+
+    @staticmethod
+    def href(node) -> Optional[str]:
+        link = node if node.name == 'a' and node.get('href') else node.find('a', href=True)
+        return link.get('href') if link is not None else None
+
+
+_TREES = {tree.name: tree for tree in (_LexborTree, _LxmlTree, _SoupTree)}
+# Fastest first; the first one installed is the default
+BACKEND_ORDER = ('selectolax', 'lxml', 'bs4')
+_BACKEND_MODULES = {
+    'selectolax': ('selectolax.lexbor',),
+    'lxml': ('lxml.html', 'cssselect'),
+    'bs4': ('bs4',),
+    'lxml_builder': ('lxml',),
+}
+
+
+@lru_cache(maxsize=None)
+def backend_available(backend: str) -> bool:
+    try:
+        for module in _BACKEND_MODULES[backend]:
+            __import__(module)
+    except ImportError:
+        return False
+    return True
+
+
+def available_backends() -> List[str]:
+    return [backend for backend in BACKEND_ORDER if backend_available(backend)]
+
+
+def default_backend() -> str:
+    """FIELD_PARSER_BACKEND if it is installed, else the fastest installed parser"""
+    if FIELD_PARSER_BACKEND and backend_available(FIELD_PARSER_BACKEND):
+        return FIELD_PARSER_BACKEND
+    backends = available_backends()
+    if not backends:
+        raise ImportError("No HTML parser installed: install selectolax, lxml + cssselect or beautifulsoup4")
+    return backends[0]
+
+
+class BusinessPage:
+    """Business fields of one page, from a DOM built on first access
+
+    The markup is parsed once, by the first field lookup, and every field's
+    ``BUSINESS_SELECTORS`` fallbacks run against that tree in order; the
+    first selector whose element has any text wins. Values go through the
+    matching ``DataCleaner`` function and are cached per field.
+    """
+
+    def __init__(self, html: Markup, backend: Optional[str] = None,
+                 selectors: Optional[Dict[str, List[str]]] = None, base_url: str = ''):
+        self.html = html
+        self.base_url = base_url  # resolves relative website links such as Google's /url?q=
+        self.backend = backend or default_backend()
+        self.selectors = selectors if selectors is not None else BUSINESS_SELECTORS
+        self._tree = None
+        self._values: Dict[str, str] = {}
+        self.matched: Dict[str, str] = {}  # field -> selector that produced it
+
+    @property
+    def tree(self):
+        if self._tree is None:
+            self._tree = _TREES[self.backend](self.html)
+            self.html = None  # the tree holds everything we need
+        return self._tree
+
+    def get(self, field_name: str) -> str:
+        if field_name not in self._values:
+            self._values[field_name] = self._extract(field_name)
+        return self._values[field_name]
+
+    def _extract(self, field_name: str) -> str:
+        tree = self.tree
+        for selector in self.selectors.get(field_name, ()):
+            node = tree.first(selector)
+            if node is None:
+                continue
+            href = tree.href(node) if field_name == 'website' else None
+            raw = urljoin(self.base_url, href) if href else tree.text(node)
+            if raw and raw.strip():
+                self.matched[field_name] = selector
+                cleaner = FIELD_CLEANERS.get(field_name)
+                return cleaner(raw) if cleaner else ' '.join(raw.split())
+        return ''
+
+    def fields(self) -> Dict[str, str]:
+        return {field_name: self.get(field_name) for field_name in self.selectors}
+
+
+def extract_business_fields(html: Markup, backend: Optional[str] = None, base_url: str = '') -> Dict[str, str]:
+    """All ``BUSINESS_SELECTORS`` fields of a page; missing fields are empty strings"""
+    return BusinessPage(html, backend, base_url=base_url).fields()
+
+
+class BusinessFieldFetcher:
+    """Fetch business pages concurrently and extract their fields
+
+    Pages come from the shared pooled session (and its response cache);
+    results are yielded in input order with 'URL' and 'Error' columns added.
+    """
+
+    def __init__(self, max_workers: int = ENRICH_MAX_WORKERS, timeout: float = REQUEST_TIMEOUT,
+                 session=None, rate_limiter=None, backend: Optional[str] = None):
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.session = session
+        self.rate_limiter = rate_limiter
+        self.backend = backend or default_backend()
+
+    def fetch(self, url: str) -> Dict[str, str]:
+        row = {'URL': url, **dict.fromkeys(BUSINESS_SELECTORS, ''), 'Error': ''}
+        try:
+            session = self.session or http_client.get_session()
+            if self.rate_limiter:
+                self.rate_limiter.wait(url)
+            response = session.get(url, headers=REQUEST_HEADERS, timeout=self.timeout)
+            if self.rate_limiter:
+                self.rate_limiter.record_response(url, response.status_code, response.headers)
+            response.raise_for_status()
+            row.update(BusinessPage(response.content, self.backend, base_url=response.url).fields())
+        except Exception as e:
+            row['Error'] = f"{type(e).__name__}: {e}"
+        return row
+
+    def iter_fields(self, urls: Iterable[str]) -> Iterator[Dict[str, str]]:
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls))) as pool:
+            yield from pool.map(self.fetch, urls)
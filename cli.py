@@ -0,0 +1,127 @@
+"""
+Lead Generation Agent - Command Line
+Headless batch extraction for cron jobs and workers, writing JSONL or CSV
+"""
+
+import argparse
+import csv
+import json
+import sys
+from typing import List, Optional
+
+import metrics
+from batch import BatchExtractor, parse_page_urls
+from async_fetch import FETCH_BACKENDS
+from config import BATCH_MAX_WORKERS, BATCH_PER_HOST_LIMIT, BATCH_MAX_PAGES, FETCH_BACKEND, SCAN_PROCESSES
+from place_index import get_place_index
+from utils import HostRateLimiter
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Extract Google Maps URLs from web pages without the Streamlit UI."
+    )
+    parser.add_argument('urls', nargs='*', help="Page URLs to extract from")
+    parser.add_argument('-i', '--input', help="Text or CSV file of page URLs ('-' for stdin)")
+    parser.add_argument('-o', '--output', help="Output file (default: stdout)")
+    parser.add_argument('-f', '--format', choices=['jsonl', 'csv'],
+                        help="jsonl: one record per page as it finishes; csv: one row per unique Maps URL "
+                             "(default: from the output extension, else jsonl)")
+    parser.add_argument('--workers', type=int, default=BATCH_MAX_WORKERS, help="Pages fetched concurrently")
+    parser.add_argument('--per-host', type=int, default=BATCH_PER_HOST_LIMIT, help="Pages fetched concurrently per host")
+    parser.add_argument('--limit', type=int, default=BATCH_MAX_PAGES, help="Maximum page URLs read from --input")
+    parser.add_argument('--scan-processes', type=int, default=SCAN_PROCESSES,
+                        help="Decode, scan and clean pages in this many worker processes (0 = in the fetch threads)")
+    parser.add_argument('--backend', choices=FETCH_BACKENDS, default=FETCH_BACKEND,
+                        help="aiohttp/httpx: fetch every page on one asyncio event loop, HTTP only; "
+                             "httpx adds HTTP/2 (default: %(default)s)")
+    parser.add_argument('--no-stream', action='store_true', help="Buffer whole pages instead of scanning while downloading")
+    parser.add_argument('--no-browser', action='store_true', help="Never escalate JavaScript-built pages to headless Chrome")
+    parser.add_argument('--no-short-links', action='store_true', help="Leave goo.gl / maps.app.goo.gl links unexpanded")
+    parser.add_argument('--polite', action='store_true', help="Rate-limit requests per host and back off on HTTP 429")
+    parser.add_argument('--new-only', action='store_true', help="Drop places already found in earlier runs")
+    parser.add_argument('--metrics-file', help="Write per-stage timings and counters here in Prometheus text format")
+    parser.add_argument('-q', '--quiet', action='store_true', help="No progress on stderr")
+    return parser
+
+
+def read_page_urls(args) -> List[str]:
+    page_urls = list(args.urls)
+    if args.input:
+        if args.input == '-':
+            text = sys.stdin.read()
+        else:
+            with open(args.input, encoding='utf-8', errors='replace') as f:
+                text = f.read()
+        page_urls += parse_page_urls(text, limit=args.limit)
+    return list(dict.fromkeys(page_urls))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    page_urls = read_page_urls(args)
+    if not page_urls:
+        parser.error("no page URLs given (pass URLs or --input)")
+
+    output_format = args.format or ('csv' if (args.output or '').lower().endswith('.csv') else 'jsonl')
+    index = get_place_index() if args.new_only else None
+
+    extractor = BatchExtractor(
+        max_workers=args.workers,
+        per_host_limit=args.per_host,
+        streaming=not args.no_stream,
+        rate_limiter=HostRateLimiter() if args.polite else None,
+        browser_fallback=not args.no_browser,
+        expand_short_links=not args.no_short_links,
+        scan_processes=args.scan_processes,
+        backend=args.backend,
+    )
+
+    out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    try:
+        def on_result(page, done, total):
+            if output_format == 'jsonl':
+                maps_urls = index.filter_new(page.maps_urls) if index else page.maps_urls
+                with metrics.stage('export'):
+                    out.write(json.dumps({
+                        'page_url': page.page_url,
+                        'maps_urls': maps_urls,
+                        'tier': page.tier,
+                        'error': page.error,
+                        'elapsed': round(page.elapsed, 3),
+                    }) + '\n')
+                    out.flush()
+            if not args.quiet:
+                outcome = f"error: {page.error}" if page.error else f"{len(page.maps_urls)} URLs ({page.tier})"
+                print(f"[{done}/{total}] {page.page_url} - {outcome}", file=sys.stderr)
+
+        result = extractor.extract(page_urls, on_result=on_result)
+
+        if output_format == 'csv':
+            rows = result.to_rows()
+            if index:
+                new_urls = set(index.filter_new([row['Google Maps URL'] for row in rows]))
+                rows = [row for row in rows if row['Google Maps URL'] in new_urls]
+            with metrics.stage('export'):
+                writer = csv.DictWriter(out, fieldnames=['Google Maps URL', 'Source Pages'])
+                writer.writeheader()
+                writer.writerows(rows)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    if args.metrics_file:
+        metrics.get_registry().write(args.metrics_file)
+    if not args.quiet:
+        stages = ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds, _ in metrics.stage_breakdown(result.metrics))
+        if stages:
+            print(f"Worker time by stage: {stages}", file=sys.stderr)
+        print(f"Done: {len(result.sources)} unique Maps URLs from {len(result.pages)} pages "
+              f"({len(result.failed_pages)} failed) in {result.elapsed:.1f}s", file=sys.stderr)
+    return 1 if len(result.failed_pages) == len(result.pages) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,6 +15,70 @@ MIN_RESULTS_LIMIT = 10
 MIN_DELAY = 1.0  # Minimum delay between requests (seconds)
 MAX_DELAY = 3.0  # Maximum delay between requests (seconds)
 REQUEST_TIMEOUT = 10  # Request timeout (seconds)
+RATE_LIMIT_PER_HOST = 2.0  # Sustained requests per second to any one host
+RATE_LIMIT_BURST = 4  # Requests a host may receive back to back before the rate applies
+RATE_LIMIT_JITTER = 0.25  # Random extra delay per request (seconds)
+RATE_LIMIT_MIN_RATE = 0.1  # Floor for a host's rate after repeated 429s
+
+# Streaming Extraction
+STREAM_CHUNK_SIZE = 64 * 1024  # Bytes read from the response per chunk
+DIAGNOSTIC_SAMPLE_CHARS = 5000  # Page prefix kept for debug analysis when streaming
+
+# Shared HTTP Client
+HTTP_POOL_CONNECTIONS = 50  # Distinct hosts kept in the connection pool cache
+HTTP_POOL_MAXSIZE = 8  # Keep-alive connections kept per host
+HTTP_RETRIES = 2  # Retries for connection errors and 500/502/504; 429 and 503 go to the rate limiter
+HTTP_BACKOFF_FACTOR = 0.5  # Exponential backoff between retries (seconds)
+
+# Async HTTP Client (pip install aiohttp, or "httpx[http2]" for HTTP/2)
+FETCH_BACKEND = os.getenv('FETCH_BACKEND', 'requests')  # 'requests' (a thread per page), or 'aiohttp' / 'httpx' (asyncio, batches only)
+ASYNC_MAX_CONNECTIONS = 100  # Open connections across all hosts
+ASYNC_KEEPALIVE_CONNECTIONS = 20  # Idle keep-alive connections kept for reuse
+
+# HTTP Response Cache
+HTTP_CACHE_ENABLED = True
+HTTP_CACHE_PATH = os.path.join('.cache', 'http_cache.sqlite')
+HTTP_CACHE_TTL = 6 * 60 * 60  # Seconds before an entry must be revalidated
+HTTP_CACHE_MAX_BYTES = 512 * 1024 * 1024  # Compressed size bound before LRU eviction
+HTTP_CACHE_MAX_ENTRY_BYTES = 16 * 1024 * 1024  # Larger bodies are streamed but not cached
+
+# Batch Extraction
+BATCH_MAX_WORKERS = 8  # Pages fetched concurrently across all hosts
+BATCH_PER_HOST_LIMIT = 2  # Pages fetched concurrently from any one host
+BATCH_MAX_PAGES = 1000  # Input URLs accepted per batch
+
+# Tiered Fetching (HTTP first, browser only when the page needs rendering)
+TIER_ESCALATE_SCORE = 0.5  # HTTP pages scoring at or above this are re-fetched in the browser
+TIER_LINK_CREDIT = 0.5  # Score taken off when the raw HTML already has Maps URLs
+TIER_MIN_TEXT_RATIO = 0.05  # Less visible text than this share of the HTML suggests a JS shell
+TIER_MEMORY_PATH = os.path.join('.cache', 'tier_memory.json')  # Per-domain tier decisions
+TIER_MEMORY_TTL = 7 * 24 * 60 * 60  # Seconds before a domain's remembered tier is re-probed
+
+# Place Deduplication
+PLACE_INDEX_PATH = os.path.join('.cache', 'place_index.sqlite')  # Places seen across runs
+PLACE_COORD_DECIMALS = 4  # Coordinate precision in place keys (~11 m)
+
+# Short Link Expansion (goo.gl/maps, maps.app.goo.gl)
+SHORT_LINK_MAX_WORKERS = 8  # Short links resolved concurrently
+SHORT_LINK_TIMEOUT = 5  # Seconds per redirect hop
+SHORT_LINK_MAX_REDIRECTS = 5  # Hops followed before giving up
+SHORT_LINK_CACHE_PATH = os.path.join('.cache', 'short_links.sqlite')  # Resolutions kept forever
+
+# Background Jobs
+JOB_DB_PATH = os.path.join('.cache', 'jobs.sqlite')  # Job table shared by every session
+JOB_WORKERS = 2  # Jobs run at the same time (a batch job fetches its pages concurrently on top)
+JOB_POLL_INTERVAL = 1.0  # Seconds between progress refreshes in the UI and queue checks in the runner
+JOB_RESULT_TTL = 60 * 60  # Seconds an identical finished job is served instead of running again
+JOB_HISTORY_LIMIT = 10  # Recent jobs listed in the UI
+
+# Process Pool Scanning
+SCAN_PROCESSES = int(os.getenv('SCAN_PROCESSES', '0'))  # Worker processes that decode, scan and clean batch pages; 0 scans in the fetch threads
+
+# Metrics
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') != '0'  # Per-stage timings and counters for every extraction
+METRICS_FILE = os.path.join('.cache', 'metrics.prom')  # Prometheus text export; empty disables the file
+METRICS_FILE_INTERVAL = 5.0  # Seconds between rewrites of METRICS_FILE (also written at exit)
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))  # Serve /metrics on 127.0.0.1 at this port; 0 disables
 
 # Chrome Driver Options
 CHROME_OPTIONS = [
@@ -28,8 +92,25 @@ CHROME_OPTIONS = [
     "--disable-default-apps",
 ]
 
+# Browser Pool
+DRIVER_POOL_SIZE = 2  # Warm headless Chrome instances kept per option set
+DRIVER_MAX_PAGES = 50  # Recycle a browser after this many extractions
+DRIVER_MAX_JS_HEAP_MB = 512  # Recycle a browser whose JS heap grows past this
+DRIVER_ACQUIRE_TIMEOUT = 120  # Seconds to wait for a free browser
+CHROMEDRIVER_PATH = os.getenv('CHROMEDRIVER_PATH', '')  # Skip webdriver_manager entirely when set
+CHROMEDRIVER_PATH_CACHE = os.path.join('.cache', 'chromedriver_path')  # Resolved path reused across restarts
+
+# Adaptive Page Loading (Selenium)
+ADAPTIVE_LOAD_BUDGET = 15.0  # Seconds allowed for load + scrolling before giving up
+ADAPTIVE_SETTLE_TIME = 0.75  # Page counts as idle after this long with no DOM/network change
+ADAPTIVE_POLL_INTERVAL = 0.25  # Seconds between readiness checks
+ADAPTIVE_MAX_SCROLLS = 10  # Upper bound on scrolls while new links keep appearing
+FIXED_LOAD_SCHEDULE = 3 + 3 * 2  # Seconds the fixed wait (3s + 3 scrolls x 2s) always costs
+
 # User Agents for rotation
-USER_AGENTS = [
+USER_AGENTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'user_agents.json')  # Weighted pool, read once
+USER_AGENT_PER_HOST = True  # Keep one user agent per site instead of a new one per request
+USER_AGENTS = [  # Fallback when USER_AGENTS_FILE cannot be read
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
     "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
@@ -48,6 +129,17 @@ BUSINESS_EMAIL_PATTERNS = [
     'inquiry@', 'service@', 'help@'
 ]
 
+EMAIL_IGNORED_TLDS = ['png', 'jpg', 'jpeg', 'gif', 'svg', 'webp', 'css', 'js']  # Asset names such as logo@2x.png
+
+# Email Enrichment
+ENRICH_MAX_WORKERS = 16  # Page probes in flight across all websites
+ENRICH_PER_DOMAIN_LIMIT = 2  # Page probes in flight against any one domain
+ENRICH_HOMEPAGE_TIMEOUT = 10  # Seconds, matches EmailExtractor.extract_from_website
+ENRICH_PROBE_TIMEOUT = 5  # Seconds for /contact, /contact-us and /about probes
+
+# Business Field Extraction
+FIELD_PARSER_BACKEND = os.getenv('FIELD_PARSER_BACKEND', '')  # selectolax, lxml or bs4; empty picks the fastest installed
+
 # CSS Selectors for business information
 BUSINESS_SELECTORS = {
     'name': [
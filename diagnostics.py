@@ -0,0 +1,113 @@
+"""
+Lead Generation Agent - Page Diagnostics
+Content statistics for debugging empty extractions, computed once and off the hot path
+"""
+
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+KEYWORDS = ('google', 'maps', 'http', 'href=')
+BUSINESS_TERMS = ('restaurant', 'business', 'address', 'phone', 'location', 'directory')
+
+QUALITY_SAMPLE = 500  # Characters checked for non-ASCII noise
+CONTENT_SAMPLE = 2000  # Characters shown and checked for readability and business terms
+URL_SAMPLE = 5000  # Characters searched for URLs of any kind
+
+_ANY_URL = re.compile(r'https?://[^\s"\'<>\)]+')
+# ASCII control bytes; every other ASCII byte is printable
+_CONTROL_BYTES = bytes(range(0x20)) + b'\x7f'
+
+
+@dataclass
+class PageDiagnostics:
+    """What a page looks like, for explaining why it yielded no Maps URLs"""
+    page_length: int
+    keyword_counts: Dict[str, int] = field(default_factory=dict)
+    quality: float = 1.0  # Share of the first QUALITY_SAMPLE characters that are ASCII
+    readability: float = 0.0  # Share of the content sample that is printable ASCII
+    business_terms: List[str] = field(default_factory=list)
+    sample: str = ''
+    urls: List[str] = field(default_factory=list)
+
+    @property
+    def google_urls(self) -> List[str]:
+        return [url for url in self.urls if 'google' in url.lower()]
+
+    @property
+    def maps_urls(self) -> List[str]:
+        return [url for url in self.urls if 'maps' in url.lower()]
+
+
+def analyze_page(page_source: str) -> PageDiagnostics:
+    """All diagnostics of a page from a single lowercased copy
+
+    Keyword counts need the whole document, so it is lowercased once and
+    every count reuses that copy. Everything else only looks at the first
+    few KB. The character-class ratios are computed with
+    encode/translate instead of a Python loop.
+    """
+    lowered = page_source.lower()
+    sample = page_source[:CONTENT_SAMPLE]
+    quality_sample = page_source[:QUALITY_SAMPLE]
+
+    non_ascii = len(quality_sample) - len(quality_sample.encode('ascii', 'ignore'))
+    printable = len(sample.encode('ascii', 'ignore').translate(None, _CONTROL_BYTES))
+    lowered_sample = lowered[:CONTENT_SAMPLE] if len(lowered) == len(page_source) else sample.lower()
+
+    return PageDiagnostics(
+        page_length=len(page_source),
+        keyword_counts={keyword: lowered.count(keyword) for keyword in KEYWORDS},
+        quality=(QUALITY_SAMPLE - non_ascii) / QUALITY_SAMPLE,
+        readability=printable / len(sample) if sample else 0.0,
+        business_terms=[term for term in BUSINESS_TERMS if term in lowered_sample],
+        sample=sample,
+        urls=_ANY_URL.findall(page_source, 0, URL_SAMPLE),
+    )
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='diagnostics')
+    return _executor
+
+
+class LazyDiagnostics:
+    """Diagnostics of one page, computed at most once and only when asked for
+
+    ``start`` runs the analysis on a background thread so it overlaps with
+    other work, such as short link expansion. ``get`` returns the result,
+    waiting for that thread or computing inline if it was never started.
+    The page source is released once the analysis has run.
+    """
+
+    def __init__(self, page_source: str):
+        self._page_source: Optional[str] = page_source
+        self._future: Optional[Future] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> 'LazyDiagnostics':
+        with self._lock:
+            if self._future is None:
+                self._future = _get_executor().submit(self._analyze)
+        return self
+
+    def _analyze(self) -> PageDiagnostics:
+        page_source, self._page_source = self._page_source, None
+        return analyze_page(page_source or '')
+
+    def get(self) -> PageDiagnostics:
+        with self._lock:
+            if self._future is None:
+                self._future = Future()
+                self._future.set_result(self._analyze())
+        return self._future.result()
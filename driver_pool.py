@@ -0,0 +1,238 @@
+"""
+Lead Generation Agent - Browser Pool
+Warm, reusable headless Chrome instances shared across extractions
+"""
+
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from config import (
+    DRIVER_POOL_SIZE, DRIVER_MAX_PAGES, DRIVER_MAX_JS_HEAP_MB, DRIVER_ACQUIRE_TIMEOUT,
+    CHROMEDRIVER_PATH, CHROMEDRIVER_PATH_CACHE,
+)
+
+_driver_path: Optional[str] = None
+_driver_path_lock = threading.Lock()
+
+
+def get_chromedriver_path() -> str:
+    """Resolve the chromedriver binary once per process
+
+    Order: CHROMEDRIVER_PATH env var, the path saved by a previous run,
+    then webdriver_manager (whose result is saved for next time).
+    """
+    global _driver_path
+    if _driver_path:
+        return _driver_path
+
+    with _driver_path_lock:
+        if _driver_path:
+            return _driver_path
+
+        path = CHROMEDRIVER_PATH
+        if not path and os.path.exists(CHROMEDRIVER_PATH_CACHE):
+            with open(CHROMEDRIVER_PATH_CACHE) as f:
+                saved = f.read().strip()
+            if saved and os.path.exists(saved):
+                path = saved
+
+        if not path:
+            from webdriver_manager.chrome import ChromeDriverManager
+            path = ChromeDriverManager().install()
+            os.makedirs(os.path.dirname(os.path.abspath(CHROMEDRIVER_PATH_CACHE)), exist_ok=True)
+            with open(CHROMEDRIVER_PATH_CACHE, 'w') as f:
+                f.write(path)
+
+        _driver_path = path
+        return path
+
+
+class _PooledDriver:
+    """A browser plus the bookkeeping used to decide when to recycle it"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        self.created = time.time()
+
+
+class DriverPool:
+    """Bounded pool of warm headless Chrome instances
+
+    ``acquire()`` hands out an idle browser (after a health check) or starts
+    a new one while fewer than ``max_size`` exist. ``release()`` clears
+    cookies and site storage, resets the browser to about:blank and returns
+    it, unless it has served ``max_pages`` extractions or its JS heap has
+    grown past ``max_heap_mb``, in which case it is quit and replaced on the
+    next acquire.
+    """
+
+    def __init__(self, arguments: Sequence[str], max_size: int = DRIVER_POOL_SIZE,
+                 max_pages: int = DRIVER_MAX_PAGES, max_heap_mb: int = DRIVER_MAX_JS_HEAP_MB,
+                 page_load_timeout: int = 30):
+        self.arguments = list(arguments)
+        self.max_size = max(1, max_size)
+        self.max_pages = max_pages
+        self.max_heap_mb = max_heap_mb
+        self.page_load_timeout = page_load_timeout
+        self._idle: List[_PooledDriver] = []
+        self._leased: Dict[int, _PooledDriver] = {}
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._lock = threading.Lock()
+        self.stats = dict.fromkeys(['created', 'reused', 'recycled', 'unhealthy'], 0)
+
+    def _start_driver(self) -> _PooledDriver:
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+
+        chrome_options = Options()
+        for argument in self.arguments:
+            chrome_options.add_argument(argument)
+        driver = webdriver.Chrome(service=Service(get_chromedriver_path()), options=chrome_options)
+        driver.set_page_load_timeout(self.page_load_timeout)
+        self._count('created')
+        return _PooledDriver(driver)
+
+    def _count(self, stat: str):
+        # Fetch threads acquire and release concurrently
+        with self._lock:
+            self.stats[stat] += 1
+
+    @staticmethod
+    def _is_healthy(pooled: _PooledDriver) -> bool:
+        try:
+            return pooled.driver.execute_script('return 1') == 1
+        except Exception:
+            return False
+
+    def _heap_mb(self, pooled: _PooledDriver) -> float:
+        try:
+            used = pooled.driver.execute_script(
+                'return window.performance && performance.memory ? performance.memory.usedJSHeapSize : 0'
+            )
+            return (used or 0) / (1024 * 1024)
+        except Exception:
+            return 0.0
+
+    @staticmethod
+    def _reset(driver):
+        """Clear what the last extraction left behind before the next one borrows the browser"""
+        # WebDriver's delete_all_cookies only reaches the current page's domain;
+        # CDP clears every site's cookies
+        try:
+            driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+        except Exception:
+            driver.delete_all_cookies()
+        # Storage is per origin, so clear the page's own before leaving it
+        origin = driver.execute_script('return window.location.origin')
+        if origin and origin != 'null':
+            try:
+                driver.execute_cdp_cmd('Storage.clearDataForOrigin', {'origin': origin, 'storageTypes': 'all'})
+            except Exception:
+                driver.execute_script('try { localStorage.clear(); sessionStorage.clear(); } catch (e) {}')
+        driver.get('about:blank')
+
+    @staticmethod
+    def _quit(pooled: _PooledDriver):
+        try:
+            pooled.driver.quit()
+        except Exception:
+            pass
+
+    def acquire(self, timeout: float = DRIVER_ACQUIRE_TIMEOUT):
+        """Borrow a driver; blocks while all ``max_size`` browsers are in use"""
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No browser free after {timeout}s ({self.max_size} in use)")
+
+        try:
+            while True:
+                with self._lock:
+                    pooled = self._idle.pop() if self._idle else None
+                if pooled is None:
+                    pooled = self._start_driver()
+                    break
+                if self._is_healthy(pooled):
+                    self._count('reused')
+                    break
+                self._count('unhealthy')
+                self._quit(pooled)
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._leased[id(pooled.driver)] = pooled
+        return pooled.driver
+
+    def release(self, driver):
+        """Return a borrowed driver, recycling it if it is worn out"""
+        with self._lock:
+            pooled = self._leased.pop(id(driver), None)
+        if pooled is None:
+            return
+
+        try:
+            pooled.pages += 1
+            worn_out = pooled.pages >= self.max_pages or self._heap_mb(pooled) > self.max_heap_mb
+            if worn_out:
+                self._count('recycled')
+                self._quit(pooled)
+                return
+            try:
+                self._reset(driver)
+            except Exception:
+                self._count('unhealthy')
+                self._quit(pooled)
+                return
+            with self._lock:
+                self._idle.append(pooled)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def driver(self):
+        """``with pool.driver() as driver:`` borrow and always return"""
+        driver = self.acquire()
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def close(self):
+        """Quit idle browsers; leased ones are quit when released"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            self._quit(pooled)
+        self.max_pages = 0  # anything still leased is recycled on release
+
+
+_pools: Dict[Tuple[str, ...], DriverPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_driver_pool(arguments: Sequence[str], **kwargs) -> DriverPool:
+    """Process-wide pool for a set of Chrome arguments
+
+    Streamlit reruns re-execute the app script but not this module, so
+    browsers stay warm between clicks.
+    """
+    key = tuple(arguments)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = DriverPool(arguments, **kwargs)
+        return pool
+
+
+@atexit.register
+def close_all_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
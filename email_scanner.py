@@ -0,0 +1,150 @@
+"""
+Lead Generation Agent - Email Scanner
+Fast email extraction with mailto/obfuscation decoding and config-driven ranking
+"""
+
+import re
+from typing import Iterable, Iterator, List, Tuple
+from urllib.parse import unquote
+
+from config import EXCLUDED_EMAIL_DOMAINS, BUSINESS_EMAIL_PATTERNS, EMAIL_IGNORED_TLDS
+
+_LOCAL_CHARS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789._%+-')
+_MAX_LOCAL_LENGTH = 64
+
+# Spellings of "@" besides the literal one. Each is found with a literal
+# search first; the regexes only run over the spots (or pages) that have one.
+_PERCENT_AT = '%40'
+_ENTITY_AT = re.compile(r'&#(?:0*64|[xX]0*40);')
+_BRACKET_AT = re.compile(r'\s?[\[\(\{]\s?at\s?[\]\)\}]\s?', re.IGNORECASE)
+_BRACKET_AT_FORMS = ('[at]', '(at)', '{at}', '[ at ]', '( at )', '{ at }')
+
+# Domain right after the "@": labels joined by ".", "&#46;" or "[dot]", ending in an alphabetic TLD
+_DOT = r'(?:\.|&#0*46;|&#[xX]0*2[eE];|\s?[\[\(\{]\s?dot\s?[\]\)\}]\s?)'
+_DOMAIN = re.compile(r'(?:[A-Za-z0-9-]+' + _DOT + r')+[A-Za-z]{2,24}\b', re.IGNORECASE)
+_DOT_FORM = re.compile(_DOT, re.IGNORECASE)
+_PLAIN_DOMAIN = re.compile(r'[A-Za-z0-9.-]+')
+
+_LOCAL_TOKEN_SPLIT = re.compile(r'[._+-]')
+
+
+class EmailScanner:
+    """Find, decode, filter and rank the email addresses in a page
+
+    The text is searched for "@" and its encoded forms (``%40`` from mailto
+    links, ``&#64;``, ``[at]``) with literal scans. Each hit is widened
+    into a local part and domain. Obfuscated dots are decoded the same way,
+    so ``info [at] acme [dot] com`` and ``mailto:info%40acme.com`` come out
+    as ``info@acme.com``.
+
+    Filtering and ranking come from config. ``excluded`` entries with a dot
+    are domains (subdomains match too), the rest are keywords matched
+    anywhere in the address by one compiled alternation. ``business``
+    entries such as ``info@`` rank an address first when a token of its
+    local part (split on . _ + -) matches.
+    """
+
+    def __init__(self, excluded: Iterable[str] = EXCLUDED_EMAIL_DOMAINS,
+                 business: Iterable[str] = BUSINESS_EMAIL_PATTERNS,
+                 ignored_tlds: Iterable[str] = EMAIL_IGNORED_TLDS):
+        excluded = [entry.lower().strip() for entry in excluded if entry.strip()]
+        self.excluded_domains = frozenset(entry.lstrip('@') for entry in excluded if '.' in entry)
+        keywords = sorted((entry for entry in excluded if '.' not in entry), key=len, reverse=True)
+        self._excluded_keywords = re.compile('|'.join(map(re.escape, keywords))) if keywords else None
+        self.business_locals = frozenset(entry.lower().strip().rstrip('@') for entry in business if entry.strip())
+        self.ignored_tlds = frozenset(tld.lower().lstrip('.') for tld in ignored_tlds)
+
+    def _anchors(self, text: str) -> List[Tuple[int, int]]:
+        """(start, end) of every "@" spelling, in text order"""
+        anchors = []
+        position = text.find('@')
+        while position != -1:
+            anchors.append((position, position + 1))
+            position = text.find('@', position + 1)
+
+        position = text.find(_PERCENT_AT)
+        while position != -1:
+            anchors.append((position, position + 3))
+            position = text.find(_PERCENT_AT, position + 3)
+
+        if '&#' in text:
+            anchors.extend(match.span() for match in _ENTITY_AT.finditer(text))
+
+        lowered = text.lower()
+        if any(form in lowered for form in _BRACKET_AT_FORMS):
+            if len(lowered) != len(text):
+                # A few non-ASCII characters lowercase to two; offsets no longer line up
+                anchors.extend(match.span() for match in _BRACKET_AT.finditer(text))
+            else:
+                for form in _BRACKET_AT_FORMS:
+                    position = lowered.find(form)
+                    while position != -1:
+                        end = position + len(form)
+                        start = position - 1 if position and text[position - 1].isspace() else position
+                        anchors.append((start, end + 1 if text[end:end + 1].isspace() else end))
+                        position = lowered.find(form, end)
+
+        anchors.sort()
+        return anchors
+
+    def iter_candidates(self, text: str) -> Iterator[str]:
+        """Every decoded, lowercased address in text order, before filtering"""
+        for start, end in self._anchors(text):
+            # Widen left over local-part characters
+            floor = max(0, start - _MAX_LOCAL_LENGTH)
+            left = start
+            while left > floor and text[left - 1] in _LOCAL_CHARS:
+                left -= 1
+            local = text[left:start].lstrip('.+-').rstrip('.')
+            if not local:
+                continue
+
+            match = _DOMAIN.match(text, end)
+            if not match:
+                continue
+            domain = match.group()
+            if not _PLAIN_DOMAIN.fullmatch(domain):
+                domain = _DOT_FORM.sub('.', domain)
+
+            # mailto: links percent-encode the local part as well as the "@"
+            if '%' in local:
+                local = unquote(local)
+                if '@' in local:
+                    local = local.rsplit('@', 1)[1]
+                if not local or not _LOCAL_CHARS.issuperset(local):
+                    continue
+            yield f'{local}@{domain}'.lower()
+
+    def is_excluded(self, email: str) -> bool:
+        if self._excluded_keywords is not None and self._excluded_keywords.search(email):
+            return True
+        domain = email.rpartition('@')[2]
+        if domain.rpartition('.')[2] in self.ignored_tlds:
+            return True
+        # example.com also excludes mail.example.com
+        while domain:
+            if domain in self.excluded_domains:
+                return True
+            domain = domain.partition('.')[2]
+        return False
+
+    def is_business(self, email: str) -> bool:
+        local = email.partition('@')[0]
+        return any(token in self.business_locals for token in _LOCAL_TOKEN_SPLIT.split(local))
+
+    def scan(self, text: str) -> List[str]:
+        """Unique addresses that pass the filters, business-like ones first"""
+        seen = set()
+        business, others = [], []
+        for email in self.iter_candidates(text):
+            if email in seen:
+                continue
+            seen.add(email)
+            if self.is_excluded(email):
+                continue
+            (business if self.is_business(email) else others).append(email)
+        return business + others
+
+
+# Scanner built from config, shared by every caller
+EMAIL_SCANNER = EmailScanner()
@@ -0,0 +1,453 @@
+"""
+Lead Generation Agent - Extraction Core
+UI-free page extraction that reports progress through event callbacks
+"""
+
+import re
+import time
+import traceback
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+import requests
+
+import http_client
+import metrics
+from config import CHROME_OPTIONS, STREAM_CHUNK_SIZE
+from diagnostics import LazyDiagnostics, PageDiagnostics
+from driver_pool import get_driver_pool
+from extraction import MAPS_URL_MATCHER, HREF_CATEGORY, clean_found_urls
+from page_loader import LoadReport, load_page_adaptive, harvest_links
+from place_index import dedupe_places
+from short_links import ShortLinkResolver, is_short_link
+from tiered_fetch import TieredFetcher, TierResult, TIER_HTTP, TIER_BROWSER
+
+
+@dataclass
+class ExtractionEvent:
+    """Something a front end may show while a page is extracted
+
+    ``kind`` is 'status' (a one-line message that replaces the previous
+    one), 'error', 'debug' or 'progress' (``progress`` only). ``level`` is
+    info, success, warning, error or text. Events with ``details`` are long
+    lists best shown collapsed under ``message``.
+    """
+    kind: str
+    message: str = ''
+    level: str = 'info'
+    progress: Optional[int] = None
+    details: List[str] = field(default_factory=list)
+    expanded: bool = False
+
+
+EventCallback = Callable[[ExtractionEvent], None]
+
+
+@dataclass
+class ExtractionResult:
+    """Outcome of extracting one page"""
+    url: str
+    maps_urls: List[str] = field(default_factory=list)
+    invalid_urls: List[str] = field(default_factory=list)
+    raw_count: int = 0
+    tier: str = TIER_HTTP
+    page_length: int = 0
+    error: Optional[str] = None
+    elapsed: float = 0.0
+    load_report: Optional[LoadReport] = None
+    # Per-stage seconds and counters from metrics.RunMetrics.snapshot(); empty when metrics are off
+    metrics: Dict[str, Dict[str, float]] = field(default_factory=dict)
+
+
+class _EventSource:
+    """Event plumbing shared by the extractors; a no-op without a subscriber"""
+
+    def __init__(self, on_event: Optional[EventCallback] = None):
+        self.on_event = on_event
+
+    def emit(self, kind: str, message: str = '', level: str = 'info', progress: Optional[int] = None,
+             details: Sequence[str] = (), expanded: bool = False):
+        if self.on_event:
+            self.on_event(ExtractionEvent(kind, message, level, progress, list(details), expanded))
+
+    def status(self, message: str, progress: Optional[int] = None, level: str = 'info'):
+        self.emit('status', message, level, progress)
+
+    def debug(self, message: str, level: str = 'info', details: Sequence[str] = (), expanded: bool = False):
+        self.emit('debug', message, level, details=details, expanded=expanded)
+
+
+class ExtractionEngine(_EventSource):
+    """Extract Google Maps URLs from one page at a time, with no UI dependency
+
+    Pages are fetched over HTTP and escalated to the browser pool only when
+    they need rendering (``browser_fallback``). Short links are expanded and
+    everything is cleaned and deduplicated by place. Progress, errors and
+    (with ``debug``) diagnostics are reported to ``on_event``; ``extract``
+    itself never raises.
+    """
+
+    def __init__(self, streaming: bool = True, browser_fallback: bool = True, expand_short_links: bool = True,
+                 debug: bool = False, browser_arguments: Sequence[str] = CHROME_OPTIONS, timeout: int = 30,
+                 session=None, rate_limiter=None, scan_pool=None, on_event: Optional[EventCallback] = None):
+        super().__init__(on_event)
+        self.streaming = streaming
+        self.debug_mode = debug
+        self.scan_pool = scan_pool  # optional scan_pool.ScanPool for the CPU-bound scan and clean
+        self.fetcher = TieredFetcher(session=session, browser_arguments=browser_arguments, timeout=timeout,
+                                     streaming=streaming, rate_limiter=rate_limiter, use_browser=browser_fallback,
+                                     scan_pool=scan_pool)
+        self.resolver = ShortLinkResolver(session=session) if expand_short_links else None
+
+    def extract(self, url: str) -> ExtractionResult:
+        """Fetch a page and return its clean Maps URLs; failures set ``error``"""
+        result = ExtractionResult(url)
+        with metrics.record_run() as run:
+            self._extract(url, result, run)
+        result.metrics = run.snapshot()
+        return result
+
+    def _extract(self, url: str, result: ExtractionResult, run: metrics.RunMetrics):
+        start = time.perf_counter()
+        try:
+            # Try HTTP method directly (more reliable on cloud platforms)
+            self.status("🚀 Using HTTP extraction method...", 10)
+            self.status("🌐 Fetching page content...", 30)
+            self._process(result, self.fetcher.fetch(url))
+        except Exception as e:
+            self._fail(result, e)
+        finally:
+            self._finish(result, run, start)
+
+    async def extract_async(self, url: str, fetcher) -> ExtractionResult:
+        """extract() with the page fetched by an ``async_fetch.AsyncFetcher`` on the running event loop
+
+        Only the fetch is awaited. Reporting and short link expansion block,
+        so they run in a worker thread instead of stalling other fetches.
+        """
+        import asyncio
+
+        result = ExtractionResult(url)
+        start = time.perf_counter()
+        with metrics.record_run() as run:
+            try:
+                self.status("🚀 Using async HTTP extraction method...", 10)
+                self.status("🌐 Fetching page content...", 30)
+                fetched = await fetcher.fetch(url)
+                await asyncio.to_thread(self._process, result, fetched)
+            except Exception as e:
+                self._fail(result, e)
+            finally:
+                self._finish(result, run, start)
+        result.metrics = run.snapshot()
+        return result
+
+    def _process(self, result: ExtractionResult, fetched: TierResult):
+        result.tier, result.page_length = fetched.tier, fetched.page_length
+
+        if fetched.tier == TIER_BROWSER:
+            self.status(f"✅ Page rendered in browser: {fetched.page_length:,} characters", 50)
+        else:
+            self.status(f"✅ Page fetched: {fetched.page_length:,} characters", 50)
+        diagnostics = LazyDiagnostics(fetched.page_source)
+        if self.debug_mode:
+            # Analyzed on a background thread while short links expand
+            diagnostics.start()
+            self._report_fetch(fetched)
+
+        self._collect(result, diagnostics, fetched.scan_result, fetched.urls, fetched.invalid_urls)
+
+    def _fail(self, result: ExtractionResult, e: Exception):
+        result.error = str(e)
+        if isinstance(e, requests.exceptions.Timeout):
+            self.emit('error', "❌ Request timeout - website took too long to respond", 'error')
+        elif isinstance(e, requests.exceptions.ConnectionError):
+            self.emit('error', "❌ Connection failed - check if the URL is accessible", 'error')
+        elif isinstance(e, requests.exceptions.HTTPError):
+            self.emit('error', f"❌ HTTP Error {e.response.status_code}: {str(e)}", 'error')
+        else:
+            self.emit('error', f"❌ HTTP extraction failed: {str(e)}", 'error')
+            self.emit('error', "🔧 Technical Error Details", details=[traceback.format_exc()])
+
+    def _finish(self, result: ExtractionResult, run: metrics.RunMetrics, start: float):
+        result.elapsed = time.perf_counter() - start
+        run.labels.update(tier=result.tier, outcome='error' if result.error else 'ok')
+        self.emit('progress', progress=100)
+
+    def extract_urls_from_content(self, page_source: str, url: str = '') -> ExtractionResult:
+        """Find, clean and validate the Maps URLs in already-fetched page source"""
+        start = time.perf_counter()
+        result = ExtractionResult(url, page_length=len(page_source))
+        with metrics.record_run() as run:
+            if self.scan_pool:
+                scanned = self.scan_pool.scan_text(page_source)
+                scan_result, clean_urls, invalid_urls = scanned.scan_result, scanned.urls, scanned.invalid_urls
+            else:
+                with metrics.stage('scan'):
+                    scan_result = MAPS_URL_MATCHER.scan(page_source)
+                with metrics.stage('clean'):
+                    clean_urls, invalid_urls = clean_found_urls(scan_result[0])
+            diagnostics = LazyDiagnostics(page_source)
+            if self.debug_mode:
+                diagnostics.start()
+            self._collect(result, diagnostics, scan_result, clean_urls, invalid_urls)
+            run.labels.update(tier='content', outcome='ok')
+        result.metrics = run.snapshot()
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    def _report_fetch(self, fetched: TierResult):
+        response = fetched.response
+        if fetched.tier == TIER_BROWSER:
+            self.debug(f"🖥️ Using browser ({fetched.reason})", 'success')
+            self.debug(f"⏱️ HTTP {fetched.http_elapsed:.1f}s, browser {fetched.browser_elapsed:.1f}s")
+        else:
+            self.debug(f"🔧 Using HTTP method ({fetched.reason})", 'success')
+        self.debug(f"📄 Content size: {fetched.page_length:,} characters")
+        if response is not None:
+            self.debug(f"📊 Status: {response.status_code}")
+            self.debug(f"📋 Encoding: {response.encoding}")
+        if self.scan_pool and fetched.tier != TIER_BROWSER:
+            self.debug(f"⚙️ Scanned in a pool of {self.scan_pool.workers} worker processes")
+        elif self.streaming and fetched.tier != TIER_BROWSER:
+            self.debug(f"🌊 Streamed in {STREAM_CHUNK_SIZE // 1024} KB chunks")
+        conn_stats = http_client.connection_stats()
+        self.debug(f"🔌 Connections: {conn_stats['reused_connections']} reused, "
+                   f"{conn_stats['new_connections']} new ({conn_stats['requests']} requests this session)")
+        cache_stats = http_client.cache_stats()
+        if cache_stats and response is not None:
+            self.debug(f"💾 Cache: {response.headers.get('X-Cache', 'MISS')} | "
+                       f"{cache_stats['hits']} hits, {cache_stats['revalidated']} revalidated, "
+                       f"{cache_stats['misses']} misses | {cache_stats['entries']} entries, "
+                       f"{cache_stats['stored_bytes'] / 1e6:.1f} MB")
+
+    def _report_quality(self, stats: PageDiagnostics):
+        if stats.page_length > 100:
+            self.debug(f"📊 Content quality: {stats.quality:.1%} readable")
+            if stats.quality < 0.7:
+                self.debug("⚠️ Content may be corrupted", 'warning')
+
+    def _collect(self, result: ExtractionResult, diagnostics: LazyDiagnostics, scan_result, clean_urls: List[str],
+                 invalid_urls: List[str]):
+        """Report scan counts, expand short links and store the final URLs"""
+        self.status("🔍 Searching for Google Maps URLs...", 80)
+
+        found_urls, pattern_results = scan_result
+        pattern_results = dict(pattern_results)
+        href_count = pattern_results.pop(HREF_CATEGORY, 0)
+        result.raw_count = href_count + sum(pattern_results.values())
+        for category, matches in scan_result[1].items():
+            if matches:
+                metrics.count('matches', matches, category)
+
+        if self.debug_mode:
+            self.debug(f"🎯 Total raw URLs found: {result.raw_count}")
+            self.debug(f"   • From href attributes: {href_count}")
+            for pattern_name, count in pattern_results.items():
+                if count > 0:
+                    self.debug(f"   • {pattern_name.replace('_', ' ').title()}: {count} URLs")
+
+        # Clean and validate URLs
+        self.status("🧹 Cleaning and validating URLs...", 90)
+
+        # Expanded short links go through the same cleaning and validation
+        if self.resolver and any(is_short_link(url) for url in clean_urls):
+            self.status("🔗 Expanding short links...")
+            with metrics.stage('expand'):
+                expanded = self.resolver.expand(clean_urls)
+            with metrics.stage('clean'):
+                clean_urls, expanded_invalid = clean_found_urls(expanded)
+            invalid_urls = invalid_urls + expanded_invalid
+            if self.debug_mode:
+                stats = self.resolver.stats
+                self.debug(f"🔗 Short links: {stats['resolved']} resolved, "
+                           f"{stats['cached']} from cache, {stats['failed']} failed")
+
+        result.maps_urls, result.invalid_urls = clean_urls, invalid_urls
+        metrics.count('urls_found', len(clean_urls))
+        metrics.count('urls_rejected', len(invalid_urls))
+
+        if clean_urls:
+            self.status(f"✅ Found {len(clean_urls)} Google Maps URLs!", 100, 'success')
+            if self.debug_mode:
+                self.debug(f"Sample URL: {clean_urls[0][:80]}...", 'success')
+                self._report_quality(diagnostics.get())
+        else:
+            self.status("❌ No Google Maps URLs found on this page", 100, 'error')
+            # Content analysis needs the whole page; outside debug mode only the counts we already have are shown
+            if self.on_event:
+                self._analyze_failure(diagnostics.get() if self.debug_mode else None, result.page_length,
+                                      found_urls, invalid_urls)
+
+    def _analyze_failure(self, stats: Optional[PageDiagnostics], page_length: int, found_urls,
+                         invalid_urls: List[str]):
+        """Explain an empty result: keywords, readability and every URL on the page"""
+        self.debug("🔍 **Detailed Analysis:**", 'error')
+
+        self.debug(f"• Page size: {page_length:,} characters", 'text')
+        if stats is not None:
+            keywords = stats.keyword_counts
+            self.debug(f"• Keywords found: google({keywords['google']}) maps({keywords['maps']}) "
+                       f"http({keywords['http']})", 'text')
+            self.debug(f"• Links in page: {keywords['href=']} href attributes", 'text')
+        self.debug(f"• Raw URLs found: {len(found_urls)}", 'text')
+        self.debug(f"• Invalid URLs rejected: {len(invalid_urls)}", 'text')
+
+        # Show rejected URLs for debugging
+        if invalid_urls:
+            rejected = [f"{i+1}. {url}" for i, url in enumerate(invalid_urls[:5])]
+            if len(invalid_urls) > 5:
+                rejected.append(f"... and {len(invalid_urls)-5} more")
+            self.debug(f"🔍 Rejected URLs ({len(invalid_urls)})", details=rejected)
+
+        if stats is None:
+            self.debug("• Enable debug mode for keyword, readability and URL analysis", 'text')
+            return
+
+        self._report_quality(stats)
+
+        # Show sample content with better formatting
+        if stats.sample:
+            self.debug(f"• Content readability: {stats.readability:.1%}", 'text')
+
+            if stats.readability > 0.6:
+                # Look for business-related content
+                if stats.business_terms:
+                    self.debug(f"✅ Found business terms: {', '.join(stats.business_terms)}")
+                else:
+                    self.debug("⚠️ No business-related terms found", 'warning')
+
+                self.debug("📄 Page content sample", details=[stats.sample])
+            else:
+                self.debug("⚠️ Content appears corrupted, compressed, or non-HTML", 'warning')
+
+        # Show ALL URLs found in page
+        all_urls = stats.urls
+        if all_urls:
+            google_urls = stats.google_urls
+            maps_urls = stats.maps_urls
+
+            self.debug(f"• All URLs in page: {len(all_urls)}", 'text')
+            self.debug(f"• URLs containing 'google': {len(google_urls)}", 'text')
+            self.debug(f"• URLs containing 'maps': {len(maps_urls)}", 'text')
+
+            shown = [f"{i+1}. {url}" for i, url in enumerate(all_urls[:10])]
+            if len(all_urls) > 10:
+                shown.append(f"... and {len(all_urls)-10} more URLs")
+            self.debug(f"🔗 All URLs found ({len(all_urls[:10])} shown)", details=shown)
+
+            if google_urls:
+                self.debug(f"🎯 Google URLs ({len(google_urls)})",
+                           details=[f"{i+1}. {url}" for i, url in enumerate(google_urls)], expanded=True)
+        else:
+            self.debug("❌ No URLs found at all in the page", 'error')
+            self.debug("**Suggestions:**")
+            self.debug("• Try a different business directory website")
+            self.debug("• Check if the URL is accessible in a browser")
+            self.debug("• Some sites may block automated requests")
+
+
+class BrowserPageExtractor(_EventSource):
+    """Always render the page in a pooled headless browser
+
+    The mode behind simple_app: place-style URLs from the rendered source
+    plus every Maps href in the DOM, with short links expanded.
+    """
+
+    # Direct place URLs, maps.google.com place URLs and short links
+    PAGE_PATTERNS = [
+        re.compile(r'https://www\.google\.com/maps/place/[^"\s<>]+'),
+        re.compile(r'https://maps\.google\.com/[^"\s<>]*place[^"\s<>]*'),
+        re.compile(r'https://goo\.gl/maps/[^"\s<>]+'),
+    ]
+    PLACE_URL_PATTERNS = [
+        re.compile(r'google\.com/maps/place/', re.IGNORECASE),
+        re.compile(r'maps\.google\.com.*place', re.IGNORECASE),
+        re.compile(r'goo\.gl/maps/', re.IGNORECASE),
+    ]
+    # Trailing characters that are HTML artifacts rather than part of the URL
+    _ARTIFACT_PATTERN = re.compile(r'[&"\'<>].*$')
+
+    def __init__(self, browser_arguments: Sequence[str] = CHROME_OPTIONS, adaptive: bool = True,
+                 expand_short_links: bool = True, on_event: Optional[EventCallback] = None):
+        super().__init__(on_event)
+        self.browser_arguments = tuple(browser_arguments)
+        self.adaptive = adaptive
+        self.resolver = ShortLinkResolver() if expand_short_links else None
+
+    @classmethod
+    def is_valid_maps_url(cls, url: str) -> bool:
+        """Check if URL is a valid Google Maps place URL"""
+        return bool(url) and any(pattern.search(url) for pattern in cls.PLACE_URL_PATTERNS)
+
+    def _load(self, driver, url: str) -> Optional[LoadReport]:
+        self.status("🔍 Loading webpage...")
+        if self.adaptive:
+            # Wait on readiness and keep scrolling only while new links appear
+            return load_page_adaptive(driver, url)
+
+        driver.get(url)
+        time.sleep(3)  # Wait for page to load
+
+        # Scroll to load more content
+        self.status("📜 Scrolling to load more content...")
+        for i in range(3):  # Scroll 3 times
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            time.sleep(2)
+        return None
+
+    def _page_candidates(self, driver) -> set:
+        # Page source and pre-filtered Maps hrefs in one script call
+        try:
+            page_source, harvested_hrefs = harvest_links(driver)
+        except Exception as e:
+            self.emit('status', f"Bulk link harvest failed, falling back: {e}", 'warning')
+            page_source, harvested_hrefs = driver.page_source, None
+
+        candidates = {self._ARTIFACT_PATTERN.sub('', url)
+                      for pattern in self.PAGE_PATTERNS for url in pattern.findall(page_source)}
+
+        # Also check href attributes of all links
+        self.status("🔗 Checking all links on the page...")
+        if harvested_hrefs is not None:
+            candidates.update(harvested_hrefs)
+        else:
+            try:
+                for link in driver.find_elements('tag name', 'a'):
+                    href = link.get_attribute("href")
+                    if href:
+                        candidates.add(href)
+            except Exception as e:
+                self.emit('status', f"Error checking links: {e}", 'warning')
+        return candidates
+
+    def extract(self, url: str) -> ExtractionResult:
+        """Render a page and return its place URLs; failures set ``error``"""
+        start = time.perf_counter()
+        result = ExtractionResult(url, tier=TIER_BROWSER)
+        try:
+            with get_driver_pool(self.browser_arguments).driver() as driver:
+                result.load_report = self._load(driver, url)
+                candidates = self._page_candidates(driver)
+
+            # Expand short links concurrently; keep the short form if expansion fails validation
+            expanded = self.resolver.resolve_many(candidates) if self.resolver else {}
+
+            # Each distinct URL is validated once, whichever scan found it
+            maps_urls = set()
+            for candidate in candidates:
+                full_url = expanded.get(candidate)
+                if full_url and self.is_valid_maps_url(full_url):
+                    maps_urls.add(full_url)
+                elif self.is_valid_maps_url(candidate):
+                    maps_urls.add(candidate)
+
+            # One URL per place, however many ways the page spells it
+            result.maps_urls = dedupe_places(sorted(maps_urls))
+            result.raw_count = len(candidates)
+        except Exception as e:
+            result.error = str(e)
+            self.emit('error', f"Error extracting URLs: {str(e)}", 'error')
+        finally:
+            result.elapsed = time.perf_counter() - start
+        return result
@@ -0,0 +1,163 @@
+"""
+Lead Generation Agent - Email Enrichment
+Find contact emails for many business websites concurrently
+"""
+
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlparse
+
+from config import ENRICH_MAX_WORKERS, ENRICH_PER_DOMAIN_LIMIT, ENRICH_HOMEPAGE_TIMEOUT, ENRICH_PROBE_TIMEOUT
+from utils import EmailExtractor, URLValidator
+
+
+@dataclass
+class EnrichmentResult:
+    """Email lookup outcome for one website"""
+    website: str
+    email: Optional[str] = None
+    emails: List[str] = field(default_factory=list)
+    source_page: Optional[str] = None
+    error: Optional[str] = None
+    probes_fetched: int = 0
+    probes_cancelled: int = 0
+    elapsed: float = 0.0
+
+
+class _SiteState:
+    """Probe outcomes for one website, in priority order"""
+
+    def __init__(self, website: str, probe_urls: List[str], headers: Dict[str, str]):
+        self.website = website
+        self.probe_urls = probe_urls
+        self.headers = headers
+        self.outcomes: List[Optional[List[str]]] = [None] * len(probe_urls)
+        self.error: Optional[str] = None
+        self.fetched = 0
+        self.done = False
+        self.start = time.perf_counter()
+
+    def decide(self) -> Optional[EnrichmentResult]:
+        """Return a result once the highest-priority answer is known
+
+        Mirrors the sequential order of ``extract_from_website``: the homepage
+        wins if it has an email, then /contact, /contact-us and /about. A lower
+        priority probe that finishes early waits for the ones ahead of it.
+        """
+        if self.error:
+            return self._result(error=self.error)
+        for index, emails in enumerate(self.outcomes):
+            if emails is None:
+                return None
+            if emails:
+                return self._result(emails=emails, source_page=self.probe_urls[index])
+        return self._result()
+
+    def _result(self, emails=None, source_page=None, error=None) -> EnrichmentResult:
+        emails = emails or []
+        return EnrichmentResult(
+            website=self.website,
+            email=emails[0] if emails else None,
+            emails=emails,
+            source_page=source_page,
+            error=error,
+            probes_fetched=self.fetched,
+            elapsed=time.perf_counter() - self.start,
+        )
+
+
+class EmailEnricher:
+    """Concurrent email lookup across many websites
+
+    The homepage and contact-page probes for each website are fetched at
+    the same time, bounded by ``max_workers`` overall and ``per_domain_limit``
+    per domain. As soon as a website's answer is settled its queued probes
+    are dropped and the result is yielded, so callers can stream results.
+    """
+
+    def __init__(self, max_workers: int = ENRICH_MAX_WORKERS, per_domain_limit: int = ENRICH_PER_DOMAIN_LIMIT,
+                 homepage_timeout: int = ENRICH_HOMEPAGE_TIMEOUT, probe_timeout: int = ENRICH_PROBE_TIMEOUT,
+                 rate_limiter=None):
+        self.max_workers = max(1, max_workers)
+        self.per_domain_limit = max(1, per_domain_limit)
+        self.homepage_timeout = homepage_timeout
+        self.probe_timeout = probe_timeout
+        self.extractor = EmailExtractor(rate_limiter=rate_limiter)
+
+    @staticmethod
+    def _domain(url: str) -> str:
+        host = urlparse(url).netloc.lower()
+        return host[4:] if host.startswith('www.') else host
+
+    def _probe(self, site: _SiteState, index: int) -> Optional[List[str]]:
+        if site.done:
+            return None
+        if index == 0:
+            return self.extractor.fetch_emails(site.probe_urls[0], site.headers, self.homepage_timeout)
+        return self.extractor.fetch_emails(site.probe_urls[index], site.headers, self.probe_timeout, required=False)
+
+    def iter_results(self, websites: Iterable[str]) -> Iterator[EnrichmentResult]:
+        """Yield one EnrichmentResult per website, in completion order"""
+        sites = []
+        for website in dict.fromkeys(URLValidator.clean_url(w) for w in websites if w and w.strip()):
+            probe_urls = [website] + self.extractor.contact_page_urls(website)
+            sites.append(_SiteState(website, probe_urls, self.extractor.request_headers(website)))
+
+        # Probes queued per domain, each site's probes in priority order
+        queues: Dict[str, deque] = OrderedDict()
+        for site in sites:
+            queue = queues.setdefault(self._domain(site.website), deque())
+            queue.extend((site, index) for index in range(len(site.probe_urls)))
+        active: Dict[str, int] = dict.fromkeys(queues, 0)
+        in_flight = {}
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            def fill():
+                for domain, queue in queues.items():
+                    while queue and active[domain] < self.per_domain_limit and len(in_flight) < self.max_workers:
+                        site, index = queue.popleft()
+                        in_flight[pool.submit(self._probe, site, index)] = (domain, site, index)
+                        active[domain] += 1
+
+            fill()
+            while in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    domain, site, index = in_flight.pop(future)
+                    active[domain] -= 1
+                    if site.done:
+                        continue
+
+                    site.fetched += 1
+                    try:
+                        site.outcomes[index] = future.result() or []
+                    except Exception as e:
+                        if index == 0:
+                            site.error = str(e)
+                        site.outcomes[index] = []
+
+                    result = site.decide()
+                    if result is None:
+                        continue
+
+                    # Settled: drop this site's queued probes and ignore any still running
+                    site.done = True
+                    queue = queues[domain]
+                    remaining = [item for item in queue if item[0] is not site]
+                    result.probes_cancelled = len(queue) - len(remaining)
+                    queues[domain] = deque(remaining)
+                    yield result
+                fill()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def enrich(self, websites: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Map each website to its best email (or None), in input order"""
+        websites = list(websites)
+        results = {result.website: result.email for result in self.iter_results(websites)}
+        ordered = dict.fromkeys(URLValidator.clean_url(w) for w in websites if w and w.strip())
+        return {website: results.get(website) for website in ordered}
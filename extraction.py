@@ -0,0 +1,377 @@
+"""
+Lead Generation Agent - Extraction Engine
+Compiled Google Maps URL matching used by the Streamlit apps
+"""
+
+import codecs
+import itertools
+import re
+import urllib.parse
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import metrics
+from config import STREAM_CHUNK_SIZE, DIAGNOSTIC_SAMPLE_CHARS
+from place_index import dedupe_places
+
+# Better headers to avoid being blocked
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': 'identity',  # Don't request compressed content
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+# Characters that terminate a bare URL in page source
+_URL_TAIL = r'[^\s"\'<>\)]'
+
+# Pattern categories, most specific first. Each entry is (name, regex body);
+# every body starts with "https" so the combined pattern can be factored on it.
+MAPS_URL_CATEGORIES = [
+    # Standard Google Maps URLs
+    ('place', r'https://www\.google\.com/maps/place/' + _URL_TAIL + r'+'),
+    ('coordinates', r'https://www\.google\.com/maps/' + _URL_TAIL + r'*@[\d\.,\-]+' + _URL_TAIL + r'*'),
+    ('maps_domain', r'https://maps\.google\.com/' + _URL_TAIL + r'+'),
+    ('short_link', r'https://goo\.gl/maps/' + _URL_TAIL + r'+'),
+
+    # Additional formats
+    ('search', r'https://www\.google\.com/maps/search/' + _URL_TAIL + r'+'),
+    ('directions', r'https://www\.google\.com/maps/dir/' + _URL_TAIL + r'+'),
+    ('app_link', r'https://maps\.app\.goo\.gl/' + _URL_TAIL + r'+'),
+
+    # Encoded versions (common in HTML)
+    ('encoded_google', r'https%3A//www\.google\.com/maps' + _URL_TAIL + r'+'),
+    ('encoded_maps', r'https%3A//maps\.google\.com' + _URL_TAIL + r'+'),
+
+    # Alternative patterns with different delimiters
+    ('generic_google', r'https://[^/]*google[^/]*/maps/' + _URL_TAIL + r'+'),
+    ('generic_maps', r'https://[^/]*maps\.google[^/]*/' + _URL_TAIL + r'+'),
+]
+
+# URLs inside href attributes, captured up to the closing quote
+HREF_CATEGORY = 'href'
+_HREF_PATTERN = r'href=["\'](?P<href>[^"\']*(?:google\.com/maps|maps\.google\.com|goo\.gl/maps)[^"\']*)["\']'
+
+# Common characters that end a bare URL (a subset of what _URL_TAIL excludes)
+_URL_END_CHARS = ' "\'<>)\n\t\r'
+
+# Cheap literal check: every category needs one of these somewhere in the page
+_PREFILTER_PATTERN = r'goo(?:gle|\.gl)'
+
+# <meta charset="..."> or http-equiv content="...; charset=..."
+_META_CHARSET_PATTERN = rb'<meta[^>]+charset=["\']?([A-Za-z0-9_\-]+)'
+
+
+class MapsURLMatcher:
+    """Single-pass Google Maps URL matcher
+
+    All URL categories are compiled into one alternation, so a page is walked
+    once instead of once per pattern. Each match reports the category that
+    produced it, which keeps the per-pattern counts used by debug mode.
+    """
+
+    categories = [name for name, _ in MAPS_URL_CATEGORIES] + [HREF_CATEGORY]
+
+    def __init__(self):
+        # An empty marker group closes each branch, so ``match.lastgroup``
+        # names the category without capturing the URL twice.
+        branches = [f'{body}(?P<{name}>)' for name, body in MAPS_URL_CATEGORIES]
+        branches.append(_HREF_PATTERN)
+        self._pattern = re.compile('|'.join(branches), re.IGNORECASE)
+        self._prefilter = re.compile(_PREFILTER_PATTERN, re.IGNORECASE)
+        # Where a match can begin, and what ends a partial one (see _settled_end)
+        self._candidates = re.compile(r'https|href=', re.IGNORECASE)
+        self._quote = re.compile(r'["\']')
+        self._url_end = re.compile(r'[\s"\'<>\)]')
+
+    def has_candidates(self, text: str) -> bool:
+        """Check whether text can contain a Maps URL at all"""
+        return bool(text) and self._prefilter.search(text) is not None
+
+    def iter_matches(self, text: str, pos: int = 0):
+        """Yield (category, url) for every match, including nested URLs"""
+        for match in self._pattern.finditer(text, pos):
+            yield from self._expand_match(match)
+
+    def _expand_match(self, match):
+        """Yield a match and any URLs nested inside it"""
+        category = match.lastgroup
+        if category == HREF_CATEGORY:
+            url = match.group(HREF_CATEGORY)
+            nested_start = 0
+        else:
+            url = match.group(0)
+            nested_start = 1
+
+        yield category, url
+
+        # URLs embedded in a match (e.g. ``?q=https://...``) were found by
+        # the separate per-pattern scans; rescan just the matched text.
+        if len(url) > nested_start:
+            yield from self.iter_matches(url, nested_start)
+
+    def scan(self, text: str) -> Tuple[Set[str], Dict[str, int]]:
+        """Scan text once and return (raw URLs, match count per category)"""
+        counts = dict.fromkeys(self.categories, 0)
+        found_urls = set()
+
+        if not self.has_candidates(text):
+            return found_urls, counts
+
+        for category, url in self.iter_matches(text):
+            found_urls.add(url)
+            counts[category] += 1
+
+        return found_urls, counts
+
+    def _settled_end(self, window: str, pos: int) -> int:
+        """Window position before which every match attempt is final
+
+        Every category starts with ``https`` or ``href=``. An attempt at such
+        a candidate can still change while its longest possible match runs
+        to the end of the window: an ``href`` whose closing quote has not
+        arrived, or an ``https`` without a terminating character after its
+        first path slash (the ``[^/]*`` in the generic patterns crosses
+        spaces and quotes). The last few characters could begin a candidate
+        not yet recognisable, so they are never settled either.
+        """
+        settled = max(len(window) - 4, pos)
+        # An open candidate starts after the last quote, or after the last
+        # path slash with a URL-ending character behind it; start there
+        last_quote = max(window.rfind('"'), window.rfind("'"))
+        last_end = max(window.rfind(char) for char in _URL_END_CHARS)
+        last_slash = window.rfind('/', 0, last_end) if last_end > 0 else -1
+        for candidate in self._candidates.finditer(window, max(pos, min(last_quote - 6, last_slash - 8))):
+            start = candidate.start()
+            if start >= settled:
+                break
+            if candidate.group().lower() == 'href=':
+                if start + 5 >= len(window):
+                    return start
+                if window[start + 5] in '"\'' and not self._quote.search(window, start + 6):
+                    return start
+            else:
+                slash = window.find('/', start + 8)
+                if slash < 0 or not self._url_end.search(window, slash + 1):
+                    return start
+        return settled
+
+    def iter_stream(self, chunks: Iterable[str]):
+        """Yield (category, url) from text arriving in chunks, exactly as scan() would
+
+        Matches are reported once nothing that arrives later can change
+        them, and each window is rescanned from where the buffered scan
+        would resume. Only the unsettled tail is carried between chunks;
+        that is normally a few characters, but an unclosed ``href`` quote
+        holds text back until the quote closes.
+        """
+        window = ''
+        offset = 0  # absolute position of window[0]
+        resume = 0  # absolute position the buffered scan would try next
+
+        for chunk in chunks:
+            if not chunk:
+                continue
+            window += chunk
+            pos = resume - offset
+            settled = self._settled_end(window, pos)
+
+            if self._prefilter.search(window):
+                for match in self._pattern.finditer(window, pos):
+                    if match.start() >= settled:
+                        break
+                    pos = match.end()
+                    yield from self._expand_match(match)
+
+            # Attempts between the last match and ``settled`` failed for good
+            resume = offset + max(pos, settled)
+            window = window[resume - offset:]
+            offset = resume
+
+        # Whatever is left is the end of the document
+        if window and self._prefilter.search(window):
+            for match in self._pattern.finditer(window):
+                yield from self._expand_match(match)
+
+    def scan_stream(self, chunks: Iterable[str]) -> Tuple[Set[str], Dict[str, int]]:
+        """Streaming counterpart of scan(); returns the same URLs and counts"""
+        counts = dict.fromkeys(self.categories, 0)
+        found_urls = set()
+
+        for category, url in self.iter_stream(chunks):
+            found_urls.add(url)
+            counts[category] += 1
+
+        return found_urls, counts
+
+    def find_urls(self, text: str) -> List[str]:
+        """Return unique raw URLs in first-seen order"""
+        if not self.has_candidates(text):
+            return []
+        return list(dict.fromkeys(url for _, url in self.iter_matches(text)))
+
+
+def sniff_encoding(head: bytes, header_encoding: Optional[str] = None) -> str:
+    """Pick a text encoding from the first bytes of a page
+
+    Uses the Content-Type charset when the server sent one, then a
+    ``<meta charset>`` declaration, then UTF-8. Unlike ``apparent_encoding``
+    this never runs charset detection over the whole body.
+    """
+    candidates = [header_encoding]
+    match = re.search(_META_CHARSET_PATTERN, head[:4096], re.IGNORECASE)
+    if match:
+        candidates.append(match.group(1).decode('ascii'))
+    candidates.append('utf-8')
+
+    for encoding in candidates:
+        if not encoding:
+            continue
+        try:
+            return codecs.lookup(encoding).name
+        except LookupError:
+            continue
+    return 'utf-8'
+
+
+def decode_stream(byte_chunks: Iterable[bytes], encoding: str) -> Iterator[str]:
+    """Incrementally decode byte chunks; multi-byte characters may span chunks"""
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    for chunk in byte_chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+# Shared instance; compiling once per process is the point
+MAPS_URL_MATCHER = MapsURLMatcher()
+
+
+def scan_response(response, streaming: bool = True, on_text: Optional[Callable[[str], None]] = None):
+    """Scan a requests response for Maps URLs
+
+    Returns (page source, page length, scan result). When streaming, the body
+    is decoded and scanned chunk by chunk and page source is only the first
+    DIAGNOSTIC_SAMPLE_CHARS characters, kept for debug analysis. ``on_text``
+    sees every decoded chunk (or the whole page when buffered).
+    """
+    if not streaming:
+        with metrics.stage('download'):
+            content = response.content
+        metrics.count('bytes_downloaded', len(content))
+        # Get content as text, handling encoding properly
+        with metrics.stage('decode'):
+            response.encoding = response.apparent_encoding or 'utf-8'
+            page_source = response.text
+        metrics.count('chars_decoded', len(page_source))
+        if on_text:
+            with metrics.stage('score'):
+                on_text(page_source)
+        with metrics.stage('scan'):
+            scan_result = MAPS_URL_MATCHER.scan(page_source)
+        return page_source, len(page_source), scan_result
+
+    # Download, decode and scan interleave per chunk; each step is timed separately
+    byte_chunks = metrics.timed_iter(response.iter_content(chunk_size=STREAM_CHUNK_SIZE), 'download',
+                                     size_counter='bytes_downloaded')
+    first_chunk = next(byte_chunks, b'')
+
+    # Only trust the header when it names a charset explicitly
+    content_type = response.headers.get('Content-Type', '').lower()
+    header_encoding = response.encoding if 'charset' in content_type else None
+    response.encoding = sniff_encoding(first_chunk, header_encoding)
+
+    sample_parts = []
+    stats = {'length': 0, 'sampled': 0}
+
+    def text_chunks():
+        decoded = decode_stream(itertools.chain([first_chunk], byte_chunks), response.encoding)
+        for text in metrics.timed_iter(decoded, 'decode'):
+            stats['length'] += len(text)
+            if stats['sampled'] < DIAGNOSTIC_SAMPLE_CHARS:
+                sample_parts.append(text[:DIAGNOSTIC_SAMPLE_CHARS - stats['sampled']])
+                stats['sampled'] += len(sample_parts[-1])
+            if on_text:
+                with metrics.stage('score'):
+                    on_text(text)
+            yield text
+
+    with metrics.stage('scan'):
+        scan_result = MAPS_URL_MATCHER.scan_stream(text_chunks())
+    metrics.count('chars_decoded', stats['length'])
+    return ''.join(sample_parts), stats['length'], scan_result
+
+
+def clean_and_decode_url(url: str) -> Optional[str]:
+    """Clean and decode URL properly"""
+    if not url:
+        return None
+
+    # Decode URL if encoded
+    try:
+        if '%3a' in url.lower() or '%2f' in url.lower():
+            url = urllib.parse.unquote(url)
+    except:
+        pass
+
+    # Remove unwanted characters
+    for char in ['"', "'", '<', '>', '}', ')', ']', ';', ',', '\\']:
+        url = url.split(char)[0]
+
+    url = url.strip()
+
+    # Must start with http/https
+    if not url.startswith(('http://', 'https://')):
+        return None
+
+    return url
+
+
+def is_maps_url(url: str) -> bool:
+    """Check if URL is a Google Maps URL"""
+    if not url or len(url) < 20:
+        return False
+
+    url_lower = url.lower()
+
+    # Decode if needed
+    try:
+        if '%3a' in url_lower or '%2f' in url_lower:
+            url_lower = urllib.parse.unquote(url_lower)
+    except:
+        pass
+
+    # Maps indicators
+    maps_indicators = [
+        'google.com/maps',
+        'maps.google.com',
+        'goo.gl/maps',
+        'maps.app.goo.gl',
+    ]
+
+    has_indicator = any(indicator in url_lower for indicator in maps_indicators)
+    has_location = any(pattern in url_lower for pattern in ['@', 'place/', 'search/', 'dir/', '/maps/'])
+
+    return has_indicator and (has_location or len(url) > 50)
+
+
+def clean_found_urls(found_urls: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """Clean and validate raw matches; returns (Maps URLs, rejected URLs)"""
+    clean_urls = []
+    invalid_urls = []
+
+    for url in found_urls:
+        # Decode URL if encoded
+        clean_url = clean_and_decode_url(url)
+        if clean_url and is_maps_url(clean_url):
+            clean_urls.append(clean_url)
+        elif clean_url:
+            invalid_urls.append(clean_url[:100])  # Keep for debugging
+
+    # Remove duplicate places (not just identical strings) while preserving order
+    return dedupe_places(clean_urls), invalid_urls
+
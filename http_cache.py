@@ -0,0 +1,167 @@
+"""
+Lead Generation Agent - HTTP Response Cache
+Persistent SQLite cache for fetched pages with conditional revalidation
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from config import HTTP_CACHE_PATH, HTTP_CACHE_TTL, HTTP_CACHE_MAX_BYTES
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Headers that describe the wire encoding, not the cached (decoded) body
+_DROPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'keep-alive'}
+
+
+def normalize_cache_key(url: str) -> str:
+    """Normalize a URL so trivially different spellings share a cache entry
+
+    Lowercases scheme and host, drops default ports and fragments, and sorts
+    query parameters.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f'{host}:{parts.port}'
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or '/', query, ''))
+
+
+@dataclass
+class CachedResponse:
+    """A cache entry, body already decompressed"""
+    url: str
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    expires_at: float
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    @property
+    def can_revalidate(self) -> bool:
+        return bool(self.etag or self.last_modified)
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of HTTP responses stored in SQLite
+
+    Bodies are zlib-compressed. Entries expire after ``ttl`` seconds; expired
+    entries with an ETag or Last-Modified are kept so they can be revalidated
+    with a conditional request. When the stored size passes ``max_bytes`` the
+    least recently used entries are evicted.
+    """
+
+    def __init__(self, path: str = HTTP_CACHE_PATH, ttl: float = HTTP_CACHE_TTL, max_bytes: int = HTTP_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = dict.fromkeys(['hits', 'misses', 'revalidated', 'stores', 'evictions'], 0)
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # One connection shared by all threads, serialized by the lock
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        ''')
+        self._db.execute('CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access)')
+        self._db.commit()
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        """Look up an entry, fresh or stale; None if absent"""
+        key = normalize_cache_key(url)
+        with self._lock:
+            row = self._db.execute(
+                'SELECT url, status, headers, body, etag, last_modified, expires_at FROM responses WHERE key = ?',
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute('UPDATE responses SET last_access = ? WHERE key = ?', (time.time(), key))
+            self._db.commit()
+
+        url, status, headers, body, etag, last_modified, expires_at = row
+        return CachedResponse(url, status, json.loads(headers), zlib.decompress(body), etag, last_modified, expires_at)
+
+    def put(self, url: str, status: int, headers: Dict[str, str], body: bytes):
+        """Store a response body and evict LRU entries past the size bound"""
+        headers = {k: v for k, v in headers.items() if k.lower() not in _DROPPED_HEADERS}
+        lowered = {k.lower(): v for k, v in headers.items()}
+        compressed = zlib.compress(body, 6)
+        now = time.time()
+
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (normalize_cache_key(url), url, status, json.dumps(headers), compressed, len(compressed),
+                 lowered.get('etag'), lowered.get('last-modified'), now, now + self.ttl, now)
+            )
+            self._stats['stores'] += 1
+            self._evict()
+            self._db.commit()
+
+    def refresh(self, url: str):
+        """Extend an entry's lifetime after a 304 Not Modified"""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                'UPDATE responses SET expires_at = ?, last_access = ? WHERE key = ?',
+                (now + self.ttl, now, normalize_cache_key(url))
+            )
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute('SELECT key, size FROM responses ORDER BY last_access').fetchall():
+            self._db.execute('DELETE FROM responses WHERE key = ?', (key,))
+            self._stats['evictions'] += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def record(self, event: str):
+        """Count a cache event (hits, misses, revalidated)"""
+        with self._lock:
+            self._stats[event] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            row = self._db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        stats['entries'], stats['stored_bytes'] = row
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._db.execute('DELETE FROM responses')
+            self._db.commit()
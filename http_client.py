@@ -0,0 +1,271 @@
+"""
+Lead Generation Agent - Shared HTTP Client
+Process-wide pooled requests session used by every fetch path
+"""
+
+import threading
+from typing import Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from config import (
+    HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE, HTTP_RETRIES, HTTP_BACKOFF_FACTOR, REQUEST_TIMEOUT,
+    HTTP_CACHE_ENABLED, HTTP_CACHE_MAX_ENTRY_BYTES,
+)
+from http_cache import ResponseCache, CachedResponse
+import metrics
+
+
+class ConnectionStats:
+    """Thread-safe counters for pooled connection usage"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def record_new_connection(self):
+        with self._lock:
+            self.new_connections += 1
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.new_connections = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'new_connections': self.new_connections,
+                'reused_connections': max(self.requests - self.new_connections, 0),
+            }
+
+
+CONNECTION_STATS = ConnectionStats()
+
+
+class _CountingHTTPConnection(HTTPConnection):
+    def connect(self):
+        # Called once per TCP (and TLS) handshake, including silent reconnects
+        CONNECTION_STATS.record_new_connection()
+        with metrics.stage('connect'):  # DNS lookup, TCP and TLS handshakes
+            super().connect()
+
+
+class _CountingHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        CONNECTION_STATS.record_new_connection()
+        with metrics.stage('connect'):
+            super().connect()
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+    def urlopen(self, *args, **kwargs):
+        CONNECTION_STATS.record_request()
+        return super().urlopen(*args, **kwargs)
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
+    def urlopen(self, *args, **kwargs):
+        CONNECTION_STATS.record_request()
+        return super().urlopen(*args, **kwargs)
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter with per-host keep-alive pools, retries and usage counters
+
+    Connection errors and 500/502/504 are retried here. 429 and 503 are
+    returned at once, so HostRateLimiter sees them and pauses the host
+    instead of a worker thread sleeping out Retry-After inside urllib3.
+    """
+
+    def __init__(self, pool_connections: int = HTTP_POOL_CONNECTIONS, pool_maxsize: int = HTTP_POOL_MAXSIZE,
+                 retries: int = HTTP_RETRIES, backoff_factor: float = HTTP_BACKOFF_FACTOR):
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(500, 502, 504),
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            respect_retry_after_header=False,  # Retry-After is the rate limiter's to honour, not a blocking sleep
+            raise_on_status=False,  # Let callers see the final response and raise_for_status()
+        )
+        super().__init__(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _CountingHTTPConnectionPool,
+            'https': _CountingHTTPSConnectionPool,
+        }
+
+
+class _CachingRawReader:
+    """Wraps a urllib3 response and copies the body into the cache as it streams
+
+    The caller still reads chunk by chunk; the copy is dropped once it passes
+    ``max_bytes`` and is only stored if the body was read to the end.
+    """
+
+    def __init__(self, raw, on_complete, max_bytes: int):
+        self._raw = raw
+        self._on_complete = on_complete
+        self._max_bytes = max_bytes
+        self._buffer = bytearray()
+        self._overflow = False
+
+    def stream(self, amt=2 ** 16, decode_content=None):
+        for chunk in self._raw.stream(amt, decode_content=decode_content):
+            if not self._overflow:
+                self._buffer += chunk
+                if len(self._buffer) > self._max_bytes:
+                    self._overflow = True
+                    self._buffer = bytearray()
+            yield chunk
+        if not self._overflow:
+            self._on_complete(bytes(self._buffer))
+            self._buffer = bytearray()
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+class CachingHTTPAdapter(PooledHTTPAdapter):
+    """Pooled adapter that serves GETs from the on-disk response cache
+
+    Fresh entries are returned without touching the network. Stale entries
+    with an ETag or Last-Modified are revalidated with a conditional request
+    and served from disk on 304 Not Modified.
+    """
+
+    def __init__(self, cache: ResponseCache, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+
+    def send(self, request, stream=False, **kwargs):
+        if request.method != 'GET':
+            return super().send(request, stream=stream, **kwargs)
+
+        cached = self.cache.get(request.url)
+        if cached and cached.is_fresh:
+            self.cache.record('hits')
+            return self._build_cached_response(request, cached, 'HIT')
+
+        if cached and cached.can_revalidate:
+            if cached.etag:
+                request.headers['If-None-Match'] = cached.etag
+            if cached.last_modified:
+                request.headers['If-Modified-Since'] = cached.last_modified
+
+        response = super().send(request, stream=stream, **kwargs)
+
+        if response.status_code == 304 and cached:
+            response.close()
+            self.cache.refresh(request.url)
+            self.cache.record('revalidated')
+            return self._build_cached_response(request, cached, 'REVALIDATED')
+
+        self.cache.record('misses')
+        cache_control = response.headers.get('Cache-Control', '').lower()
+        if response.status_code == 200 and 'no-store' not in cache_control:
+            url, headers = request.url, dict(response.headers)
+            response.raw = _CachingRawReader(
+                response.raw,
+                lambda body: self.cache.put(url, 200, headers, body),
+                HTTP_CACHE_MAX_ENTRY_BYTES
+            )
+        return response
+
+    def _build_cached_response(self, request, cached: CachedResponse, state: str) -> requests.Response:
+        response = requests.Response()
+        response.status_code = cached.status
+        response.reason = 'OK'
+        response.headers = CaseInsensitiveDict(cached.headers)
+        response.headers['X-Cache'] = state
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        # Body is already in memory; iter_content() slices it
+        response._content = cached.body
+        response._content_consumed = True
+        return response
+
+
+_session = None
+_cache = None
+_session_lock = threading.Lock()
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    """Return the process-wide response cache, opening it on first use"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
+
+
+def create_session(use_cache: bool = HTTP_CACHE_ENABLED) -> requests.Session:
+    """Build a session with the pooled adapter mounted for http and https"""
+    session = requests.Session()
+    adapter = CachingHTTPAdapter(get_cache()) if use_cache else PooledHTTPAdapter()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide session, creating it on first use
+
+    The session outlives Streamlit reruns and is shared between threads, so
+    keep-alive connections are reused across extractions. Pass headers per
+    request rather than mutating ``session.headers``.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    """GET through the shared session, defaulting to config.REQUEST_TIMEOUT"""
+    kwargs.setdefault('timeout', REQUEST_TIMEOUT)
+    return get_session().get(url, **kwargs)
+
+
+def connection_stats() -> Dict[str, int]:
+    """Requests made and connections opened vs reused since the last reset"""
+    return CONNECTION_STATS.snapshot()
+
+
+def cache_stats() -> Dict[str, int]:
+    """Response cache hits, misses and size; empty when caching is disabled"""
+    return get_cache().stats() if HTTP_CACHE_ENABLED else {}
+
+
+def close_session():
+    """Close pooled connections; the next get_session() starts a new pool"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
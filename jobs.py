@@ -0,0 +1,445 @@
+"""
+Lead Generation Agent - Background Jobs
+SQLite-backed job queue so extractions outlive Streamlit reruns and page refreshes
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from dataclasses import dataclass, asdict, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from batch import BatchExtractor, BatchResult, PageResult
+from config import (JOB_DB_PATH, JOB_WORKERS, JOB_POLL_INTERVAL, JOB_RESULT_TTL,
+                    BATCH_MAX_WORKERS, BATCH_PER_HOST_LIMIT, CHROME_OPTIONS)
+from engine import ExtractionEngine, ExtractionEvent
+from place_index import get_place_index
+from tiered_fetch import TIER_BROWSER
+from utils import HostRateLimiter
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+FINISHED_STATUSES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+JOB_EXTRACT = 'extract'  # params: url plus engine options
+JOB_BATCH = 'batch'  # params: page_urls plus batch options
+
+_COLUMNS = ('id', 'kind', 'params', 'fingerprint', 'status', 'progress', 'message', 'total',
+            'completed', 'result', 'error', 'cancel_requested', 'created', 'updated')
+_UPDATABLE = {'status', 'progress', 'message', 'total', 'completed', 'result', 'error', 'cancel_requested'}
+
+
+def job_fingerprint(kind: str, params: Dict[str, Any]) -> str:
+    """Identical submissions share a fingerprint whatever the key order"""
+    return hashlib.sha1(json.dumps([kind, params], sort_keys=True).encode('utf-8')).hexdigest()
+
+
+@dataclass
+class Job:
+    """One row of the job table"""
+    id: str
+    kind: str
+    params: Dict[str, Any]
+    status: str = JOB_QUEUED
+    progress: int = 0
+    message: str = ''
+    total: int = 0
+    completed: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    cancel_requested: bool = False
+    created: float = 0.0
+    updated: float = 0.0
+    # Set by submit() when a finished identical job was returned instead of a new one
+    cached: bool = field(default=False, compare=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    @classmethod
+    def from_row(cls, row: Tuple) -> 'Job':
+        data = dict(zip(_COLUMNS, row))
+        data.pop('fingerprint')
+        data['params'] = json.loads(data['params'])
+        data['result'] = json.loads(data['result']) if data['result'] else None
+        data['cancel_requested'] = bool(data['cancel_requested'])
+        return cls(**data)
+
+
+class JobStore:
+    """Job table and per-page results in SQLite, shared by every session
+
+    Batch jobs save each page as it finishes, so a cancelled, failed or
+    interrupted job resumes with only the pages it has not done yet.
+    """
+
+    def __init__(self, path: str = JOB_DB_PATH, result_ttl: float = JOB_RESULT_TTL):
+        self.path = path
+        self.result_ttl = result_ttl
+        self._lock = threading.Lock()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # One connection shared by all threads, serialized by the lock
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                params TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                status TEXT NOT NULL,
+                progress INTEGER NOT NULL DEFAULT 0,
+                message TEXT NOT NULL DEFAULT '',
+                total INTEGER NOT NULL DEFAULT 0,
+                completed INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            )
+        ''')
+        self._db.execute('CREATE INDEX IF NOT EXISTS jobs_fingerprint ON jobs (fingerprint, status)')
+        self._db.execute('''
+            CREATE TABLE IF NOT EXISTS job_pages (
+                job_id TEXT NOT NULL,
+                page_url TEXT NOT NULL,
+                result TEXT NOT NULL,
+                PRIMARY KEY (job_id, page_url)
+            )
+        ''')
+        self._db.commit()
+
+    def _select(self, where: str, args: Tuple = (), suffix: str = '') -> List[Job]:
+        rows = self._db.execute(f'SELECT {", ".join(_COLUMNS)} FROM jobs WHERE {where} {suffix}', args)
+        return [Job.from_row(row) for row in rows]
+
+    def submit(self, kind: str, params: Dict[str, Any], reuse_results: bool = True) -> Job:
+        """Queue a job, or return an identical one that is pending or recently done
+
+        A queued or running twin is always shared. A finished one is reused
+        (with ``cached`` set) only if it succeeded within ``result_ttl``.
+        """
+        fingerprint = job_fingerprint(kind, params)
+        now = time.time()
+        with self._lock:
+            twins = self._select(
+                'fingerprint = ? AND (status IN (?, ?) OR (? AND status = ? AND updated >= ?))',
+                (fingerprint, JOB_QUEUED, JOB_RUNNING, reuse_results, JOB_DONE, now - self.result_ttl),
+                'ORDER BY created DESC LIMIT 1'
+            )
+            if twins:
+                twins[0].cached = twins[0].status == JOB_DONE
+                return twins[0]
+
+            job = Job(uuid.uuid4().hex[:12], kind, params, created=now, updated=now)
+            self._db.execute(
+                'INSERT INTO jobs (id, kind, params, fingerprint, status, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job.id, kind, json.dumps(params), fingerprint, JOB_QUEUED, now, now)
+            )
+            self._db.commit()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            jobs = self._select('id = ?', (job_id,))
+        return jobs[0] if jobs else None
+
+    def recent(self, limit: int = 10) -> List[Job]:
+        with self._lock:
+            return self._select('1', (), f'ORDER BY created DESC LIMIT {int(limit)}')
+
+    def claim_next(self) -> Optional[Job]:
+        """Mark the oldest queued job running and return it"""
+        with self._lock:
+            jobs = self._select('status = ?', (JOB_QUEUED,), 'ORDER BY created LIMIT 1')
+            if not jobs:
+                return None
+            job = jobs[0]
+            job.status = JOB_RUNNING
+            self._db.execute('UPDATE jobs SET status = ?, updated = ? WHERE id = ?',
+                             (JOB_RUNNING, time.time(), job.id))
+            self._db.commit()
+        return job
+
+    def update(self, job_id: str, **fields):
+        unknown = set(fields) - _UPDATABLE
+        if unknown:
+            raise ValueError(f"Unknown job fields: {', '.join(sorted(unknown))}")
+        if 'result' in fields:
+            fields['result'] = json.dumps(fields['result'])
+        fields['updated'] = time.time()
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        with self._lock:
+            self._db.execute(f'UPDATE jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+            self._db.commit()
+
+    def request_cancel(self, job_id: str) -> bool:
+        """Cancel a queued job now, or ask a running one to stop; False if already finished"""
+        with self._lock:
+            cursor = self._db.execute(
+                'UPDATE jobs SET status = ?, message = ?, updated = ? WHERE id = ? AND status = ?',
+                (JOB_CANCELLED, 'Cancelled before it started', time.time(), job_id, JOB_QUEUED)
+            )
+            if not cursor.rowcount:
+                cursor = self._db.execute(
+                    'UPDATE jobs SET cancel_requested = 1, message = ?, updated = ? WHERE id = ? AND status = ?',
+                    ('Cancelling after the pages in progress...', time.time(), job_id, JOB_RUNNING)
+                )
+            self._db.commit()
+            return bool(cursor.rowcount)
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            row = self._db.execute('SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def resume(self, job_id: str) -> bool:
+        """Queue a cancelled or failed job again; finished batch pages are kept"""
+        with self._lock:
+            cursor = self._db.execute(
+                'UPDATE jobs SET status = ?, cancel_requested = 0, error = NULL, message = ?, updated = ? '
+                'WHERE id = ? AND status IN (?, ?)',
+                (JOB_QUEUED, 'Resuming...', time.time(), job_id, JOB_CANCELLED, JOB_FAILED)
+            )
+            self._db.commit()
+            return bool(cursor.rowcount)
+
+    def requeue_interrupted(self) -> int:
+        """Put jobs left running by a previous process back in the queue"""
+        with self._lock:
+            cursor = self._db.execute(
+                'UPDATE jobs SET status = ?, cancel_requested = 0, message = ?, updated = ? WHERE status = ?',
+                (JOB_QUEUED, 'Interrupted by a restart, resuming...', time.time(), JOB_RUNNING)
+            )
+            self._db.commit()
+            return cursor.rowcount
+
+    def save_page(self, job_id: str, page_url: str, page: Dict[str, Any]):
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO job_pages VALUES (?, ?, ?)',
+                             (job_id, page_url, json.dumps(page)))
+            self._db.commit()
+
+    def pages(self, job_id: str) -> Dict[str, Dict[str, Any]]:
+        """Saved page results of a batch job, keyed by page URL"""
+        with self._lock:
+            rows = self._db.execute('SELECT page_url, result FROM job_pages WHERE job_id = ?', (job_id,))
+            return {page_url: json.loads(result) for page_url, result in rows}
+
+
+class JobRunner:
+    """Runs queued jobs on background threads, independent of any session
+
+    A dispatcher thread claims jobs while fewer than ``max_workers`` are
+    running. Progress and results go to the store, which the UI polls, so a
+    rerun or refresh only changes who is watching. Job threads are daemons:
+    jobs cut short by a process exit are requeued on the next start.
+    """
+
+    def __init__(self, store: Optional[JobStore] = None, max_workers: int = JOB_WORKERS,
+                 poll_interval: float = JOB_POLL_INTERVAL):
+        self.store = store if store is not None else JobStore()
+        self.max_workers = max(1, max_workers)
+        self.poll_interval = poll_interval
+        # Shared by polite batch jobs and email enrichment in this process
+        self.rate_limiter = HostRateLimiter()
+        self._slots = threading.Semaphore(self.max_workers)
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.store.requeue_interrupted()
+            self._thread = threading.Thread(target=self._dispatch, name='job-dispatcher', daemon=True)
+            self._thread.start()
+
+    def submit(self, kind: str, params: Dict[str, Any], reuse_results: bool = True) -> Job:
+        job = self.store.submit(kind, params, reuse_results=reuse_results)
+        self.wake()
+        return job
+
+    def resume(self, job_id: str) -> bool:
+        resumed = self.store.resume(job_id)
+        self.wake()
+        return resumed
+
+    def wake(self):
+        self._wake.set()
+
+    def _dispatch(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            while self._slots.acquire(blocking=False):
+                job = self.store.claim_next()
+                if job is None:
+                    self._slots.release()
+                    break
+                threading.Thread(target=self._run, args=(job,), name=f'job-{job.id}', daemon=True).start()
+
+    def _run(self, job: Job):
+        try:
+            if job.kind == JOB_EXTRACT:
+                self._run_extract(job)
+            elif job.kind == JOB_BATCH:
+                self._run_batch(job)
+            else:
+                raise ValueError(f"Unknown job kind: {job.kind}")
+        except Exception as e:
+            self.store.update(job.id, status=JOB_FAILED, error=traceback.format_exc(),
+                              message=f"Job failed: {type(e).__name__}: {e}")
+        finally:
+            self._slots.release()
+            self.wake()
+
+    def _run_extract(self, job: Job):
+        params = job.params
+        if self.store.is_cancel_requested(job.id):
+            self.store.update(job.id, status=JOB_CANCELLED, message='Cancelled')
+            return
+
+        # Status lines update the job row; panels are kept for the UI to replay
+        events: List[Dict[str, Any]] = []
+        last_status = ExtractionEvent('status')
+
+        def on_event(event: ExtractionEvent):
+            nonlocal last_status
+            if event.kind == 'status':
+                last_status = event
+                self.store.update(job.id, message=event.message,
+                                  **({'progress': event.progress} if event.progress is not None else {}))
+            elif event.kind == 'progress':
+                self.store.update(job.id, progress=event.progress)
+            else:
+                events.append(asdict(event))
+
+        engine = ExtractionEngine(
+            streaming=params.get('streaming', True),
+            browser_fallback=params.get('browser_fallback', True),
+            expand_short_links=params.get('expand_short_links', True),
+            debug=params.get('debug', False),
+            browser_arguments=params.get('browser_arguments') or CHROME_OPTIONS,
+            on_event=on_event,
+        )
+        result = engine.extract(params['url'])
+
+        maps_urls = result.maps_urls
+        skipped = 0
+        if params.get('new_only') and maps_urls:
+            maps_urls = get_place_index().filter_new(maps_urls)
+            skipped = len(result.maps_urls) - len(maps_urls)
+
+        self.store.update(
+            job.id,
+            status=JOB_FAILED if result.error else JOB_DONE,
+            progress=100,
+            message=last_status.message,
+            error=result.error,
+            result={
+                'maps_urls': maps_urls,
+                'skipped': skipped,
+                'tier': result.tier,
+                'page_length': result.page_length,
+                'elapsed': result.elapsed,
+                'status_level': last_status.level,
+                'events': events,
+                'metrics': result.metrics,
+            },
+        )
+
+    def _run_batch(self, job: Job):
+        params = job.params
+        page_urls = params['page_urls']
+        total = len(page_urls)
+        saved = self.store.pages(job.id)
+        pending = [page_url for page_url in page_urls if page_url not in saved]
+        self.store.update(job.id, total=total, completed=len(saved),
+                          message=f"Resuming with {len(pending)} of {total} pages left" if saved
+                          else f"Extracting {total} pages")
+
+        def on_result(page: PageResult, done: int, _):
+            self.store.save_page(job.id, page.page_url, asdict(page))
+            completed = len(saved) + done
+            if page.error:
+                message = f"⚠️ {completed}/{total} failed: {page.page_url[:80]}"
+            else:
+                via = " (browser)" if page.tier == TIER_BROWSER else ""
+                message = f"✅ {completed}/{total} {len(page.maps_urls)} URLs from {page.page_url[:80]}{via}"
+            self.store.update(job.id, completed=completed, progress=int(completed / total * 100), message=message)
+
+        extractor = BatchExtractor(
+            max_workers=params.get('max_workers', BATCH_MAX_WORKERS),
+            per_host_limit=params.get('per_host_limit', BATCH_PER_HOST_LIMIT),
+            streaming=params.get('streaming', True),
+            rate_limiter=self.rate_limiter if params.get('polite') else None,
+            browser_fallback=params.get('browser_fallback', False),
+            expand_short_links=params.get('expand_short_links', False),
+            browser_arguments=params.get('browser_arguments') or CHROME_OPTIONS,
+        )
+        run = extractor.extract(pending, on_result=on_result,
+                                should_stop=lambda: self.store.is_cancel_requested(job.id))
+
+        # Merge pages from every run of this job, in input order
+        saved = self.store.pages(job.id)
+        merged = BatchResult(elapsed=run.elapsed)
+        for page_url in page_urls:
+            if page_url in saved:
+                merged.add_page(PageResult(**saved[page_url]))
+
+        rows = merged.to_rows()
+        skipped = 0
+        if params.get('new_only') and rows and not run.stopped:
+            new_urls = set(get_place_index().filter_new(list(merged.sources)))
+            skipped = len(rows) - len(new_urls)
+            rows = [row for row in rows if row['Google Maps URL'] in new_urls]
+
+        rendered = sum(1 for page in merged.pages if page.tier == TIER_BROWSER)
+        if run.stopped:
+            status = JOB_CANCELLED
+            message = f"⏹️ Cancelled after {len(merged.pages)} of {total} pages ({len(rows)} unique Google Maps URLs so far)"
+        else:
+            status = JOB_DONE
+            message = (f"✅ {len(rows)} unique Google Maps URLs from {len(merged.pages)} pages "
+                       f"in {run.elapsed:.1f}s ({rendered} needed the browser)")
+        self.store.update(
+            job.id,
+            status=status,
+            progress=int(len(merged.pages) / total * 100) if total else 100,
+            completed=len(merged.pages),
+            message=message,
+            result={
+                'rows': rows,
+                'skipped': skipped,
+                'failed': [{'page_url': page.page_url, 'error': page.error} for page in merged.failed_pages],
+                'metrics': merged.metrics,
+            },
+        )
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> JobRunner:
+    """Return the process-wide job runner, starting it on first use"""
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = JobRunner()
+                _runner.start()
+    return _runner
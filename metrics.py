@@ -0,0 +1,369 @@
+"""
+Lead Generation Agent - Metrics
+Per-run stage timings and counters, aggregated into a Prometheus text export
+"""
+
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import METRICS_ENABLED, METRICS_FILE, METRICS_FILE_INTERVAL, METRICS_PORT
+
+# Stages in pipeline order; the UI breakdown and the export list them this way
+STAGES = ('throttle', 'connect', 'request', 'download', 'dispatch', 'decode', 'scan', 'score',
+          'render', 'clean', 'expand', 'export')
+
+COUNTER_HELP = {
+    'bytes_downloaded': 'Response body bytes read',
+    'chars_decoded': 'Characters of decoded page text',
+    'matches': 'Raw Maps URL matches, by pattern category',
+    'urls_found': 'Clean Maps URLs returned',
+    'urls_rejected': 'Candidate URLs rejected by cleaning and validation',
+}
+
+_enabled = METRICS_ENABLED
+
+
+def set_enabled(enabled: bool):
+    """Switch instrumentation on or off for the whole process"""
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+CounterKey = Tuple[str, str]  # (counter name, category or '')
+
+
+class _Stage:
+    """Times one stage of a run, excluding the time of stages nested inside it"""
+    __slots__ = ('run', 'name', 'start', 'nested')
+
+    def __init__(self, run: 'RunMetrics', name: str):
+        self.run = run
+        self.name = name
+        self.nested = 0.0
+
+    def __enter__(self):
+        self.run._stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        stack = self.run._stack
+        stack.pop()
+        if stack:
+            stack[-1].nested += elapsed
+        self.run.add_time(self.name, elapsed - self.nested)
+        return False
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class RunMetrics:
+    """Stage timings and counters of one extraction
+
+    Stage times are exclusive: a download that happens while the scanner
+    pulls text is charged to 'download', not also to 'scan'. That matters
+    when streaming, where download, decode and scan interleave chunk by
+    chunk.
+    """
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self.counters: Dict[CounterKey, int] = {}
+        self.labels: Dict[str, str] = {}
+        self._stack: List[_Stage] = []
+
+    def stage(self, name: str) -> _Stage:
+        return _Stage(self, name)
+
+    def add_time(self, name: str, seconds: float):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def count(self, name: str, amount: int = 1, category: str = ''):
+        key = (name, category)
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """JSON-friendly copy: {'timings': {stage: seconds}, 'counters': {name[:category]: n}}"""
+        return {
+            'timings': dict(self.timings),
+            'counters': {f'{name}:{category}' if category else name: value
+                         for (name, category), value in self.counters.items()},
+        }
+
+
+_current_run: ContextVar[Optional[RunMetrics]] = ContextVar('metrics_run', default=None)
+
+
+class _RegistryStage:
+    """A stage outside any run (CSV export, a bare short link lookup), recorded straight to the registry"""
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        get_registry().add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def stage(name: str):
+    """Context manager timing a stage of the current run; a shared no-op when disabled"""
+    run = _current_run.get()
+    if run is not None:
+        return run.stage(name)
+    if _enabled:
+        return _RegistryStage(name)
+    return _NULL_STAGE
+
+
+def add_time(name: str, seconds: float):
+    """Charge time measured elsewhere, such as in a scan worker process, to a stage"""
+    run = _current_run.get()
+    if run is not None:
+        run.add_time(name, seconds)
+    elif _enabled:
+        get_registry().add_time(name, seconds)
+
+
+def count(name: str, amount: int = 1, category: str = ''):
+    run = _current_run.get()
+    if run is not None:
+        run.count(name, amount, category)
+    elif _enabled:
+        get_registry().count(name, amount, category)
+
+
+def timed_iter(iterable: Iterable, name: str, size_counter: Optional[str] = None) -> Iterable:
+    """Charge the time spent producing each item to a stage, optionally counting len(item)
+
+    Returns the iterable untouched when there is no run to record into.
+    """
+    run = _current_run.get()
+    if run is None:
+        return iterable
+    return _timed_iter(run, iter(iterable), name, size_counter)
+
+
+def _timed_iter(run: RunMetrics, iterator: Iterator, name: str, size_counter: Optional[str]) -> Iterator:
+    while True:
+        with run.stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        if size_counter:
+            run.count(size_counter, len(item))
+        yield item
+
+
+@contextmanager
+def record_run():
+    """Collect the stages and counters of the code inside as one run
+
+    The run is made current for this thread (and context), so instrumented
+    code anywhere below, such as the HTTP client's connect, records into
+    it. On exit it is added to the process-wide registry. When
+    instrumentation is off, the run stays empty and nothing is recorded.
+    """
+    run = RunMetrics()
+    if not _enabled:
+        yield run
+        return
+    token = _current_run.set(run)
+    try:
+        yield run
+    finally:
+        _current_run.reset(token)
+        get_registry().observe(run)
+
+
+def merge_snapshots(snapshots: Iterable[Dict[str, Dict[str, float]]]) -> Dict[str, Dict[str, float]]:
+    """Sum RunMetrics.snapshot() dicts, e.g. every page of a batch"""
+    merged: Dict[str, Dict[str, float]] = {'timings': {}, 'counters': {}}
+    for snapshot in snapshots:
+        for section in ('timings', 'counters'):
+            target = merged[section]
+            for key, value in (snapshot or {}).get(section, {}).items():
+                target[key] = target.get(key, 0) + value
+    return merged
+
+
+def stage_breakdown(snapshot: Dict[str, Dict[str, float]]) -> List[Tuple[str, float, float]]:
+    """(stage, seconds, share of the total) in pipeline order, unknown stages last"""
+    timings = (snapshot or {}).get('timings', {})
+    total = sum(timings.values())
+    order = {name: i for i, name in enumerate(STAGES)}
+    return [(name, seconds, seconds / total if total else 0.0)
+            for name, seconds in sorted(timings.items(), key=lambda item: order.get(item[0], len(STAGES)))]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsRegistry:
+    """Process-wide totals of every recorded run, rendered as Prometheus text"""
+
+    def __init__(self, path: str = METRICS_FILE, file_interval: float = METRICS_FILE_INTERVAL):
+        self.path = path
+        self.file_interval = file_interval
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self.stage_seconds: Dict[str, float] = {}
+        self.stage_calls: Dict[str, int] = {}
+        self.counters: Dict[CounterKey, int] = {}
+        self.runs: Dict[Tuple[str, str], int] = {}
+        self._last_write = 0.0
+
+    def add_time(self, name: str, seconds: float, calls: int = 1):
+        with self._lock:
+            self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + seconds
+            self.stage_calls[name] = self.stage_calls.get(name, 0) + calls
+
+    def count(self, name: str, amount: int = 1, category: str = ''):
+        with self._lock:
+            key = (name, category)
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, run: RunMetrics):
+        with self._lock:
+            for name, seconds in run.timings.items():
+                self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + seconds
+                self.stage_calls[name] = self.stage_calls.get(name, 0) + run.calls.get(name, 0)
+            for key, value in run.counters.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+            key = (run.labels.get('tier', ''), run.labels.get('outcome', ''))
+            self.runs[key] = self.runs.get(key, 0) + 1
+            due = self.path and time.monotonic() - self._last_write >= self.file_interval
+            if due:
+                self._last_write = time.monotonic()
+        if due:
+            try:
+                self.write()
+            except OSError as e:
+                # A broken export must never fail an extraction
+                print(f"Could not write metrics to {self.path}: {e}")
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            stage_seconds = dict(self.stage_seconds)
+            stage_calls = dict(self.stage_calls)
+            counters = dict(self.counters)
+            runs = dict(self.runs)
+
+        lines = [
+            '# HELP leadgen_extractions_total Page extractions finished, by tier and outcome',
+            '# TYPE leadgen_extractions_total counter',
+        ]
+        for (tier, outcome), value in sorted(runs.items()):
+            lines.append(f'leadgen_extractions_total{{tier="{_escape(tier)}",outcome="{_escape(outcome)}"}} {value}')
+
+        order = {name: i for i, name in enumerate(STAGES)}
+        stages = sorted(stage_seconds, key=lambda name: (order.get(name, len(STAGES)), name))
+        lines += [
+            '# HELP leadgen_stage_seconds_total Wall time spent in each extraction stage (exclusive of nested stages)',
+            '# TYPE leadgen_stage_seconds_total counter',
+        ]
+        lines += [f'leadgen_stage_seconds_total{{stage="{_escape(name)}"}} {stage_seconds[name]:.6f}' for name in stages]
+        lines += [
+            '# HELP leadgen_stage_calls_total Times each extraction stage was entered',
+            '# TYPE leadgen_stage_calls_total counter',
+        ]
+        lines += [f'leadgen_stage_calls_total{{stage="{_escape(name)}"}} {stage_calls.get(name, 0)}' for name in stages]
+
+        for name in sorted({name for name, _ in counters}):
+            metric = f'leadgen_{name}_total'
+            lines += [f'# HELP {metric} {COUNTER_HELP.get(name, name.replace("_", " ").capitalize())}',
+                      f'# TYPE {metric} counter']
+            for (counter, category), value in sorted(counters.items()):
+                if counter == name:
+                    labels = f'{{category="{_escape(category)}"}}' if category else ''
+                    lines.append(f'{metric}{labels} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: Optional[str] = None):
+        """Write the export atomically, for node_exporter's textfile collector or a sidecar"""
+        path = path or self.path
+        if not path:
+            return
+        text = self.render_prometheus()
+        with self._write_lock:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            temp_path = f'{path}.{os.getpid()}.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(temp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = get_registry().render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """Serve GET /metrics from a daemon thread"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> MetricsRegistry:
+    """Return the process-wide registry, starting the METRICS_PORT endpoint on first use"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                registry = MetricsRegistry()
+                if registry.path:
+                    atexit.register(registry.write)
+                if METRICS_PORT:
+                    try:
+                        start_metrics_server(METRICS_PORT)
+                    except OSError as e:
+                        print(f"Metrics endpoint not started on port {METRICS_PORT}: {e}")
+                _registry = registry
+    return _registry
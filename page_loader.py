@@ -0,0 +1,152 @@
+"""
+Lead Generation Agent - Adaptive Page Loading
+Condition-based waits and scrolling for Selenium-rendered pages
+"""
+
+import time
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from config import (
+    ADAPTIVE_LOAD_BUDGET, ADAPTIVE_SETTLE_TIME, ADAPTIVE_POLL_INTERVAL, ADAPTIVE_MAX_SCROLLS,
+    FIXED_LOAD_SCHEDULE,
+)
+
+# One round trip returns everything the wait loop needs
+_SNAPSHOT_SCRIPT = r"""
+const anchors = document.getElementsByTagName('a');
+const mapsPattern = /google\.[^\/]+\/maps|maps\.google\.|goo\.gl\/maps|maps\.app\.goo\.gl/i;
+let maps = 0;
+for (let i = 0; i < anchors.length; i++) {
+    if (mapsPattern.test(anchors[i].href || '')) maps++;
+}
+return [
+    anchors.length,
+    maps,
+    document.body ? document.body.scrollHeight : 0,
+    performance.getEntriesByType('resource').length,
+    document.readyState,
+];
+"""
+
+
+# Page HTML plus every Maps-like href, resolved and deduplicated in the browser
+_HARVEST_SCRIPT = r"""
+const mapsPattern = /google\.[^\/]+\/maps|maps\.google\.|goo\.gl\/maps|maps\.app\.goo\.gl/i;
+const seen = new Set();
+const hrefs = [];
+const anchors = document.querySelectorAll('a[href]');
+for (let i = 0; i < anchors.length; i++) {
+    const href = anchors[i].href;
+    if (href && !seen.has(href) && mapsPattern.test(href)) {
+        seen.add(href);
+        hrefs.push(href);
+    }
+}
+return {html: document.documentElement.outerHTML, hrefs: hrefs, anchors: anchors.length};
+"""
+
+
+@dataclass
+class PageSnapshot:
+    anchors: int
+    maps_links: int
+    height: int
+    resources: int
+    ready_state: str
+
+    def grew_since(self, other: 'PageSnapshot') -> bool:
+        """New anchors, Maps links or page height since an earlier snapshot"""
+        return (self.anchors > other.anchors or self.maps_links > other.maps_links
+                or self.height > other.height)
+
+
+@dataclass
+class LoadReport:
+    """How an adaptive load went, for the UI"""
+    elapsed: float
+    scrolls: int
+    anchors: int
+    maps_links: int
+    stop_reason: str
+
+    @property
+    def time_saved(self) -> float:
+        """Seconds saved against the fixed 3s + 3 x 2s schedule (negative if slower)"""
+        return FIXED_LOAD_SCHEDULE - self.elapsed
+
+
+def harvest_links(driver) -> Tuple[str, List[str]]:
+    """Return (page HTML, Maps-like hrefs) in a single WebDriver round trip
+
+    Replaces ``page_source`` plus a ``get_attribute("href")`` call per
+    anchor: filtering happens in the browser and only matching hrefs come
+    back. The hrefs are the browser-resolved ``href`` properties, so they
+    also cover relative and protocol-relative links the source regex misses.
+    """
+    result = driver.execute_script(_HARVEST_SCRIPT)
+    return result['html'], result['hrefs']
+
+
+def take_snapshot(driver) -> PageSnapshot:
+    return PageSnapshot(*driver.execute_script(_SNAPSHOT_SCRIPT))
+
+
+def wait_for_settle(driver, deadline: float, settle: float = ADAPTIVE_SETTLE_TIME,
+                    poll: float = ADAPTIVE_POLL_INTERVAL) -> PageSnapshot:
+    """Poll until the DOM and network activity stop changing
+
+    The page is idle once readyState is complete and the anchor count, page
+    height and number of loaded resources have all held still for ``settle``
+    seconds. Returns the last snapshot, idle or not, when the deadline hits.
+    """
+    snapshot = take_snapshot(driver)
+    quiet_since = time.monotonic()
+    while time.monotonic() < deadline:
+        if snapshot.ready_state == 'complete' and time.monotonic() - quiet_since >= settle:
+            break
+        time.sleep(poll)
+        latest = take_snapshot(driver)
+        if latest != snapshot:
+            quiet_since = time.monotonic()
+            snapshot = latest
+    return snapshot
+
+
+def load_page_adaptive(driver, url: str, budget: float = ADAPTIVE_LOAD_BUDGET,
+                       max_scrolls: int = ADAPTIVE_MAX_SCROLLS) -> LoadReport:
+    """Load a page and scroll only while it keeps producing new links
+
+    Replaces the fixed ``sleep(3)`` plus three ``sleep(2)`` scrolls. After the
+    initial load settles, each scroll waits for the page to go idle again and
+    scrolling stops as soon as a scroll adds no anchors, Maps links or height.
+    The whole thing is bounded by ``budget`` seconds.
+    """
+    start = time.monotonic()
+    deadline = start + budget
+
+    driver.get(url)
+    snapshot = wait_for_settle(driver, deadline)
+
+    scrolls = 0
+    stop_reason = 'max scrolls'
+    while scrolls < max_scrolls:
+        if time.monotonic() >= deadline:
+            stop_reason = 'time budget'
+            break
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        scrolls += 1
+        latest = wait_for_settle(driver, deadline)
+        if not latest.grew_since(snapshot):
+            stop_reason = 'no new content'
+            snapshot = latest
+            break
+        snapshot = latest
+
+    return LoadReport(
+        elapsed=time.monotonic() - start,
+        scrolls=scrolls,
+        anchors=snapshot.anchors,
+        maps_links=snapshot.maps_links,
+        stop_reason=stop_reason,
+    )
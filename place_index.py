@@ -0,0 +1,216 @@
+"""
+Lead Generation Agent - Place Index
+Canonical Google Maps place keys and a persistent cross-run dedup index
+"""
+
+import html
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlsplit, unquote, unquote_plus, parse_qsl
+
+from config import PLACE_INDEX_PATH, PLACE_COORD_DECIMALS
+
+SHORT_LINK_HOSTS = ('goo.gl', 'maps.app.goo.gl')
+
+# Feature ID "0x<hex>:0x<hex>"; the second half is the place's CID in hex
+# (as "data=...!1s0x...:0x..." or "ftid=0x...:0x..."; no word boundary after "!1s")
+_FEATURE_ID_PATTERN = re.compile(r'(?:!1s|ftid=|\b)0x[0-9a-f]{6,16}:(0x[0-9a-f]{6,16})\b', re.IGNORECASE)
+_CID_PATTERN = re.compile(r'[?&](?:cid|ludocid)=(\d+)')
+_PLACE_ID_PATTERN = re.compile(r'(?:place_id[:=]|query_place_id=|!19s)([A-Za-z0-9_\-]{20,})')
+# Pin coordinates in the data segment are exact; "@lat,lng,zoom" is the viewport centre
+_PIN_PATTERN = re.compile(r'!3d(-?\d+(?:\.\d+)?)!4d(-?\d+(?:\.\d+)?)')
+_VIEWPORT_PATTERN = re.compile(r'/@(-?\d+(?:\.\d+)?),(-?\d+(?:\.\d+)?)')
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# Query parameters that never identify a place
+_IGNORED_PARAMS = {
+    'hl', 'gl', 'authuser', 'entry', 'g_ep', 'g_st', 'shorturl', 'ved', 'ei', 'sa', 'usg',
+    'source', 'coh', 'skid', 'sca_esv', 'rlz', 'oq', 'gs_lcrp', 'ie', 'oe', 'z', 'll', 'sll', 'sspn',
+}
+
+
+def _unquote_twice(text: str) -> str:
+    """Undo single and double percent-encoding"""
+    decoded = unquote(text)
+    return unquote(decoded) if '%' in decoded else decoded
+
+
+def _normalize_text(text: str) -> str:
+    return _WHITESPACE_PATTERN.sub(' ', unquote_plus(_unquote_twice(text))).strip().lower()
+
+
+def _coordinates(text: str) -> Optional[str]:
+    match = _PIN_PATTERN.search(text) or _VIEWPORT_PATTERN.search(text)
+    if not match:
+        return None
+    lat, lng = (round(float(value), PLACE_COORD_DECIMALS) for value in match.groups())
+    return f'{lat:.{PLACE_COORD_DECIMALS}f},{lng:.{PLACE_COORD_DECIMALS}f}'
+
+
+def canonical_keys(url: str) -> List[str]:
+    """Every key that identifies the place a Maps URL points at, strongest first
+
+    ``cid:`` (from ?cid= or a feature ID) and ``pid:`` (a place ID) name a
+    place exactly; ``place:name@lat,lng`` comes from the path. A name
+    without coordinates is never a key of its own, since it would merge
+    every branch of a chain. Searches, directions and short links get their
+    own prefixes and anything else falls back to ``url:`` with host,
+    tracking parameters and zoom stripped. Host spelling (maps.google.com
+    vs www.google.com/maps vs country domains) and encoding never change a
+    key.
+    """
+    text = html.unescape(url.strip())
+    parts = urlsplit(text)
+    host = (parts.hostname or '').lower()
+    decoded = _unquote_twice(text)
+
+    if host in SHORT_LINK_HOSTS:
+        return [f'short:{host}{parts.path.rstrip("/")}']
+
+    keys = []
+    cid_match = _CID_PATTERN.search(decoded)
+    if cid_match:
+        keys.append(f'cid:{int(cid_match.group(1))}')
+    else:
+        feature_match = _FEATURE_ID_PATTERN.search(decoded)
+        if feature_match:
+            keys.append(f'cid:{int(feature_match.group(1), 16)}')
+    place_id_match = _PLACE_ID_PATTERN.search(decoded)
+    if place_id_match:
+        keys.append(f'pid:{place_id_match.group(1)}')
+
+    segments = [segment for segment in parts.path.split('/') if segment]
+    if segments and segments[0] == 'maps':
+        segments = segments[1:]
+    query = {k: v for k, v in parse_qsl(parts.query) if k not in _IGNORED_PARAMS}
+
+    if len(segments) >= 2 and segments[0] == 'place':
+        coordinates = _coordinates(decoded)
+        # Without coordinates the IDs above, or else the url: fallback, identify the place
+        if coordinates:
+            keys.append(f'place:{_normalize_text(segments[1])}@{coordinates}')
+    elif len(segments) >= 2 and segments[0] == 'search':
+        keys.append(f'search:{_normalize_text(segments[1])}')
+    elif segments and segments[0] == 'dir':
+        stops = [_normalize_text(s) for s in segments[1:] if not s.startswith(('@', 'data='))]
+        keys.append('dir:' + '/'.join(stops))
+    elif query.get('q') and not keys:
+        keys.append(f'search:{_normalize_text(query["q"])}')
+
+    if not keys:
+        path = '/'.join(s for s in segments if not s.startswith(('@', 'data=')))
+        params = '&'.join(f'{k}={v}' for k, v in sorted(query.items()))
+        keys.append(f'url:{path}?{params}' if params else f'url:{path}')
+    return keys
+
+
+def canonical_key(url: str) -> str:
+    """The strongest canonical key for a Maps URL"""
+    return canonical_keys(url)[0]
+
+
+class PlaceDeduper:
+    """In-memory dedup by canonical key, keeping the first URL seen per place
+
+    Every key of a URL is remembered, so a URL that carries only a name and
+    coordinates still matches an earlier URL that had the CID as well.
+    """
+
+    def __init__(self):
+        self._keys: Dict[str, str] = {}
+
+    def add(self, url: str) -> Tuple[str, bool]:
+        """Return (first URL seen for this place, whether the place is new)"""
+        keys = canonical_keys(url)
+        first = next((self._keys[key] for key in keys if key in self._keys), None)
+        for key in keys:
+            self._keys.setdefault(key, first or url)
+        return first or url, first is None
+
+
+def dedupe_places(urls: Iterable[str]) -> List[str]:
+    """Drop URLs that point at a place already in the list, keeping order"""
+    deduper = PlaceDeduper()
+    return [url for url in urls if deduper.add(url)[1]]
+
+
+class PlaceIndex:
+    """Canonical place keys seen in earlier runs, stored in SQLite
+
+    All keys are loaded into a set on open so membership checks are O(1);
+    new keys are written through to disk.
+    """
+
+    def __init__(self, path: str = PLACE_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # One connection shared by all threads, serialized by the lock
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('''
+            CREATE TABLE IF NOT EXISTS place_keys (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                first_seen REAL NOT NULL
+            )
+        ''')
+        self._db.commit()
+        self._keys: Set[str] = {row[0] for row in self._db.execute('SELECT key FROM place_keys')}
+
+    def __contains__(self, url: str) -> bool:
+        return any(key in self._keys for key in canonical_keys(url))
+
+    def __len__(self) -> int:
+        """Number of keys stored; a place may have several"""
+        return len(self._keys)
+
+    def filter_new(self, urls: Iterable[str]) -> List[str]:
+        """Record the places behind ``urls`` and return the ones never seen before"""
+        new_urls = []
+        rows = []
+        now = time.time()
+        with self._lock:
+            for url in urls:
+                keys = canonical_keys(url)
+                known = any(key in self._keys for key in keys)
+                if not known:
+                    new_urls.append(url)
+                # Known places still pick up any new alias keys
+                for key in keys:
+                    if key not in self._keys:
+                        self._keys.add(key)
+                        rows.append((key, url, now))
+            if rows:
+                self._db.executemany('INSERT OR IGNORE INTO place_keys VALUES (?, ?, ?)', rows)
+                self._db.commit()
+        return new_urls
+
+    def add(self, url: str) -> bool:
+        """Record one URL's place; True if it was new"""
+        return bool(self.filter_new([url]))
+
+    def clear(self):
+        with self._lock:
+            self._db.execute('DELETE FROM place_keys')
+            self._db.commit()
+            self._keys.clear()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_place_index() -> PlaceIndex:
+    """Return the process-wide place index, opening it on first use"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = PlaceIndex()
+    return _index
@@ -0,0 +1,214 @@
+"""
+Lead Generation Agent - Scan Pool
+Decode, scan and clean fetched pages in warm worker processes, past the GIL
+"""
+
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Iterable, List, Optional
+
+import metrics
+from config import DIAGNOSTIC_SAMPLE_CHARS, STREAM_CHUNK_SIZE
+from extraction import MAPS_URL_MATCHER, clean_found_urls, sniff_encoding
+
+
+@dataclass
+class ScanOutcome:
+    """What a worker sends back for one page: URL lists and counts, never the page itself"""
+    urls: List[str]
+    invalid_urls: List[str]
+    found_urls: List[str]
+    counts: Dict[str, int]
+    page_length: int
+    sample: str = ''  # First DIAGNOSTIC_SAMPLE_CHARS characters, for debug analysis
+    signals: Optional[object] = None  # tiered_fetch.PageSignals when scoring was asked for
+    timings: Dict[str, float] = field(default_factory=dict)  # Worker seconds per stage
+
+    @property
+    def scan_result(self):
+        """(raw URLs, counts) in the shape MapsURLMatcher.scan returns"""
+        return set(self.found_urls), self.counts
+
+
+def scan_page(text: str, score: bool = False) -> ScanOutcome:
+    """Score, scan and clean decoded page text in this process
+
+    This is the work a pool worker does once it has decoded the page, kept
+    separate so the in-thread path and the benchmarks run exactly the same
+    code.
+    """
+    timings = {}
+    signals = None
+    if score:
+        from tiered_fetch import PageSignals
+
+        start = time.perf_counter()
+        signals = PageSignals()
+        signals.feed(text)
+        timings['score'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    found_urls, counts = MAPS_URL_MATCHER.scan(text)
+    timings['scan'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    urls, invalid_urls = clean_found_urls(found_urls)
+    timings['clean'] = time.perf_counter() - start
+
+    return ScanOutcome(urls, invalid_urls, sorted(found_urls), counts, len(text),
+                       sample=text[:DIAGNOSTIC_SAMPLE_CHARS], signals=signals, timings=timings)
+
+
+def _init_worker():
+    # Workers time their own stages and report them back; their registry
+    # must not write a second metrics file over the parent's
+    metrics.set_enabled(False)
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _scan_shared(name: str, size: int, encoding: str, score: bool) -> ScanOutcome:
+    """Worker entry point: decode the page straight out of shared memory, then scan it"""
+    start = time.perf_counter()
+    block = SharedMemory(name=name)
+    try:
+        with block.buf[:size] as view:
+            text = str(view, encoding, 'replace')
+    finally:
+        block.close()
+    decode_time = time.perf_counter() - start
+
+    outcome = scan_page(text, score)
+    outcome.timings['decode'] = decode_time
+    return outcome
+
+
+class ScanPool:
+    """Warm worker processes for the CPU-bound part of an extraction
+
+    Once a page is fetched, decoding, scoring, scanning and cleaning are
+    pure Python and regex work. In threads they share one core under the
+    GIL. Here each page body is copied once into a shared memory block.
+    The worker decodes it in place, so multi-MB strings are never pickled.
+    It sends back only the URL lists and counts. Workers are started once,
+    with the matcher compiled, and serve every run until the process exits.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = max(1, workers or os.cpu_count() or 1)  # one per core by default
+        # forkserver children are forked from a clean single-threaded server,
+        # safe from a parent full of fetch threads; spawn where it is missing
+        methods = multiprocessing.get_all_start_methods()
+        self._context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=self._context,
+                                                     initializer=_init_worker)
+            return self._executor
+
+    def warm(self) -> 'ScanPool':
+        """Start every worker now instead of on the first page"""
+        executor = self._get_executor()
+        for future in [executor.submit(_ping) for _ in range(self.workers)]:
+            future.result()
+        return self
+
+    def scan_bytes(self, chunks: Iterable[bytes], encoding: str = 'utf-8', score: bool = False) -> ScanOutcome:
+        """Ship a page body to a worker and wait for its URLs
+
+        Blocks the calling thread (without holding the GIL), so a batch's
+        fetch threads each keep one worker busy.
+        """
+        chunks = [chunk for chunk in chunks if chunk]
+        size = sum(len(chunk) for chunk in chunks)
+        block = SharedMemory(create=True, size=max(size, 1))
+        try:
+            offset = 0
+            for chunk in chunks:
+                block.buf[offset:offset + len(chunk)] = chunk
+                offset += len(chunk)
+
+            start = time.perf_counter()
+            try:
+                outcome = self._get_executor().submit(_scan_shared, block.name, size, encoding, score).result()
+            except BrokenProcessPool:
+                # A worker died (e.g. out of memory); the next page gets fresh workers
+                self._reset()
+                raise
+            waited = time.perf_counter() - start
+        finally:
+            block.close()
+            block.unlink()
+
+        for stage, seconds in outcome.timings.items():
+            metrics.add_time(stage, seconds)
+        # Copying in and out of shared memory, pickling the result and queueing for a free worker
+        metrics.add_time('dispatch', max(waited - sum(outcome.timings.values()), 0.0))
+        metrics.count('chars_decoded', outcome.page_length)
+        return outcome
+
+    def scan_text(self, text: str, score: bool = False) -> ScanOutcome:
+        """scan_bytes for text that is already decoded, such as pasted page source"""
+        return self.scan_bytes([text.encode('utf-8', 'surrogatepass')], 'utf-8', score)
+
+    def scan_response(self, response, score: bool = False) -> ScanOutcome:
+        """Download a requests response and scan its body in a worker
+
+        The body is held in memory until a worker has scanned it, unlike
+        the in-thread streaming scan which keeps only a window.
+        """
+        byte_chunks = list(metrics.timed_iter(response.iter_content(chunk_size=STREAM_CHUNK_SIZE), 'download',
+                                              size_counter='bytes_downloaded'))
+        # Same encoding choice as the streaming scan
+        content_type = response.headers.get('Content-Type', '').lower()
+        header_encoding = response.encoding if 'charset' in content_type else None
+        response.encoding = sniff_encoding(byte_chunks[0] if byte_chunks else b'', header_encoding)
+        return self.scan_bytes(byte_chunks, response.encoding, score)
+
+    def _reset(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        """Stop the workers; the next scan starts new ones"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+_pools: Dict[int, ScanPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_scan_pool(workers: Optional[int] = None) -> ScanPool:
+    """Process-wide pool per worker count, kept warm across runs and Streamlit reruns"""
+    workers = max(1, workers or os.cpu_count() or 1)
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = ScanPool(workers)
+        return pool
+
+
+@atexit.register
+def close_all_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
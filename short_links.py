@@ -0,0 +1,164 @@
+"""
+Lead Generation Agent - Short Link Expansion
+Resolve goo.gl/maps and maps.app.goo.gl links to full Maps URLs, once ever
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urljoin, urlsplit, parse_qs
+
+import http_client
+from config import SHORT_LINK_MAX_WORKERS, SHORT_LINK_TIMEOUT, SHORT_LINK_MAX_REDIRECTS, SHORT_LINK_CACHE_PATH
+from extraction import REQUEST_HEADERS
+from place_index import SHORT_LINK_HOSTS
+
+_REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+
+
+def is_short_link(url: str) -> bool:
+    return (urlsplit(url).hostname or '').lower() in SHORT_LINK_HOSTS
+
+
+class ShortLinkCache:
+    """Persistent short -> long URL mapping stored in SQLite
+
+    Resolutions never expire: a short link always points at the same place.
+    The whole table is loaded into a dict on open.
+    """
+
+    def __init__(self, path: str = SHORT_LINK_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # One connection shared by all threads, serialized by the lock
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('''
+            CREATE TABLE IF NOT EXISTS short_links (
+                short_url TEXT PRIMARY KEY,
+                long_url TEXT NOT NULL,
+                resolved_at REAL NOT NULL
+            )
+        ''')
+        self._db.commit()
+        self._links: Dict[str, str] = dict(self._db.execute('SELECT short_url, long_url FROM short_links'))
+
+    def get(self, short_url: str) -> Optional[str]:
+        return self._links.get(short_url)
+
+    def put_many(self, resolved: Dict[str, str]):
+        if not resolved:
+            return
+        now = time.time()
+        with self._lock:
+            self._links.update(resolved)
+            self._db.executemany(
+                'INSERT OR REPLACE INTO short_links VALUES (?, ?, ?)',
+                [(short_url, long_url, now) for short_url, long_url in resolved.items()]
+            )
+            self._db.commit()
+
+    def __len__(self) -> int:
+        return len(self._links)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_short_link_cache() -> ShortLinkCache:
+    """Return the process-wide short link cache, opening it on first use"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ShortLinkCache()
+    return _cache
+
+
+class ShortLinkResolver:
+    """Expand Maps short links with redirect-only requests
+
+    Each hop is a HEAD request with redirects off, so no page body is ever
+    downloaded; hosts that reject HEAD get a streamed GET that is closed
+    unread. Up to ``max_workers`` links resolve at once and every success is
+    written to the persistent cache, so a short link costs network time once.
+    """
+
+    def __init__(self, session=None, cache: Optional[ShortLinkCache] = None,
+                 max_workers: int = SHORT_LINK_MAX_WORKERS, timeout: float = SHORT_LINK_TIMEOUT,
+                 max_redirects: int = SHORT_LINK_MAX_REDIRECTS):
+        self.session = session  # defaults to the shared pooled session
+        self.cache = cache if cache is not None else get_short_link_cache()
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self.stats = dict.fromkeys(['cached', 'resolved', 'failed'], 0)
+
+    def _next_hop(self, url: str) -> Optional[str]:
+        session = self.session or http_client.get_session()
+        response = session.head(url, headers=REQUEST_HEADERS, timeout=self.timeout, allow_redirects=False)
+        if response.status_code in (403, 405, 501):
+            response = session.get(url, headers=REQUEST_HEADERS, timeout=self.timeout,
+                                   allow_redirects=False, stream=True)
+        response.close()
+        if response.status_code in _REDIRECT_STATUSES and response.headers.get('Location'):
+            return urljoin(url, response.headers['Location'])
+        return None
+
+    def resolve(self, short_url: str) -> Optional[str]:
+        """Follow redirects until the URL leaves the short link hosts; None on failure"""
+        cached = self.cache.get(short_url)
+        if cached:
+            return cached
+
+        url = short_url
+        try:
+            for _ in range(self.max_redirects):
+                url = self._next_hop(url)
+                if url is None:
+                    return None
+                parts = urlsplit(url)
+                host = (parts.hostname or '').lower()
+                # EU consent interstitial carries the real target in ?continue=
+                if host.startswith('consent.'):
+                    url = parse_qs(parts.query).get('continue', [url])[0]
+                    host = (urlsplit(url).hostname or '').lower()
+                if host not in SHORT_LINK_HOSTS:
+                    return url
+        except Exception:
+            return None
+        return None
+
+    def resolve_many(self, urls: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Resolve every short link in ``urls`` concurrently; other URLs are skipped"""
+        short_urls = list(dict.fromkeys(url for url in urls if is_short_link(url)))
+        results: Dict[str, Optional[str]] = {}
+        pending = []
+        for short_url in short_urls:
+            cached = self.cache.get(short_url)
+            if cached:
+                results[short_url] = cached
+            else:
+                pending.append(short_url)
+        self.stats['cached'] += len(results)
+
+        if pending:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(pending))) as pool:
+                resolved = dict(zip(pending, pool.map(self.resolve, pending)))
+            successes = {short_url: long_url for short_url, long_url in resolved.items() if long_url}
+            self.cache.put_many(successes)
+            self.stats['resolved'] += len(successes)
+            self.stats['failed'] += len(pending) - len(successes)
+            results.update(resolved)
+        return results
+
+    def expand(self, urls: Iterable[str]) -> List[str]:
+        """Replace resolvable short links with their full URLs, keeping order"""
+        urls = list(urls)
+        resolved = self.resolve_many(urls)
+        return [resolved.get(url) or url for url in urls]
@@ -1,15 +1,7 @@
 import streamlit as st
-import requests
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-import re
-import time
-import random
-from urllib.parse import urljoin, urlparse
+import urllib.parse
+from engine import BrowserPageExtractor
+from config import FIXED_LOAD_SCHEDULE
 
 # Page configuration
 st.set_page_config(
@@ -77,104 +69,32 @@ st.markdown("""
 
 class URLExtractor:
     def __init__(self):
-        self.driver = None
-        
-    def setup_driver(self):
-        """Setup Chrome WebDriver"""
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-        
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
-        
-    def close_driver(self):
-        """Close WebDriver"""
-        if self.driver:
-            self.driver.quit()
+        self.adaptive = True
+        self.load_report = None
+        
+    CHROME_ARGUMENTS = (
+        "--headless",
+        "--no-sandbox",
+        "--disable-dev-shm-usage",
+        "--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    )
+    
+    @staticmethod
+    def show_event(event):
+        """Status lines, warnings and errors from the extractor go straight to the page"""
+        if event.message:
+            getattr(st, event.level)(event.message)
             
     def extract_google_maps_urls(self, input_url):
         """Extract Google Maps place URLs from any webpage"""
-        try:
-            if not self.driver:
-                self.setup_driver()
-                
-            st.info("🔍 Loading webpage...")
-            self.driver.get(input_url)
-            time.sleep(3)  # Wait for page to load
-            
-            # Scroll to load more content
-            st.info("📜 Scrolling to load more content...")
-            for i in range(3):  # Scroll 3 times
-                self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(2)
-                
-            # Get page source
-            page_source = self.driver.page_source
-            
-            # Find all Google Maps place URLs
-            google_maps_urls = set()
-            
-            # Pattern 1: Direct Google Maps place URLs
-            pattern1 = r'https://www\.google\.com/maps/place/[^"\s<>]+'
-            urls1 = re.findall(pattern1, page_source)
-            
-            # Pattern 2: Google Maps URLs with various formats
-            pattern2 = r'https://maps\.google\.com/[^"\s<>]*place[^"\s<>]*'
-            urls2 = re.findall(pattern2, page_source)
-            
-            # Pattern 3: Short Google Maps URLs
-            pattern3 = r'https://goo\.gl/maps/[^"\s<>]+'
-            urls3 = re.findall(pattern3, page_source)
-            
-            # Combine all URLs
-            all_urls = urls1 + urls2 + urls3
-            
-            # Clean and deduplicate URLs
-            for url in all_urls:
-                # Remove any trailing characters that might be HTML artifacts
-                url = re.sub(r'[&"\'<>].*$', '', url)
-                if self.is_valid_maps_url(url):
-                    google_maps_urls.add(url)
-            
-            # Also check href attributes of all links
-            st.info("🔗 Checking all links on the page...")
-            try:
-                links = self.driver.find_elements(By.TAG_NAME, "a")
-                for link in links:
-                    href = link.get_attribute("href")
-                    if href and self.is_valid_maps_url(href):
-                        google_maps_urls.add(href)
-            except Exception as e:
-                st.warning(f"Error checking links: {e}")
-                
-            return list(google_maps_urls)
-            
-        except Exception as e:
-            st.error(f"Error extracting URLs: {str(e)}")
-            return []
-        finally:
-            self.close_driver()
+        extractor = BrowserPageExtractor(self.CHROME_ARGUMENTS, adaptive=self.adaptive, on_event=self.show_event)
+        result = extractor.extract(input_url)
+        self.load_report = result.load_report
+        return result.maps_urls
     
     def is_valid_maps_url(self, url):
         """Check if URL is a valid Google Maps place URL"""
-        if not url:
-            return False
-            
-        # Check for Google Maps patterns
-        maps_patterns = [
-            r'google\.com/maps/place/',
-            r'maps\.google\.com.*place',
-            r'goo\.gl/maps/',
-        ]
-        
-        for pattern in maps_patterns:
-            if re.search(pattern, url, re.IGNORECASE):
-                return True
-                
-        return False
+        return BrowserPageExtractor.is_valid_maps_url(url)
 
 def main():
     st.markdown('<h1 class="title">🔍 Google Maps URL Extractor</h1>', unsafe_allow_html=True)
@@ -206,6 +126,12 @@ def main():
             help="Paste any URL - could be Google search results, business directories, or any page with Google Maps links"
         )
         
+        adaptive = st.checkbox(
+            "⚡ Adaptive loading",
+            value=True,
+            help=f"Wait for the page to go idle and scroll only while new links appear, instead of a fixed {FIXED_LOAD_SCHEDULE}s schedule"
+        )
+        
         # Buttons
         col1, col2 = st.columns(2)
         
@@ -213,8 +139,10 @@ def main():
             if st.button("🔍 Extract URLs", use_container_width=True):
                 if input_url:
                     with st.spinner("Extracting Google Maps URLs... This may take a minute."):
+                        st.session_state.extractor.adaptive = adaptive
                         urls = st.session_state.extractor.extract_google_maps_urls(input_url)
                         st.session_state.extracted_urls = urls
+                        st.session_state.load_report = st.session_state.extractor.load_report
                         st.rerun()
                 else:
                     st.error("Please enter a URL first!")
@@ -235,6 +163,17 @@ def main():
         # Summary
         st.success(f"✅ Found **{len(st.session_state.extracted_urls)}** Google Maps place URLs")
         
+        report = st.session_state.get('load_report')
+        if report:
+            if report.time_saved >= 0:
+                comparison = f"saved {report.time_saved:.1f}s"
+            else:
+                comparison = f"{-report.time_saved:.1f}s slower"
+            st.info(
+                f"⚡ Page ready in {report.elapsed:.1f}s after {report.scrolls} scroll(s) "
+                f"(stopped: {report.stop_reason}) — {comparison} vs the fixed {FIXED_LOAD_SCHEDULE}s schedule"
+            )
+        
         # Display URLs
         st.markdown("### 🔗 URL List")
         
@@ -244,8 +183,6 @@ def main():
                 
                 # Extract business name from URL if possible
                 try:
-                    import urllib.parse
-                    parsed = urllib.parse.urlparse(url)
                     if '/place/' in url:
                         place_part = url.split('/place/')[1].split('/')[0]
                         business_name = urllib.parse.unquote(place_part).replace('+', ' ')
@@ -3,15 +3,30 @@ Test script for Lead Generation Agent
 Run this to test basic functionality before using the main app
 """
 
+import os
 import sys
+import functools
 import importlib
 import subprocess
 
+def check(test):
+    """Also fail under pytest when a script-style test reports failure
+
+    The tests print their own ✅/❌ lines and return a bool for main(); pytest
+    ignores return values, so a False result is raised as an AssertionError.
+    """
+    @functools.wraps(test)
+    def run():
+        result = test()
+        assert result, f"{test.__name__} reported a failure (see output above)"
+        return result
+    return run
+
 def test_imports():
     """Test if all required packages are available"""
     required_packages = [
         'streamlit', 'requests', 'bs4', 'selenium', 
-        'pandas', 'openpyxl', 'fake_useragent'
+        'pandas', 'openpyxl'
     ]
     
     missing_packages = []
@@ -40,15 +55,17 @@ def test_chrome_driver():
     try:
         from selenium import webdriver
         from selenium.webdriver.chrome.options import Options
-        from webdriver_manager.chrome import ChromeDriverManager
+        sys.path.append('.')
+        from driver_pool import get_chromedriver_path
         
         chrome_options = Options()
         chrome_options.add_argument("--headless")
         chrome_options.add_argument("--no-sandbox")
         
         print("🔍 Testing Chrome WebDriver...")
+        # Resolves and saves the driver path, so the apps skip the lookup later
         driver = webdriver.Chrome(
-            service=webdriver.chrome.service.Service(ChromeDriverManager().install()),
+            service=webdriver.chrome.service.Service(get_chromedriver_path()),
             options=chrome_options
         )
         
@@ -92,6 +109,876 @@ def test_url_validation():
         print(f"❌ URL validation test failed: {str(e)}")
         return False
 
+@check
+def test_url_matcher():
+    """Test the compiled Google Maps URL matcher"""
+    try:
+        sys.path.append('.')
+        from extraction import MAPS_URL_MATCHER
+        
+        page = (
+            '<a href="https://www.google.com/maps/place/Cafe/@40.7,-73.9,17z">Map</a>'
+            ' https://maps.google.com/?q=https://goo.gl/maps/abc123 '
+            '<p>No maps here: https://example.com/page</p>'
+        )
+        expected = {
+            'https://www.google.com/maps/place/Cafe/@40.7,-73.9,17z',
+            'https://maps.google.com/?q=https://goo.gl/maps/abc123',
+            'https://goo.gl/maps/abc123',
+        }
+        
+        print("🔍 Testing URL matcher...")
+        found_urls, counts = MAPS_URL_MATCHER.scan(page)
+        url_ok = found_urls == expected
+        print(f"{'✅' if url_ok else '❌'} Found {len(found_urls)} URLs in one pass")
+        
+        href_ok = counts['href'] == 1
+        print(f"{'✅' if href_ok else '❌'} href attribute counted")
+        
+        empty_ok = MAPS_URL_MATCHER.scan('<html>nothing</html>')[0] == set()
+        print(f"{'✅' if empty_ok else '❌'} Prefilter skips pages without Maps links")
+        
+        return url_ok and href_ok and empty_ok
+        
+    except Exception as e:
+        print(f"❌ URL matcher test failed: {str(e)}")
+        return False
+
+@check
+def test_stream_scan():
+    """Test that scanning a page in chunks finds exactly what scan() finds"""
+    try:
+        sys.path.append('.')
+        import random
+        from extraction import MAPS_URL_MATCHER
+
+        print("🌊 Testing streaming scan...")
+        page = '<a href="https://www.google.com/maps/place/Joe Pizza/@40.7,-74.0,17z">Map</a>'
+        split_ok = MAPS_URL_MATCHER.scan_stream([page[:47], page[47:]]) == MAPS_URL_MATCHER.scan(page)
+        print(f"{'✅' if split_ok else '❌'} href split inside its URL is matched whole")
+
+        # Quoted, bare, encoded and unterminated URLs, cut at random points
+        pieces = [
+            '<a href="https://www.google.com/maps/place/Joe Pizza/@40.7,-74.0,17z">Map</a>',
+            " HREF='https://maps.google.com/?q=https://goo.gl/maps/abc x'",
+            ' https://www.google.com/maps/@40.7,-74.0,15z ', '"https://goo.gl/maps/q"',
+            'https://listing google.com/maps/zz ', 'https%3A//maps.google.com/x%20y ',
+            'https://maps.app.goo.gl/Xy) ', '<a href="/local">', 'https://example.com/x ', 'href=', 'https:', '\n',
+        ]
+        rng = random.Random(7)
+        mismatches = 0
+        for _ in range(500):
+            page = ''.join(rng.choice(pieces) for _ in range(rng.randint(1, 20)))
+            cuts = sorted(rng.sample(range(1, len(page)), min(len(page) - 1, rng.randint(0, 10))))
+            chunks = [page[start:end] for start, end in zip([0] + cuts, cuts + [len(page)])]
+            mismatches += MAPS_URL_MATCHER.scan_stream(chunks) != MAPS_URL_MATCHER.scan(page)
+        fuzz_ok = mismatches == 0
+        print(f"{'✅' if fuzz_ok else '❌'} {500 - mismatches}/500 random chunkings match scan()")
+
+        return split_ok and fuzz_ok
+
+    except Exception as e:
+        print(f"❌ Streaming scan test failed: {str(e)}")
+        return False
+
+@check
+def test_response_cache():
+    """Test cache hits, conditional revalidation, what is not stored, and LRU eviction"""
+    try:
+        sys.path.append('.')
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        import requests
+        from http_cache import ResponseCache
+        from http_client import CachingHTTPAdapter
+
+        seen = []  # (path, If-None-Match, If-Modified-Since) per request the server answered
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                etag, since = self.headers.get('If-None-Match'), self.headers.get('If-Modified-Since')
+                seen.append((self.path, etag, since))
+                headers = {'/etag': {'ETag': '"v1"'}, '/dated': {'Last-Modified': 'Mon, 05 Oct 2026 10:00:00 GMT'},
+                           '/no-store': {'Cache-Control': 'no-store'}}.get(self.path, {})
+                if (etag and etag == headers.get('ETag')) or (since and since == headers.get('Last-Modified')):
+                    self.send_response(304)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                status = 404 if self.path == '/missing' else 200
+                body = f'page {self.path}'.encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        def session_for(cache):
+            session = requests.Session()
+            session.mount('http://', CachingHTTPAdapter(cache))
+            return session
+
+        print("💾 Testing response cache...")
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_address[1]}'
+        try:
+            fresh = session_for(ResponseCache(':memory:', ttl=60))
+            fresh.get(f'{base_url}/etag').content
+            hit = fresh.get(f'{base_url}/etag')
+            hit_ok = hit.headers['X-Cache'] == 'HIT' and hit.text == 'page /etag' and len(seen) == 1
+            print(f"{'✅' if hit_ok else '❌'} Fresh entry served without a request")
+
+            # ttl=0: every entry is stale at once and must be revalidated
+            stale = session_for(ResponseCache(':memory:', ttl=0))
+            revalidated_ok = True
+            for path, header in [('/etag', ('"v1"', None)), ('/dated', (None, 'Mon, 05 Oct 2026 10:00:00 GMT'))]:
+                stale.get(f'{base_url}{path}').content
+                again = stale.get(f'{base_url}{path}')
+                revalidated_ok = (revalidated_ok and again.headers['X-Cache'] == 'REVALIDATED'
+                                  and again.text == f'page {path}' and seen[-1] == (path, *header))
+            print(f"{'✅' if revalidated_ok else '❌'} 304 on If-None-Match / If-Modified-Since served from cache")
+
+            cache = ResponseCache(':memory:', ttl=60)
+            skipped = session_for(cache)
+            for path in ['/no-store', '/missing']:
+                skipped.get(f'{base_url}{path}').content
+            skipped_ok = cache.get(f'{base_url}/no-store') is None and cache.get(f'{base_url}/missing') is None
+            print(f"{'✅' if skipped_ok else '❌'} no-store and non-200 responses not cached")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        # Incompressible bodies, so two fit under the bound but three do not
+        lru = ResponseCache(':memory:', max_bytes=2500)
+        for name in ['a', 'b']:
+            lru.put(f'https://example.com/{name}', 200, {}, os.urandom(1000))
+        lru.get('https://example.com/a')
+        lru.put('https://example.com/c', 200, {}, os.urandom(1000))
+        evicted_ok = (lru.get('https://example.com/b') is None and lru.get('https://example.com/a') is not None
+                      and lru.stats()['evictions'] == 1)
+        print(f"{'✅' if evicted_ok else '❌'} Least recently used entry evicted past max_bytes")
+
+        return hit_ok and revalidated_ok and skipped_ok and evicted_ok
+
+    except Exception as e:
+        print(f"❌ Response cache test failed: {str(e)}")
+        return False
+
+@check
+def test_driver_reset():
+    """Test that a released browser is cleared before it is reused"""
+    try:
+        sys.path.append('.')
+        from driver_pool import DriverPool, _PooledDriver
+
+        class RecordingDriver:
+            def __init__(self):
+                self.calls = []
+
+            def execute_cdp_cmd(self, command, params):
+                self.calls.append(command)
+
+            def execute_script(self, script):
+                self.calls.append('script')
+                return 'https://example.com' if 'origin' in script else 1
+
+            def get(self, url):
+                self.calls.append(url)
+
+            def quit(self):
+                self.calls.append('quit')
+
+        class StubPool(DriverPool):
+            def _start_driver(self):
+                self._count('created')
+                return _PooledDriver(RecordingDriver())
+
+        print("🧹 Testing browser reset on release...")
+        pool = StubPool([], max_size=1)
+        driver = pool.acquire()
+        pool.release(driver)
+        calls = [call for call in driver.calls if call != 'script']
+        order_ok = calls[-3:] == ['Network.clearBrowserCookies', 'Storage.clearDataForOrigin', 'about:blank']
+        print(f"{'✅' if order_ok else '❌'} Cookies and site storage cleared before leaving the page: {calls}")
+
+        reused_ok = pool.acquire() is driver and pool.stats['reused'] == 1
+        print(f"{'✅' if reused_ok else '❌'} Reset browser goes back to the pool")
+
+        return order_ok and reused_ok
+
+    except Exception as e:
+        print(f"❌ Browser reset test failed: {str(e)}")
+        return False
+
+@check
+def test_email_enricher():
+    """Test that concurrent enrichment keeps the sequential page priority and settles early"""
+    try:
+        sys.path.append('.')
+        import threading
+        import time
+        from enrichment import EmailEnricher
+
+        # url -> (seconds, emails or exception); unlisted pages have no email
+        pages = {
+            'https://a.com': (0.05, ['info@a.com']),
+            'https://a.com/contact': (0.3, ['sales@a.com']),
+            'https://b.com': (0.01, []),
+            'https://b.com/contact': (0.2, ['sales@b.com']),
+            'https://b.com/contact-us': (0.01, ['other@b.com']),
+            'https://c.com': (0.01, ConnectionError('refused')),
+        }
+        started, active, peak = [], {}, {}
+        lock = threading.Lock()
+
+        def fetch_emails(url, headers, timeout, required=True):
+            domain = url.split('/')[2]
+            with lock:
+                started.append(url)
+                active[domain] = active.get(domain, 0) + 1
+                peak[domain] = max(peak.get(domain, 0), active[domain])
+            delay, outcome = pages.get(url, (0.01, []))
+            time.sleep(delay)
+            with lock:
+                active[domain] -= 1
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        print("📧 Testing email enricher...")
+        enricher = EmailEnricher(max_workers=8, per_domain_limit=2)
+        enricher.extractor.fetch_emails = fetch_emails
+        results = {result.website: result for result in enricher.iter_results(['a.com', 'b.com', 'c.com'])}
+
+        a, b, c = results['https://a.com'], results['https://b.com'], results['https://c.com']
+        priority_ok = b.email == 'sales@b.com' and b.source_page == 'https://b.com/contact'
+        print(f"{'✅' if priority_ok else '❌'} /contact wins over a faster /contact-us: {b.email}")
+
+        settle_ok = (a.email == 'info@a.com' and a.probes_cancelled == 2
+                     and 'https://a.com/contact-us' not in started and 'https://a.com/about' not in started)
+        print(f"{'✅' if settle_ok else '❌'} Homepage email drops the queued probes ({a.probes_cancelled} cancelled)")
+
+        error_ok = c.email is None and c.error == 'refused'
+        print(f"{'✅' if error_ok else '❌'} Homepage error reported: {c.error}")
+
+        limit_ok = max(peak.values()) <= 2
+        print(f"{'✅' if limit_ok else '❌'} At most 2 probes per domain in flight: {peak}")
+
+        return priority_ok and settle_ok and error_ok and limit_ok
+
+    except Exception as e:
+        print(f"❌ Email enricher test failed: {str(e)}")
+        return False
+
+@check
+def test_rate_limiter():
+    """Test per-host token buckets, Retry-After parsing and backoff after a 429"""
+    try:
+        sys.path.append('.')
+        from datetime import datetime, timedelta, timezone
+        from email.utils import format_datetime
+        from utils import HostRateLimiter, parse_retry_after
+
+        print("🚦 Testing rate limiter...")
+        in_a_minute = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=60), usegmt=True)
+        parsed = [parse_retry_after(value) for value in ['5', ' 12 ', 'soon', '', None]]
+        dated = parse_retry_after(in_a_minute)
+        past = parse_retry_after('Mon, 05 Oct 2020 10:00:00 GMT')
+        parse_ok = parsed == [5.0, 12.0, None, None, None] and 55 <= dated <= 60 and past == 0.0
+        print(f"{'✅' if parse_ok else '❌'} Retry-After parsed as seconds or an HTTP date: {parsed}, {dated:.0f}, {past}")
+
+        # reserve() claims a slot and returns its delay without sleeping
+        limiter = HostRateLimiter(rate=10, burst=3, jitter=0)
+        delays = [limiter.reserve('https://a.com/page') for _ in range(4)]
+        burst_ok = delays[:3] == [0.0, 0.0, 0.0] and 0.09 <= delays[3] <= 0.1
+        print(f"{'✅' if burst_ok else '❌'} Burst of 3 then one slot per 0.1s: {[round(d, 3) for d in delays]}")
+
+        other_ok = limiter.reserve('https://B.com/') == 0.0
+        print(f"{'✅' if other_ok else '❌'} A busy host does not delay another")
+
+        # The bucket is emptied too, so the first request after the pause waits a slot at the halved rate
+        limiter.record_response('https://b.com/', 429, {'Retry-After': '2'})
+        backoff = limiter.reserve('https://b.com/')
+        backoff_ok = 2.1 <= backoff <= 2.2 and limiter.current_rate('b.com') == 5
+        print(f"{'✅' if backoff_ok else '❌'} 429 pauses the host for Retry-After and halves its rate: {backoff:.2f}s")
+
+        limiter.record_response('https://c.com/', 503)
+        limiter.record_response('https://c.com/', 429)
+        unhinted_ok = limiter.current_rate('c.com') == 5 and 0.25 <= limiter.reserve('c.com') <= 0.3
+        print(f"{'✅' if unhinted_ok else '❌'} 503 without Retry-After ignored, 429 without it pauses one slot")
+
+        rates = []
+        for _ in range(6):
+            limiter.record_response('https://b.com/', 200)
+            rates.append(limiter.current_rate('b.com'))
+        recover_ok = rates == [6.0, 7.0, 8.0, 9.0, 10.0, 10.0]
+        print(f"{'✅' if recover_ok else '❌'} Successful responses restore the rate gradually: {rates}")
+
+        return parse_ok and burst_ok and other_ok and backoff_ok and unhinted_ok and recover_ok
+
+    except Exception as e:
+        print(f"❌ Rate limiter test failed: {str(e)}")
+        return False
+
+@check
+def test_throttled_responses():
+    """Test that 429s reach the rate limiter at once instead of being retried by the session"""
+    try:
+        sys.path.append('.')
+        import threading
+        import time
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        import requests
+        import http_client
+        from config import HTTP_RETRIES
+        from utils import HostRateLimiter
+
+        hits = {}
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                hits[self.path] = hits.get(self.path, 0) + 1
+                self.send_response(429 if self.path == '/limited' else 502)
+                if self.path == '/limited':
+                    self.send_header('Retry-After', '3')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        print("⏳ Testing throttled responses...")
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_address[1]}'
+        try:
+            session = http_client.create_session(use_cache=False)
+            limiter = HostRateLimiter(rate=10, burst=3, jitter=0)
+            start = time.perf_counter()
+            response = session.get(f'{base_url}/limited', timeout=5)
+            elapsed = time.perf_counter() - start
+            limiter.record_response(base_url, response.status_code, response.headers)
+            passthrough_ok = response.status_code == 429 and hits['/limited'] == 1 and elapsed < 1
+            print(f"{'✅' if passthrough_ok else '❌'} 429 returned after {hits['/limited']} request in {elapsed:.2f}s")
+
+            pause = limiter.reserve(base_url)
+            paused_ok = pause >= 2.9
+            print(f"{'✅' if paused_ok else '❌'} Rate limiter pauses the host for Retry-After: {pause:.2f}s")
+
+            # Server errors are still retried, without backoff so the test stays fast
+            retrying = requests.Session()
+            retrying.mount('http://', http_client.PooledHTTPAdapter(backoff_factor=0))
+            response = retrying.get(f'{base_url}/flaky', timeout=5)
+            retried_ok = response.status_code == 502 and hits['/flaky'] == 1 + HTTP_RETRIES
+            print(f"{'✅' if retried_ok else '❌'} 502 retried {hits['/flaky'] - 1} times")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        return passthrough_ok and paused_ok and retried_ok
+
+    except Exception as e:
+        print(f"❌ Throttled response test failed: {str(e)}")
+        return False
+
+@check
+def test_short_links():
+    """Test short link expansion over HEAD hops, the consent page and the cache"""
+    try:
+        sys.path.append('.')
+        import tempfile
+        from urllib.parse import quote
+        from short_links import ShortLinkCache, ShortLinkResolver
+
+        place = 'https://www.google.com/maps/place/Joe+Pizza/@40.7,-74.0,17z'
+        consent = 'https://consent.google.com/ml?continue=' + quote(place, safe='')
+        # url -> (HEAD status, Location); GET is only answered for hosts that reject HEAD
+        hops = {
+            'https://goo.gl/maps/a': (302, 'https://maps.app.goo.gl/b'),
+            'https://maps.app.goo.gl/b': (301, consent),
+            'https://maps.app.goo.gl/c': (405, None),
+            'https://goo.gl/maps/gone': (404, None),
+        }
+
+        class Response:
+            def __init__(self, status_code, location=None):
+                self.status_code = status_code
+                self.headers = {'Location': location} if location else {}
+
+            def close(self):
+                pass
+
+        class StubSession:
+            def __init__(self):
+                self.calls = []
+
+            def head(self, url, **kwargs):
+                self.calls.append(('HEAD', url))
+                return Response(*hops[url])
+
+            def get(self, url, **kwargs):
+                self.calls.append(('GET', url))
+                return Response(302, 'https://www.google.com/maps/place/Cafe') if kwargs.get('stream') else Response(500)
+
+        print("🔗 Testing short link expansion...")
+        short_urls = ['https://goo.gl/maps/a', 'https://maps.app.goo.gl/c', 'https://goo.gl/maps/gone']
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'short_links.sqlite')
+            session = StubSession()
+            resolver = ShortLinkResolver(session=session, cache=ShortLinkCache(path), max_workers=1)
+            resolved = resolver.resolve_many(short_urls + ['https://example.com/'])
+
+            hops_ok = (resolved['https://goo.gl/maps/a'] == place
+                       and session.calls[:2] == [('HEAD', 'https://goo.gl/maps/a'), ('HEAD', 'https://maps.app.goo.gl/b')])
+            print(f"{'✅' if hops_ok else '❌'} HEAD hops followed and consent ?continue= unwrapped: {resolved['https://goo.gl/maps/a']}")
+
+            fallback_ok = (resolved['https://maps.app.goo.gl/c'] == 'https://www.google.com/maps/place/Cafe'
+                           and ('GET', 'https://maps.app.goo.gl/c') in session.calls)
+            print(f"{'✅' if fallback_ok else '❌'} HEAD rejected, streamed GET used instead")
+
+            failed_ok = (resolved['https://goo.gl/maps/gone'] is None and 'https://example.com/' not in resolved
+                         and resolver.stats == {'cached': 0, 'resolved': 2, 'failed': 1})
+            print(f"{'✅' if failed_ok else '❌'} Dead link fails and other URLs are skipped: {resolver.stats}")
+
+            # A fresh resolver on the same file: only the failed link goes back to the network
+            session = StubSession()
+            resolver = ShortLinkResolver(session=session, cache=ShortLinkCache(path))
+            again = resolver.resolve_many(short_urls)
+            cache_ok = (again == resolved and session.calls == [('HEAD', 'https://goo.gl/maps/gone')]
+                        and resolver.stats['cached'] == 2)
+            print(f"{'✅' if cache_ok else '❌'} Resolved links served from the persistent cache: {session.calls}")
+
+        return hops_ok and fallback_ok and failed_ok and cache_ok
+
+    except Exception as e:
+        print(f"❌ Short link test failed: {str(e)}")
+        return False
+
+@check
+def test_page_scoring():
+    """Test the HTTP-vs-browser page score"""
+    try:
+        sys.path.append('.')
+        from tiered_fetch import PageSignals, score_page
+        
+        def score(html, maps_links=0):
+            signals = PageSignals()
+            signals.feed(html)
+            return score_page(signals, maps_links)
+        
+        print("🧭 Testing page scoring...")
+        static = score('<html><body><h1>Directory</h1><p>Pizza places in New York with addresses.</p></body></html>')
+        static_ok = not static.needs_browser
+        print(f"{'✅' if static_ok else '❌'} Static page stays on HTTP (score {static.score})")
+        
+        shell = score('<html><body><noscript>Please enable JavaScript</noscript><div id="root"></div></body></html>')
+        shell_ok = shell.needs_browser
+        print(f"{'✅' if shell_ok else '❌'} JavaScript shell escalates (score {shell.score})")
+        
+        return static_ok and shell_ok
+        
+    except Exception as e:
+        print(f"❌ Page scoring test failed: {str(e)}")
+        return False
+
+@check
+def test_place_keys():
+    """Test canonical place keys used for deduplication"""
+    try:
+        sys.path.append('.')
+        from place_index import canonical_key, dedupe_places
+        
+        same_place = [
+            "https://www.google.com/maps/place/Joe's+Pizza/@40.7306,-73.9897,17z?entry=ttu",
+            "https://maps.google.com/maps/place/Joe%27s+Pizza/@40.73061,-73.98971,12z",
+            "https://www.google.co.uk/maps/place/Joe's%20Pizza/@40.7306,-73.9897,15z?hl=en",
+        ]
+        print("🗝️ Testing place keys...")
+        keys = {canonical_key(url) for url in same_place}
+        same_ok = len(keys) == 1
+        print(f"{'✅' if same_ok else '❌'} Host, zoom, encoding and tracking variants share one key")
+        
+        branch = "https://www.google.com/maps/place/Joe's+Pizza/@40.6782,-73.9442,17z"
+        branch_ok = len(dedupe_places(same_place + [branch])) == 2
+        print(f"{'✅' if branch_ok else '❌'} Same name at another location stays separate")
+
+        data_url = "https://www.google.com/maps/place/Starbucks/data=!4m2!3m1!1s0x89c259a9b3117469:0xd134e199a405a163"
+        feature_ok = canonical_key(data_url) == f'cid:{0xd134e199a405a163}'
+        print(f"{'✅' if feature_ok else '❌'} Feature ID read from the !1s0x... data form: {canonical_key(data_url)}")
+
+        # Same name, no coordinates: only the feature IDs tell the branches apart
+        other = "https://www.google.com/maps/place/Starbucks/data=!4m2!3m1!1s0x89c259a9b3117469:0x1111111111111111"
+        bare = "https://www.google.com/maps/place/Starbucks"
+        chain_ok = (len(dedupe_places([data_url, other])) == 2
+                    and canonical_key(bare) == 'url:place/Starbucks' and len(dedupe_places([data_url, bare])) == 2)
+        print(f"{'✅' if chain_ok else '❌'} Branches sharing a name are not merged by the name alone")
+
+        return same_ok and branch_ok and feature_ok and chain_ok
+        
+    except Exception as e:
+        print(f"❌ Place key test failed: {str(e)}")
+        return False
+
+@check
+def test_job_queue():
+    """Test job sharing, cancel and resume in the background job table"""
+    try:
+        sys.path.append('.')
+        from jobs import JobStore, JOB_EXTRACT, JOB_RUNNING, JOB_DONE, JOB_CANCELLED, JOB_QUEUED
+        
+        store = JobStore(':memory:')
+        print("🗂️ Testing job queue...")
+        job = store.submit(JOB_EXTRACT, {'url': 'https://example.com', 'debug': True})
+        twin = store.submit(JOB_EXTRACT, {'debug': True, 'url': 'https://example.com'})
+        shared_ok = twin.id == job.id and not twin.cached
+        print(f"{'✅' if shared_ok else '❌'} Identical pending submissions share one job")
+        
+        claimed = store.claim_next()
+        store.request_cancel(job.id)
+        store.update(job.id, status=JOB_CANCELLED)
+        resumed = store.resume(job.id) and store.get(job.id).status == JOB_QUEUED
+        cancel_ok = claimed.status == JOB_RUNNING and store.is_cancel_requested(job.id) is False and resumed
+        print(f"{'✅' if cancel_ok else '❌'} Running jobs can be cancelled and resumed")
+        
+        store.update(job.id, status=JOB_DONE, result={'maps_urls': []})
+        cached_ok = store.submit(JOB_EXTRACT, {'url': 'https://example.com', 'debug': True}).cached
+        print(f"{'✅' if cached_ok else '❌'} Finished results are served for repeat submissions")
+        
+        return shared_ok and cancel_ok and cached_ok
+        
+    except Exception as e:
+        print(f"❌ Job queue test failed: {str(e)}")
+        return False
+
+@check
+def test_business_fields():
+    """Test business field extraction on every installed parser"""
+    try:
+        sys.path.append('.')
+        from business_fields import available_backends, extract_business_fields
+        
+        html = ('<html><body><h1>Joe&#39;s  Pizza - Google Search</h1>'
+                '<div data-attrid="kc:/location/location:address">Address: 7 Carmine St,<br>New York</div>'
+                '<span class="z5jxId">+1 212-366-1182</span>'
+                '<div class="CL9Uqc"><a href="/url?q=https://joespizza.example/&amp;sa=U">Website</a></div></body></html>')
+        expected = {
+            'name': "Joe's Pizza",
+            'address': '7 Carmine St, New York',
+            'phone': '(212) 366-1182',
+            'website': 'https://joespizza.example/',
+        }
+        print("🏢 Testing business fields...")
+        ok = True
+        for backend in available_backends():
+            fields = extract_business_fields(html, backend, base_url='https://www.google.com/search?q=pizza')
+            backend_ok = fields == expected
+            ok = ok and backend_ok
+            print(f"{'✅' if backend_ok else '❌'} {backend}: {fields}")
+        return ok
+        
+    except Exception as e:
+        print(f"❌ Business field test failed: {str(e)}")
+        return False
+
+@check
+def test_cleaner_parity():
+    """Test that the Series cleaners match the scalar DataCleaner methods"""
+    try:
+        sys.path.append('.')
+        import random
+        import pandas as pd
+        from utils import DataCleaner
+        
+        samples = [
+            None, '', '   ', 'Address:', '+1 (555) 123-4567', '1-555-123-4567', '555.123.4567 ext 9',
+            '15551234567', '١٢٣٤٥٦٧٨٩٠', "  Joe's\n Pizza  - google  SEARCH ", 'a - -Google Search',
+            'ADDRESS:  7 Carmine St,\n\tNew York\xa0NY', 'example.com', ' https://shop.example/ ',
+            'https://www.google.com/url?q=https://joes.example/%3Fa%3D1&sa=U', 'google.com/url?q=&q=x',
+            'tab\x00separated', 'odd\x01marker - Google Search',
+        ]
+        rng = random.Random(0)
+        alphabet = '01 5+-.()\t\n\xa0Address:-GoogleSearchſ٣/url?q=&%'
+        samples += [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 24))) for _ in range(2000)]
+        series = pd.Series(samples)
+        
+        print("🧹 Testing Series cleaners against the scalar ones...")
+        ok = True
+        for scalar, batch in [
+            (DataCleaner.clean_phone_number, DataCleaner.clean_phone_numbers),
+            (DataCleaner.clean_address, DataCleaner.clean_addresses),
+            (DataCleaner.clean_business_name, DataCleaner.clean_business_names),
+            (DataCleaner.clean_website_url, DataCleaner.clean_website_urls),
+        ]:
+            same = batch(series).tolist() == [scalar(value) for value in samples]
+            ok = ok and same
+            print(f"{'✅' if same else '❌'} {batch.__name__} matches {scalar.__name__}")
+        return ok
+        
+    except Exception as e:
+        print(f"❌ Cleaner parity test failed: {str(e)}")
+        return False
+
+@check
+def test_email_scanner():
+    """Test email scanning, obfuscation decoding and config-driven ranking"""
+    try:
+        sys.path.append('.')
+        from utils import EmailExtractor
+        
+        text = """
+        <p>Reach john@smith.org or sales [at] acme [dot] co [dot] uk</p>
+        <a href="mailto:%69%6e%66%6f%40foo.com">Mail</a> <span>desk&#64;bar.io</span>
+        noreply@acme.com me@gmail.com x@mail.example.com logo@2x.png INFO@Foo.com
+        """
+        expected = ['sales@acme.co.uk', 'info@foo.com', 'john@smith.org', 'desk@bar.io']
+        
+        print("📨 Testing email scanner...")
+        emails = EmailExtractor().extract_emails_from_text(text)
+        if emails != expected:
+            print(f"❌ Expected {expected}, got {emails}")
+            return False
+        print(f"✅ Decoded, filtered and ranked: {emails}")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Email scanner test failed: {str(e)}")
+        return False
+
+@check
+def test_user_agents():
+    """Test the bundled user agent pool"""
+    try:
+        sys.path.append('.')
+        from collections import Counter
+        from user_agents import UserAgentPool, get_user_agent_pool
+        
+        print("🕵️ Testing user agent pool...")
+        pool = get_user_agent_pool()
+        if len(pool) < 2 or pool is not get_user_agent_pool():
+            print("❌ Pool should load the bundled file once")
+            return False
+        if pool.for_host('https://shop.example/contact') != pool.for_host('SHOP.example'):
+            print("❌ One host should always get the same user agent")
+            return False
+        
+        weighted = UserAgentPool([('heavy', 9), ('light', 1)])
+        draws = Counter(weighted.random for _ in range(5000))
+        if not 0.85 < draws['heavy'] / 5000 < 0.95:
+            print(f"❌ Draws ignore the weights: {dict(draws)}")
+            return False
+        print(f"✅ {len(pool)} user agents, weighted and sticky per host")
+        return True
+        
+    except Exception as e:
+        print(f"❌ User agent test failed: {str(e)}")
+        return False
+
+@check
+def test_import_profile():
+    """Profile the apps' cold-start imports and catch heavy modules loaded up front"""
+    try:
+        deferred = ['pandas', 'selenium', 'webdriver_manager', 'bs4', 'fake_useragent']
+        script = (
+            "import sys, streamlit; import app, simple_app; "
+            f"print(','.join(m for m in {deferred!r} if m in sys.modules))"
+        )
+        # Bare-mode Streamlit warns on stderr; -X importtime writes there too
+        run = subprocess.run([sys.executable, '-X', 'importtime', '-c', script],
+                             capture_output=True, text=True, timeout=120)
+        if run.returncode != 0:
+            print(f"❌ Importing the apps failed:\n{run.stderr[-2000:]}")
+            return False
+        
+        # "import time: self [us] | cumulative | name"; report this repo's modules
+        project = {path[:-3] for path in os.listdir('.') if path.endswith('.py')}
+        costs = {}
+        for line in run.stderr.splitlines():
+            if not line.startswith('import time:') or '|' not in line:
+                continue
+            _, cumulative, name = line.split('|')
+            if cumulative.strip().isdigit() and name.strip() in project | {'streamlit'}:
+                costs[name.strip()] = int(cumulative) / 1000
+        
+        print("⏱️ Cold-start import profile (cumulative ms, dependencies included):")
+        for name, ms in sorted(costs.items(), key=lambda item: -item[1]):
+            print(f"   {ms:8.1f}  {name}")
+        
+        loaded = [name for name in run.stdout.strip().split(',') if name]
+        if loaded:
+            print(f"❌ Loaded at startup but meant to be lazy: {', '.join(loaded)}")
+            return False
+        print(f"✅ None of {', '.join(deferred)} imported at startup")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Import profile failed: {str(e)}")
+        return False
+
+@check
+def test_diagnostics():
+    """Test failure diagnostics: shown in debug mode only, computed once"""
+    try:
+        sys.path.append('.')
+        from diagnostics import LazyDiagnostics
+        from engine import ExtractionEngine
+        
+        print("🩺 Testing page diagnostics...")
+        page = '<html><a href="https://example.com">Restaurant</a> Google Maps</html>' * 50
+        lazy = LazyDiagnostics(page).start()
+        stats = lazy.get()
+        if stats is not lazy.get() or stats.keyword_counts != {'google': 50, 'maps': 50, 'http': 50, 'href=': 50}:
+            print(f"❌ Unexpected diagnostics: {stats.keyword_counts}")
+            return False
+        
+        messages = {}
+        for debug in (True, False):
+            events = []
+            ExtractionEngine(debug=debug, on_event=events.append).extract_urls_from_content(page)
+            messages[debug] = [event.message for event in events]
+        if not any(m.startswith('• Keywords found') for m in messages[True]) or \
+                any(m.startswith('• Keywords found') for m in messages[False]):
+            print("❌ Content analysis should only run in debug mode")
+            return False
+        print("✅ Content analysis runs once, and only in debug mode")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Diagnostics test failed: {str(e)}")
+        return False
+
+@check
+def test_metrics():
+    """Test per-stage metrics and the Prometheus export"""
+    try:
+        sys.path.append('.')
+        import metrics
+        from engine import ExtractionEngine
+        
+        print("⏱️ Testing metrics...")
+        page = '<a href="https://www.google.com/maps/place/Cafe+Luna/@40.7,-73.9,17z">Map</a>' * 20
+        result = ExtractionEngine().extract_urls_from_content(page)
+        counters = result.metrics.get('counters', {})
+        if not {'scan', 'clean'} <= set(result.metrics.get('timings', {})) or counters.get('urls_found') != 1:
+            print(f"❌ Unexpected run metrics: {result.metrics}")
+            return False
+        
+        exported = metrics.get_registry().render_prometheus()
+        for line in ('leadgen_stage_seconds_total{stage="scan"}', 'leadgen_matches_total{category="place"}'):
+            if line not in exported:
+                print(f"❌ Missing from the Prometheus export: {line}")
+                return False
+        print(f"✅ {len(result.metrics['timings'])} stages timed, counters exported")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Metrics test failed: {str(e)}")
+        return False
+
+@check
+def test_scan_pool():
+    """Test scanning in worker processes against the in-process scan"""
+    try:
+        sys.path.append('.')
+        from scan_pool import ScanPool, scan_page
+
+        print("⚙️ Testing scan pool...")
+        page = ('<p>Café directory</p><a href="https://www.google.com/maps/place/Cafe+Luna/@40.7,-73.9,17z">Map</a>'
+                ' https%3A//maps.google.com/?cid=123456789 <div id="root"></div>' * 50)
+        expected = scan_page(page, score=True)
+        pool = ScanPool(2)
+        try:
+            outcome = pool.scan_text(page, score=True)
+        finally:
+            pool.close()
+        same = (sorted(outcome.urls) == sorted(expected.urls) and outcome.counts == expected.counts
+                and outcome.page_length == len(page) and outcome.signals.markers == expected.signals.markers)
+        print(f"{'✅' if same else '❌'} Worker found {len(outcome.urls)} URLs, same as in-process")
+        return same
+
+    except Exception as e:
+        print(f"❌ Scan pool test failed: {str(e)}")
+        return False
+
+@check
+def test_async_backends():
+    """Test the asyncio fetch backends against the requests path"""
+    try:
+        sys.path.append('.')
+        from async_fetch import BACKEND_AIOHTTP, BACKEND_HTTPX, resolve_backend
+        from batch import BatchExtractor
+        from benchmark import serve_pages
+        import http_client
+
+        print("🔀 Testing async fetch backends...")
+        pages = {
+            '/maps': '<a href="https://www.google.com/maps/place/Cafe+Luna/@40.7,-73.9,17z">Map</a>',
+            '/cafe': '<p>Café</p> https://www.google.com/maps/place/Joe%27s+Pizza/@40.73,-73.98,17z',
+            '/empty': '<p>No maps here</p>',
+        }
+        with serve_pages(pages) as base_url:
+            page_urls = [f'{base_url}{path}' for path in [*pages, '/missing']]
+            expected = BatchExtractor(session=http_client.create_session(use_cache=False),
+                                      backend='requests').extract(page_urls)
+            ok = True
+            for backend in (BACKEND_AIOHTTP, BACKEND_HTTPX):
+                if resolve_backend(backend) != backend:
+                    print(f"⚠️ {backend} not installed, skipped")
+                    continue
+                result = BatchExtractor(backend=backend).extract(page_urls)
+                errors = [page.error for page in result.failed_pages]
+                same = (result.sources == expected.sources and [page.page_url for page in result.pages] == page_urls
+                        and len(errors) == 1 and '404' in errors[0])
+                ok = ok and same
+                print(f"{'✅' if same else '❌'} {backend}: {len(result.sources)} URLs and the 404, same as requests")
+        return ok
+
+    except Exception as e:
+        print(f"❌ Async backend test failed: {str(e)}")
+        return False
+
+@check
+def test_benchmark_suite():
+    """Test the offline benchmark suite and its regression check"""
+    try:
+        sys.path.append('.')
+        import copy
+        from benchmark import compare_results, run_suite
+
+        print("📏 Testing benchmark suite...")
+        results = run_suite({'small': 50_000}, repeat=1, verbose=False)
+        if len(results['cases']) < 8 or any(not case['output'] for case in results['cases'].values()):
+            print(f"❌ Incomplete suite results: {list(results['cases'])}")
+            return False
+        if any(status != 'ok' for *_, status in compare_results(results, results)):
+            print("❌ A run compared with itself reported changes")
+            return False
+
+        slower = copy.deepcopy(results)
+        case = slower['cases']['DataCleaner.clean_dataframe[1000 rows]']
+        case['best'] = case['median'] = case['best'] * 2 + 0.01
+        case = slower['cases']['extract_urls_from_content[small-dense]']
+        case['output'] = 'changed'
+        statuses = {name: status for name, *_, status in compare_results(results, slower)}
+        if (statuses['DataCleaner.clean_dataframe[1000 rows]'] != 'regression'
+                or statuses['extract_urls_from_content[small-dense]'] != 'output changed'):
+            print(f"❌ Regressions not flagged: {statuses}")
+            return False
+        print(f"✅ {len(results['cases'])} cases timed offline, regressions flagged")
+        return True
+
+    except Exception as e:
+        print(f"❌ Benchmark suite test failed: {str(e)}")
+        return False
+
 def main():
     """Run all tests"""
     print("🧪 Testing Lead Generation Agent Setup")
@@ -101,6 +988,27 @@ def main():
         ("Package Imports", test_imports),
         ("Chrome WebDriver", test_chrome_driver),
         ("URL Validation", test_url_validation),
+        ("URL Matcher", test_url_matcher),
+        ("Streaming Scan", test_stream_scan),
+        ("Response Cache", test_response_cache),
+        ("Browser Reset", test_driver_reset),
+        ("Email Enricher", test_email_enricher),
+        ("Rate Limiter", test_rate_limiter),
+        ("Throttled Responses", test_throttled_responses),
+        ("Short Links", test_short_links),
+        ("Page Scoring", test_page_scoring),
+        ("Place Keys", test_place_keys),
+        ("Job Queue", test_job_queue),
+        ("Business Fields", test_business_fields),
+        ("Cleaner Parity", test_cleaner_parity),
+        ("Email Scanner", test_email_scanner),
+        ("User Agents", test_user_agents),
+        ("Import Profile", test_import_profile),
+        ("Diagnostics", test_diagnostics),
+        ("Metrics", test_metrics),
+        ("Scan Pool", test_scan_pool),
+        ("Async Backends", test_async_backends),
+        ("Benchmark Suite", test_benchmark_suite),
     ]
     
     results = []
@@ -0,0 +1,392 @@
+"""
+Lead Generation Agent - Tiered Fetching
+Cheap HTTP fetch first, headless browser only for pages that need rendering
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+import http_client
+import metrics
+from config import (
+    CHROME_OPTIONS, TIER_ESCALATE_SCORE, TIER_LINK_CREDIT, TIER_MIN_TEXT_RATIO,
+    TIER_MEMORY_PATH, TIER_MEMORY_TTL,
+)
+from driver_pool import get_driver_pool
+from extraction import MAPS_URL_MATCHER, HREF_CATEGORY, REQUEST_HEADERS, scan_response, clean_found_urls
+from page_loader import load_page_adaptive, harvest_links
+
+TIER_HTTP = 'http'
+TIER_BROWSER = 'browser'
+
+# Signs that the HTML is a shell filled in by JavaScript, with their score weight
+RENDERING_MARKERS = [
+    ('spa_root', r'<div[^>]+id=["\'](?:root|app|__next|__nuxt)["\'][^>]*>\s*</div>', 0.5),
+    ('noscript_warning', r'<noscript[^>]*>[^<]{0,200}?(?:enable|requires?|turn on)\s+javascript', 0.4),
+    ('js_challenge', r'cf-browser-verification|/cdn-cgi/challenge-platform|<title>Just a moment', 0.6),
+    ('maps_widget', r'maps\.googleapis\.com/maps/api/js|new google\.maps\.Map\b', 0.4),
+    ('loading_placeholder', r'class=["\'][^"\']*\b(?:skeleton|spinner|loading)\b', 0.2),
+]
+_MARKER_WEIGHTS = {name: weight for name, _, weight in RENDERING_MARKERS}
+_MARKER_PATTERN = re.compile(
+    '|'.join(f'(?P<{name}>{pattern})' for name, pattern, _ in RENDERING_MARKERS),
+    re.IGNORECASE
+)
+
+# Markup that carries no readable text
+_MARKUP_PATTERN = re.compile(r'<script\b.*?</script>|<style\b.*?</style>|<[^>]*>', re.IGNORECASE | re.DOTALL)
+
+_READABILITY_SAMPLE = 2000
+
+# Responses a real browser often gets past (bot walls, JS challenges)
+_ESCALATE_STATUSES = {403, 503}
+
+
+class PageSignals:
+    """Rendering hints gathered from the page text as it streams past"""
+
+    def __init__(self):
+        self.chars = 0
+        self.text_chars = 0
+        self.markers: Set[str] = set()
+        self._head: List[str] = []
+        self._head_chars = 0
+
+    def feed(self, text: str):
+        self.chars += len(text)
+        self.text_chars += len(_MARKUP_PATTERN.sub('', text).strip())
+        for match in _MARKER_PATTERN.finditer(text):
+            self.markers.add(match.lastgroup)
+        if self._head_chars < _READABILITY_SAMPLE:
+            self._head.append(text[:_READABILITY_SAMPLE - self._head_chars])
+            self._head_chars += len(self._head[-1])
+
+    @property
+    def text_ratio(self) -> float:
+        return self.text_chars / self.chars if self.chars else 0.0
+
+    @property
+    def readability(self) -> float:
+        sample = ''.join(self._head)
+        if not sample:
+            return 0.0
+        return sum(1 for c in sample if c != '\ufffd' and (c.isprintable() or c.isspace())) / len(sample)
+
+
+@dataclass
+class PageScore:
+    """How likely a page is to need a browser, from 0 (no) upward"""
+    score: float
+    maps_links: int
+    text_ratio: float
+    readability: float
+    reasons: List[str] = field(default_factory=list)
+
+    @property
+    def needs_browser(self) -> bool:
+        return self.score >= TIER_ESCALATE_SCORE
+
+
+def score_page(signals: PageSignals, maps_links: int) -> PageScore:
+    """Score an HTTP-fetched page on whether rendering it would find more
+
+    Shell markers, little visible text and unreadable content raise the
+    score; Maps URLs already found in the raw HTML lower it.
+    """
+    score = 0.0
+    reasons = []
+    for marker in sorted(signals.markers):
+        score += _MARKER_WEIGHTS[marker]
+        reasons.append(marker.replace('_', ' '))
+    if signals.text_ratio < TIER_MIN_TEXT_RATIO:
+        score += 0.3
+        reasons.append(f'{signals.text_ratio:.0%} visible text')
+    if signals.readability < 0.7:
+        score += 0.3
+        reasons.append(f'{signals.readability:.0%} readable')
+    if maps_links:
+        score = max(0.0, score - TIER_LINK_CREDIT)
+        reasons.append(f'{maps_links} Maps URLs in HTML')
+    return PageScore(round(score, 2), maps_links, signals.text_ratio, signals.readability, reasons)
+
+
+class DomainTierMemory:
+    """Which tier each domain needed last time, persisted as JSON
+
+    Only escalations are recorded: ``browser`` when rendering found more
+    Maps URLs than the raw HTML, ``http`` when it did not. Entries expire
+    after ``ttl`` seconds so sites that change their rendering are
+    re-probed.
+    """
+
+    def __init__(self, path: str = TIER_MEMORY_PATH, ttl: float = TIER_MEMORY_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+
+    def get(self, domain: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(domain)
+        if entry and time.time() - entry['updated'] < self.ttl:
+            return entry['tier']
+        return None
+
+    def record(self, domain: str, tier: str):
+        with self._lock:
+            entry = self._entries.get(domain)
+            if entry and entry['tier'] == tier and time.time() - entry['updated'] < self.ttl / 2:
+                return  # nothing new worth a disk write
+            self._entries[domain] = {'tier': tier, 'updated': time.time()}
+            self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(self._entries, f)
+        os.replace(temp_path, self.path)
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            tiers = [entry['tier'] for entry in self._entries.values()]
+        return {tier: tiers.count(tier) for tier in (TIER_HTTP, TIER_BROWSER)}
+
+
+_memory = None
+_memory_lock = threading.Lock()
+
+
+def get_tier_memory() -> DomainTierMemory:
+    """Return the process-wide domain memory, loading it on first use"""
+    global _memory
+    if _memory is None:
+        with _memory_lock:
+            if _memory is None:
+                _memory = DomainTierMemory()
+    return _memory
+
+
+@dataclass
+class TierResult:
+    """Outcome of a tiered fetch
+
+    ``page_source`` is the full rendered HTML after a browser fetch, or what
+    scan_response kept (the whole page or its diagnostic sample) after HTTP.
+    """
+    url: str
+    tier: str
+    urls: List[str]
+    page_source: str
+    page_length: int
+    scan_result: Tuple[Set[str], Dict[str, int]]
+    invalid_urls: List[str] = field(default_factory=list)
+    score: Optional[PageScore] = None
+    escalated: bool = False
+    remembered: bool = False
+    reason: str = ''
+    response: Optional[requests.Response] = None
+    http_elapsed: float = 0.0
+    browser_elapsed: float = 0.0
+
+
+class TieredFetcher:
+    """Fetch pages over HTTP and escalate to the browser pool only when needed
+
+    Each HTTP result is scored (see ``score_page``). Pages that look like
+    JavaScript shells are re-fetched in a pooled headless browser, and the
+    tier that worked is remembered per domain so later pages from that site
+    go straight to it. If no browser can be started the HTTP result stands.
+    """
+
+    def __init__(self, session=None, memory: Optional[DomainTierMemory] = None,
+                 browser_arguments: Sequence[str] = CHROME_OPTIONS, timeout: int = 30,
+                 streaming: bool = True, rate_limiter=None, use_browser: bool = True, scan_pool=None):
+        self.session = session  # defaults to the shared pooled session
+        self.memory = memory or get_tier_memory()
+        self.browser_arguments = tuple(browser_arguments)
+        self.timeout = timeout
+        self.streaming = streaming
+        self.rate_limiter = rate_limiter  # optional utils.HostRateLimiter
+        self.use_browser = use_browser
+        self.scan_pool = scan_pool  # optional scan_pool.ScanPool; HTTP pages are then scanned in its workers
+        self.browser_error: Optional[str] = None  # set once Chrome fails to start; HTTP only after that
+        self._lock = threading.Lock()
+        self.stats = dict.fromkeys(['http', 'browser', 'escalated', 'remembered', 'browser_failed'], 0)
+
+    @staticmethod
+    def domain(url: str) -> str:
+        host = urlparse(url).netloc.lower()
+        return host[4:] if host.startswith('www.') else host
+
+    @property
+    def browser_enabled(self) -> bool:
+        return self.use_browser and self.browser_error is None
+
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _fetch_http(self, url: str) -> TierResult:
+        start = time.perf_counter()
+        if self.rate_limiter:
+            with metrics.stage('throttle'):
+                self.rate_limiter.wait(url)
+        session = self.session or http_client.get_session()
+        # Until the response headers arrive; connect time is charged to 'connect'
+        with metrics.stage('request'):
+            response = session.get(url, headers=REQUEST_HEADERS, timeout=self.timeout, allow_redirects=True,
+                                   stream=True)
+        if self.rate_limiter:
+            self.rate_limiter.record_response(url, response.status_code, response.headers)
+        # Scoring costs a pass over the text, so skip it when escalation is impossible
+        signals = PageSignals() if self.browser_enabled else None
+        try:
+            response.raise_for_status()
+            if self.scan_pool:
+                scanned = self.scan_pool.scan_response(response, score=signals is not None)
+            else:
+                page_source, page_length, scan_result = scan_response(response, streaming=self.streaming,
+                                                                      on_text=signals.feed if signals else None)
+        finally:
+            response.close()
+
+        if self.scan_pool:
+            # Scored, scanned and cleaned in a worker process
+            page_source, page_length, scan_result = scanned.sample, scanned.page_length, scanned.scan_result
+            urls, invalid_urls, signals = scanned.urls, scanned.invalid_urls, scanned.signals
+        else:
+            with metrics.stage('clean'):
+                urls, invalid_urls = clean_found_urls(scan_result[0])
+        return TierResult(url, TIER_HTTP, urls, page_source, page_length, scan_result, invalid_urls=invalid_urls,
+                          score=score_page(signals, len(urls)) if signals else None, response=response,
+                          http_elapsed=time.perf_counter() - start)
+
+    def _fetch_browser(self, url: str) -> TierResult:
+        start = time.perf_counter()
+        if self.rate_limiter:
+            with metrics.stage('throttle'):
+                self.rate_limiter.wait(url)
+        pool = get_driver_pool(self.browser_arguments)
+        try:
+            with metrics.stage('render'):  # may include starting Chrome
+                driver = pool.acquire()
+        except TimeoutError:
+            raise  # every browser busy, not broken
+        except Exception as e:
+            self.browser_error = str(e)
+            raise
+        try:
+            with metrics.stage('render'):
+                load_page_adaptive(driver, url)
+                html, hrefs = harvest_links(driver)
+        finally:
+            pool.release(driver)
+
+        with metrics.stage('scan'):
+            found_urls, counts = MAPS_URL_MATCHER.scan(html)
+        metrics.count('chars_decoded', len(html))
+        new_hrefs = set(hrefs) - found_urls
+        found_urls |= new_hrefs
+        counts[HREF_CATEGORY] += len(new_hrefs)
+        with metrics.stage('clean'):
+            urls, invalid_urls = clean_found_urls(found_urls)
+        return TierResult(url, TIER_BROWSER, urls, html, len(html), (found_urls, counts), invalid_urls=invalid_urls,
+                          browser_elapsed=time.perf_counter() - start)
+
+    def fetch(self, url: str) -> TierResult:
+        """Fetch one page at the cheapest tier that gets its Maps URLs
+
+        Network and HTTP errors from the HTTP tier are raised unless the
+        browser can get the page instead.
+        """
+        domain = self.domain(url)
+        remembered = self.memory.get(domain)
+
+        if self.browser_enabled and remembered == TIER_BROWSER:
+            try:
+                result = self._fetch_browser(url)
+                result.remembered = True
+                result.reason = f'{domain} needed rendering before'
+                self._count('remembered')
+                self._count('browser')
+                return result
+            except Exception:
+                self._count('browser_failed')
+
+        try:
+            http_result = self._fetch_http(url)
+        except requests.exceptions.HTTPError as e:
+            if not (self.browser_enabled and e.response is not None and e.response.status_code in _ESCALATE_STATUSES):
+                raise
+            try:
+                result = self._fetch_browser(url)
+            except Exception:
+                self._count('browser_failed')
+                raise e
+            result.escalated = True
+            result.reason = f'HTTP {e.response.status_code}'
+            self._escalated(domain, None, result)
+            return result
+
+        self._count('http')
+        score = http_result.score
+        if score is None:
+            http_result.reason = 'browser unavailable' if self.use_browser else 'browser fallback off'
+            return http_result
+        if remembered == TIER_HTTP and score.needs_browser:
+            self._count('remembered')
+            http_result.remembered = True
+            http_result.reason = f'score {score.score:.2f}, but rendering did not help on {domain} before'
+            return http_result
+        if not (self.browser_enabled and score.needs_browser):
+            http_result.reason = f'score {score.score:.2f}'
+            if score.needs_browser:
+                http_result.reason += ', browser unavailable'
+            return http_result
+
+        try:
+            result = self._fetch_browser(url)
+        except Exception as e:
+            self._count('browser_failed')
+            http_result.reason = f'score {score.score:.2f}, browser unavailable: {e}'
+            return http_result
+
+        result.escalated = True
+        result.score = score
+        result.response = http_result.response
+        result.http_elapsed = http_result.http_elapsed
+        result.reason = f'score {score.score:.2f}: ' + ', '.join(score.reasons)
+        return self._escalated(domain, http_result, result)
+
+    def _escalated(self, domain: str, http_result: Optional[TierResult], browser_result: TierResult) -> TierResult:
+        """Remember whether rendering paid off and return the better result"""
+        self._count('escalated')
+        self._count('browser')
+        http_count = len(http_result.urls) if http_result else 0
+        if http_result is None or len(browser_result.urls) > http_count:
+            self.memory.record(domain, TIER_BROWSER)
+        else:
+            self.memory.record(domain, TIER_HTTP)
+        if http_result is not None and http_count > len(browser_result.urls):
+            http_result.escalated = True
+            http_result.browser_elapsed = browser_result.browser_elapsed
+            http_result.reason = browser_result.reason + ' (browser found fewer)'
+            return http_result
+        return browser_result
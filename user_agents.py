@@ -0,0 +1,92 @@
+"""
+Lead Generation Agent - User Agents
+Weighted User-Agent rotation from a bundled data file, loaded once per process
+"""
+
+import hashlib
+import json
+import random
+import threading
+from bisect import bisect_right
+from itertools import accumulate
+from typing import List, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from config import USER_AGENTS, USER_AGENTS_FILE
+
+Weighted = Tuple[str, float]
+
+
+def load_user_agents(path: str = USER_AGENTS_FILE) -> List[Weighted]:
+    """(user_agent, weight) pairs from a JSON list of {"ua", "weight"} objects
+
+    Plain strings count as weight 1. An unreadable or empty file falls back
+    to config.USER_AGENTS, so there is always something to rotate and the
+    network is never involved.
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        entries = []
+        for item in data:
+            if isinstance(item, str):
+                entries.append((item, 1.0))
+            elif item.get('ua') and float(item.get('weight', 1)) > 0:
+                entries.append((item['ua'], float(item.get('weight', 1))))
+        if entries:
+            return entries
+    except (OSError, ValueError, TypeError, AttributeError) as e:
+        print(f"Could not load user agents from {path}: {e}")
+    return [(user_agent, 1.0) for user_agent in USER_AGENTS]
+
+
+class UserAgentPool:
+    """Weighted User-Agent choice, random per request or sticky per host
+
+    ``random`` draws in proportion to the weights, so it can replace
+    fake_useragent's ``UserAgent().random``. ``for_host`` hashes the host
+    into the same weighted distribution. A site keeps seeing one browser
+    across its homepage and contact probes, in this process and the next.
+    """
+
+    def __init__(self, entries: Sequence[Weighted]):
+        if not entries:
+            raise ValueError("UserAgentPool needs at least one user agent")
+        self.user_agents = [user_agent for user_agent, _ in entries]
+        self._cumulative = list(accumulate(weight for _, weight in entries))
+        self._total = self._cumulative[-1]
+
+    @classmethod
+    def from_file(cls, path: str = USER_AGENTS_FILE) -> 'UserAgentPool':
+        return cls(load_user_agents(path))
+
+    def _pick(self, fraction: float) -> str:
+        index = bisect_right(self._cumulative, fraction * self._total)
+        return self.user_agents[min(index, len(self.user_agents) - 1)]
+
+    @property
+    def random(self) -> str:
+        return self._pick(random.random())
+
+    def for_host(self, url_or_host: str) -> str:
+        """The same user agent every time for a given host"""
+        host = urlsplit(url_or_host).netloc if '://' in url_or_host else url_or_host
+        digest = hashlib.blake2b(host.lower().encode('utf-8'), digest_size=8).digest()
+        return self._pick(int.from_bytes(digest, 'big') / 2 ** 64)
+
+    def __len__(self) -> int:
+        return len(self.user_agents)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_user_agent_pool() -> UserAgentPool:
+    """Return the process-wide pool, reading USER_AGENTS_FILE on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = UserAgentPool.from_file()
+    return _pool